@@ -0,0 +1,91 @@
+from django.utils.functional import cached_property
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+from users import cache as user_cache
+from users.models import User, UserRole
+
+PRINCIPAL_CLAIMS = ('username', 'role', 'is_superuser')
+
+
+def get_access_token(user):
+    """Токен доступа с claims, достаточными для проверки прав."""
+    token = AccessToken.for_user(user)
+    for claim in PRINCIPAL_CLAIMS:
+        token[claim] = getattr(user, claim)
+    return token
+
+
+def get_user_instance(user):
+    """Модель пользователя для записи в базу (из кэша процесса)."""
+    return getattr(user, 'instance', user)
+
+
+def get_author(user):
+    """
+    Автор новой записи без запроса пользователя: author_id - id из токена,
+    username (для ответа) - из claims.
+    """
+    return User(pk=user.id, username=user.username)
+
+
+class TokenPrincipal(TokenUser):
+    """
+    Пользователь, собранный из claims токена без запроса к базе.
+    Остальные поля модели читаются из кэша пользователей по требованию.
+    """
+
+    @property
+    def role(self):
+        return self.token.get('role')
+
+    @property
+    def is_user(self):
+        return self.role == UserRole.USER
+
+    @property
+    def is_moderator(self):
+        return self.role == UserRole.MODERATOR
+
+    @property
+    def is_admin(self):
+        return self.role == UserRole.ADMIN
+
+    @cached_property
+    def instance(self):
+        return user_cache.get_user(self.id)
+
+    def __getattr__(self, attr):
+        if attr == 'token' or attr.startswith('_'):
+            raise AttributeError(attr)
+        return getattr(self.instance, attr)
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWT-аутентификация без обращения к базе: пользователь строится из
+    claims. Если пользователь изменён после выдачи токена (или в токене
+    нет нужных claims), используется модель из кэша пользователей.
+    """
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is None:
+            return super().get_user(validated_token)
+
+        changed_at = user_cache.get_changed_at(user_id)
+        if (all(claim in validated_token for claim in PRINCIPAL_CLAIMS)
+                and changed_at < validated_token.get('iat', 0)):
+            return TokenPrincipal(validated_token)
+
+        try:
+            user = user_cache.get_user(user_id, changed_at)
+        except User.DoesNotExist:
+            raise AuthenticationFailed('User not found',
+                                       code='user_not_found')
+        if not user.is_active:
+            raise AuthenticationFailed('User is inactive',
+                                       code='user_inactive')
+        return user
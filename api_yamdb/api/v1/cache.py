@@ -0,0 +1,225 @@
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from core import replicas
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from django.utils.http import (http_date, parse_etags, parse_http_date_safe,
+                               quote_etag)
+from rest_framework.response import Response
+from reviews.models import Category, Comment, Genre, GenreTitle, Review, Title
+from users.models import User
+
+CACHE_ALIAS = getattr(settings, 'API_CACHE_ALIAS', 'default')
+CACHE_TIMEOUT = getattr(settings, 'API_CACHE_TIMEOUT', 60)
+LOCK_TIMEOUT = getattr(settings, 'API_CACHE_LOCK_TIMEOUT', 5)
+LOCK_POLL_INTERVAL = 0.05
+
+# User: в отзывах и комментариях выводится имя автора.
+VERSIONED_MODELS = (Title, GenreTitle, Genre, Category, Review, Comment, User)
+
+
+def get_cache():
+    return caches[CACHE_ALIAS]
+
+
+def version_key(model):
+    return f'api-cache:version:{model._meta.label_lower}'
+
+
+def new_version():
+    # Версия - время изменения в наносекундах: после вытеснения из кэша она
+    # не повторится, а по максимуму версий строится Last-Modified.
+    return time.time_ns()
+
+
+def get_versions(models):
+    """Текущие версии моделей за одно обращение к кэшу."""
+    cache = get_cache()
+    keys = [version_key(model) for model in models]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, new_version(), timeout=None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump_version(model):
+    """Инвалидирует все закэшированные ответы, зависящие от model."""
+    get_cache().set(version_key(model), new_version(), timeout=None)
+
+
+def bump_all_versions():
+    """Для массовых операций, которые не отправляют сигналы."""
+    for model in VERSIONED_MODELS:
+        bump_version(model)
+
+
+def bump_version_on_commit(model):
+    # До коммита параллельный запрос ещё видит старые данные и закэшировал
+    # бы их под новой версией.
+    transaction.on_commit(lambda: bump_version(model))
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def model_changed(sender, created=False, update_fields=None, **kwargs):
+    if sender not in VERSIONED_MODELS:
+        return
+    if sender is User and (
+            created or (update_fields is not None
+                        and User.TOKEN_NEUTRAL_FIELDS.issuperset(
+                            update_fields))):
+        # Новый пользователь ещё ничего не написал, а код подтверждения и
+        # last_login в ответах не выводятся.
+        return
+    bump_version_on_commit(sender)
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def title_genres_changed(sender, action, **kwargs):
+    if action.startswith('post_'):
+        bump_version_on_commit(GenreTitle)
+
+
+def normalized_params(request):
+    return urlencode(sorted(
+        (key, value)
+        for key, values in request.query_params.lists()
+        for value in values
+    ))
+
+
+class VersionedCacheMixin:
+    """
+    Кэширует ответы list/retrieve для анонимных GET-запросов.
+    Ключ включает версии cache_models и нормализованные параметры запроса,
+    поэтому любое изменение этих моделей делает старые записи недоступными.
+    При промахе ответ строит только один процесс, остальные ждут его.
+    """
+    cache_models = ()
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs)
+
+    def get_cache_key(self, request, versions):
+        raw = '|'.join((
+            request.path,
+            normalized_params(request),
+            ','.join(map(str, versions)),
+        ))
+        digest = hashlib.md5(raw.encode()).hexdigest()
+        return f'api-cache:{self.basename}:{self.action}:{digest}'
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return handler(request, *args, **kwargs)
+
+        cache = get_cache()
+        versions = get_versions(self.cache_models)
+        key = self.get_cache_key(request, versions)
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+
+        lock_key = f'{key}:lock'
+        locked = cache.add(lock_key, 1, timeout=LOCK_TIMEOUT)
+        if not locked:
+            data = self.wait_for(cache, key, lock_key)
+            if data is not None:
+                return Response(data)
+        try:
+            # Ответ ляжет в кэш под новой версией: отстающая реплика
+            # закэшировала бы под ней старые данные.
+            with replicas.use_primary_if_changed_since(
+                    max(versions) / 10 ** 9):
+                response = handler(request, *args, **kwargs)
+            if response.status_code == 200:
+                cache.set(key, response.data, timeout=CACHE_TIMEOUT)
+        finally:
+            if locked:
+                cache.delete(lock_key)
+        return response
+
+    @staticmethod
+    def wait_for(cache, key, lock_key):
+        """Ждёт, пока ответ закэширует процесс, захвативший блокировку."""
+        deadline = time.monotonic() + LOCK_TIMEOUT
+        while time.monotonic() < deadline:
+            time.sleep(LOCK_POLL_INTERVAL)
+            data = cache.get(key)
+            if data is not None:
+                return data
+            if cache.get(lock_key) is None:
+                return None
+        return None
+
+
+class ConditionalGetMixin:
+    """
+    ETag и Last-Modified для list/retrieve по версиям cache_models.
+    Запросы с совпадающим If-None-Match (или не изменившиеся после
+    If-Modified-Since) получают 304 до обращения к базе и сериализатору.
+    If-None-Match: * получает 304, только если ресурс существует.
+    """
+    cache_models = ()
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().retrieve, request, *args, **kwargs)
+
+    def get_validators(self, request):
+        versions = get_versions(self.cache_models)
+        raw = '|'.join((
+            request.path,
+            normalized_params(request),
+            request.accepted_media_type or '',
+            ','.join(map(str, versions)),
+        ))
+        etag = quote_etag(hashlib.md5(raw.encode()).hexdigest())
+        return etag, max(versions) // 10 ** 9
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        etag, last_modified = self.get_validators(request)
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if_modified_since = parse_http_date_safe(
+            request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+        match_any = False
+        if if_none_match is not None:
+            match_any = if_none_match.strip() == '*'
+            # Слабое сравнение: сжатый ответ отдаёт тот же ETag с W/
+            # (core.compression).
+            not_modified = etag in {
+                tag[2:] if tag.startswith('W/') else tag
+                for tag in parse_etags(if_none_match)}
+        else:
+            not_modified = (if_modified_since is not None
+                            and last_modified <= if_modified_since)
+
+        if not_modified:
+            response = Response(status=304)
+        else:
+            # Тот же ETag со старыми данными с реплики клиент хранил бы
+            # до следующего изменения.
+            with replicas.use_primary_if_changed_since(last_modified):
+                response = handler(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            if match_any:
+                response = Response(status=304)
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        return response
@@ -0,0 +1,195 @@
+"""
+Микрокэш nginx перед api/v1 (infra/nginx/default.conf).
+
+EdgeCacheMixin помечает анонимные ответы list/retrieve заголовками:
+Cache-Control с s-maxage и X-Accel-Expires - сколько секунд nginx держит
+ответ, Surrogate-Key - от каких моделей он зависит. Ответы с токеном
+помечаются private, nginx их и так не кэширует.
+
+В стандартном nginx нет удаления по ключу, поэтому очистка устроена так:
+отдавая ответ, Django запоминает его URL под каждым surrogate-ключом,
+а при изменении модели просит nginx перезапросить эти URL мимо кэша
+(заголовок X-Cache-Refresh). Запросы шлёт фоновый поток воркера: ждать
+nginx в запросе нельзя, он может прийти к этому же воркеру. Обновляется
+не больше API_EDGE_CACHE_REFRESH_LIMIT последних URL ключа, остальные
+истекают сами через API_EDGE_CACHE_TIMEOUT секунд.
+"""
+import logging
+import queue
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from django.utils.cache import patch_cache_control
+from reviews.models import Category, Comment, Genre, GenreTitle, Review, Title
+
+from .cache import get_cache
+
+logger = logging.getLogger(__name__)
+
+EDGE_CACHE_TIMEOUT = getattr(settings, 'API_EDGE_CACHE_TIMEOUT', 5)
+REFRESH_URL = getattr(settings, 'API_EDGE_CACHE_REFRESH_URL', '')
+REFRESH_LIMIT = getattr(settings, 'API_EDGE_CACHE_REFRESH_LIMIT', 100)
+REFRESH_TIMEOUT = 5
+REFRESH_HEADER = 'X-Cache-Refresh'
+
+SURROGATE_KEYS = {
+    Title: 'titles',
+    GenreTitle: 'titles',
+    Genre: 'genres',
+    Category: 'categories',
+    Review: 'reviews',
+    Comment: 'comments',
+}
+
+
+def surrogate_keys(models):
+    return sorted({SURROGATE_KEYS[model] for model in models})
+
+
+def index_key(key):
+    return f'edge-cache:{key}'
+
+
+def remember(keys, url):
+    """
+    Запоминает URL ответа под его ключами. Гонки двух воркеров могут
+    потерять запись - тогда ответ просто доживёт до конца TTL.
+    """
+    cache = get_cache()
+    now = time.time()
+    indexes = cache.get_many([index_key(key) for key in keys])
+    for key in keys:
+        urls = {
+            cached: stored_at
+            for cached, stored_at in indexes.get(index_key(key), {}).items()
+            if now - stored_at < EDGE_CACHE_TIMEOUT
+        }
+        urls[url] = now
+        if len(urls) > REFRESH_LIMIT:
+            urls = dict(sorted(urls.items(), key=lambda item: item[1])[
+                -REFRESH_LIMIT:])
+        cache.set(index_key(key), urls, timeout=EDGE_CACHE_TIMEOUT)
+
+
+class Refresher:
+    """Фоновый поток, перезапрашивающий URL у nginx."""
+
+    def __init__(self):
+        self.queue = queue.Queue()
+        self.pending = set()
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def add(self, urls):
+        with self.lock:
+            urls = [url for url in urls if url not in self.pending]
+            self.pending.update(urls)
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(
+                    target=self.run, name='edge-cache-refresher',
+                    daemon=True)
+                self.thread.start()
+        for url in urls:
+            self.queue.put(url)
+
+    def run(self):
+        while True:
+            url = self.queue.get()
+            with self.lock:
+                self.pending.discard(url)
+            try:
+                refresh(url)
+            except (OSError, urllib.error.URLError) as error:
+                logger.warning('Не удалось обновить %s в кэше nginx: %s',
+                               url[1], error)
+            finally:
+                self.queue.task_done()
+
+
+def refresh(url):
+    host, path, accept, accept_encoding = url
+    request = urllib.request.Request(REFRESH_URL.rstrip('/') + path)
+    request.add_header('Host', host)
+    request.add_header(REFRESH_HEADER, '1')
+    # nginx хранит варианты ответа по Vary: Accept-Encoding
+    # (core.compression) - обновляем тот, что закэширован.
+    if accept:
+        request.add_header('Accept', accept)
+    if accept_encoding:
+        request.add_header('Accept-Encoding', accept_encoding)
+    with urllib.request.urlopen(request, timeout=REFRESH_TIMEOUT) as response:
+        response.read()
+
+
+refresher = Refresher()
+
+
+def purge(keys):
+    """Обновляет в nginx ответы, помеченные любым из keys."""
+    if not REFRESH_URL:
+        return
+    cache = get_cache()
+    index_keys = [index_key(key) for key in keys]
+    indexes = cache.get_many(index_keys)
+    cache.delete_many(index_keys)
+    urls = set()
+    for urls_by_key in indexes.values():
+        urls.update(urls_by_key)
+    if urls:
+        refresher.add(urls)
+
+
+def purge_on_commit(model):
+    # Приёмники cache.py подключены раньше (views импортирует его первым),
+    # поэтому к запросу обновления версии в кэше ответов уже новые.
+    key = SURROGATE_KEYS[model]
+    transaction.on_commit(lambda: purge([key]))
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def model_changed(sender, **kwargs):
+    if sender in SURROGATE_KEYS:
+        purge_on_commit(sender)
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def title_genres_changed(sender, action, **kwargs):
+    if action.startswith('post_'):
+        purge_on_commit(GenreTitle)
+
+
+class EdgeCacheMixin:
+    """
+    Заголовки для микрокэша nginx. Ключи - по cache_models вьюсета, как
+    у VersionedCacheMixin.
+    """
+    cache_models = ()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs)
+        if request.method not in ('GET', 'HEAD'):
+            return response
+        if request.user.is_authenticated:
+            patch_cache_control(response, private=True)
+        elif (self.action in ('list', 'retrieve')
+              and response.status_code in (200, 304)):
+            keys = surrogate_keys(self.cache_models)
+            patch_cache_control(response, public=True, max_age=0,
+                                s_maxage=EDGE_CACHE_TIMEOUT)
+            response['X-Accel-Expires'] = str(EDGE_CACHE_TIMEOUT)
+            response['Surrogate-Key'] = ' '.join(keys)
+            if REFRESH_URL and response.status_code == 200:
+                remember(keys, (
+                    request.get_host(), request.get_full_path(),
+                    request.META.get('HTTP_ACCEPT', ''),
+                    request.META.get('HTTP_ACCEPT_ENCODING', ''),
+                ))
+        return response
@@ -0,0 +1,236 @@
+"""
+Быстрое чтение для list/retrieve без ModelSerializer.
+
+Строки берутся через values() по колонкам из sparse_fields вьюсета
+(с учётом ?fields=/?omit=), связи многие-ко-многим (fast_many) - одним
+запросом через промежуточную таблицу на страницу, поля из нескольких
+колонок собирают функции fast_representations. Ответ рендерит
+FastJSONRenderer на orjson. Результат побайтно совпадает с ответом
+сериализаторов - это проверяет tests/test_fast_serialization.py;
+меняя сериализатор, меняйте и описание вьюсета.
+
+API_FAST_SERIALIZATION = False возвращает обычные сериализаторы.
+"""
+import datetime
+
+import orjson
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from rest_framework import renderers, serializers
+from rest_framework.generics import get_object_or_404
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils import encoders
+
+from .fields import SparseFieldsMixin
+
+ENABLED = getattr(settings, 'API_FAST_SERIALIZATION', True)
+# Страницы от стольких строк отдаются потоком (FastJSONRenderer.stream).
+STREAMING_MIN_ROWS = getattr(settings, 'API_STREAMING_MIN_ROWS', 50)
+STREAM_CHUNK_SIZE = 16 * 1024
+
+# Как у DateTimeField сериализаторов: ISO 8601 в текущем часовом поясе.
+DATETIME = serializers.DateTimeField()
+
+
+class FastJSONRenderer(renderers.JSONRenderer):
+    """
+    JSONRenderer на orjson для компактного вывода. Отступы (Accept с
+    indent=) и типы, которые orjson кодирует иначе, идут через json.
+    Числа с плавающей точкой orjson пишет иначе (1e16, а не 1e+16) - для
+    ответов с ними рендерер не подходит.
+    """
+    options = (orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+               | orjson.OPT_PASSTHROUGH_DATACLASS)
+    default = staticmethod(encoders.JSONEncoder().default)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (data is None or self.ensure_ascii or not self.compact
+                or self.get_indent(accepted_media_type,
+                                   renderer_context or {}) is not None):
+            return super().render(data, accepted_media_type,
+                                  renderer_context)
+        return self.dumps(data)
+
+    def dumps(self, data):
+        try:
+            ret = orjson.dumps(data, default=self.default,
+                               option=self.options)
+        except orjson.JSONEncodeError:
+            return super().render(data)
+        # Как JSONRenderer: эти разделители ломают JavaScript.
+        return ret.replace('\u2028'.encode(), b'\\u2028').replace(
+            '\u2029'.encode(), b'\\u2029')
+
+    def stream(self, data, key='results'):
+        """
+        Те же байты, что dumps(data), частями по STREAM_CHUNK_SIZE:
+        строки списка data[key] кодируются по одной, целиком ответ
+        в памяти не собирается.
+        """
+        chunk = bytearray(b'{')
+        for index, (name, value) in enumerate(data.items()):
+            if index:
+                chunk += b','
+            chunk += self.dumps(name) + b':'
+            if name != key:
+                chunk += self.dumps(value)
+                continue
+            chunk += b'['
+            for row_index, row in enumerate(value):
+                if row_index:
+                    chunk += b','
+                chunk += self.dumps(row)
+                if len(chunk) >= STREAM_CHUNK_SIZE:
+                    yield bytes(chunk)
+                    chunk.clear()
+            chunk += b']'
+        chunk += b'}'
+        yield bytes(chunk)
+
+
+def plain(value):
+    if isinstance(value, datetime.datetime):
+        return DATETIME.to_representation(value)
+    return value
+
+
+def nested(relation, fields):
+    """
+    Вложенный сериализатор внешнего ключа по колонкам relation__field;
+    None, если ключ пуст (у связанной модели первое поле обязательно).
+    """
+    columns = [(field, f'{relation}__{field}') for field in fields]
+    first = columns[0][1]
+
+    def represent(row):
+        if row[first] is None:
+            return None
+        return {field: row[column] for field, column in columns}
+    return represent
+
+
+def many_values(model, name, ids, fields):
+    """
+    {id: [{field: value}, ...]} для связи name многие-ко-многим одним
+    запросом к промежуточной таблице, в порядке добавления связей.
+    """
+    field = model._meta.get_field(name)
+    source = field.m2m_field_name()
+    target = field.m2m_reverse_field_name()
+    grouped = {pk: [] for pk in ids}
+    rows = field.remote_field.through.objects.filter(
+        **{f'{source}_id__in': ids}).order_by('id').values_list(
+            f'{source}_id', *(f'{target}__{related}' for related in fields))
+    for pk, *values in rows:
+        grouped[pk].append(dict(zip(fields, values)))
+    return grouped
+
+
+class FastReadMixin(SparseFieldsMixin):
+    """
+    list/retrieve из values(). fast_many - поле ответа -> поля связанной
+    модели для связи многие-ко-многим, fast_representations - поле ответа
+    -> функция от строки values() для полей из нескольких колонок.
+    Остальные поля - одна колонка из sparse_fields как есть.
+    """
+    fast_many = {}
+    fast_representations = {}
+    renderer_classes = [
+        FastJSONRenderer if renderer is renderers.JSONRenderer else renderer
+        for renderer in api_settings.DEFAULT_RENDERER_CLASSES
+    ]
+
+    def get_renderers(self):
+        renderer_list = super().get_renderers()
+        if ENABLED:
+            return renderer_list
+        return [
+            renderers.JSONRenderer()
+            if isinstance(renderer, FastJSONRenderer) else renderer
+            for renderer in renderer_list
+        ]
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs)
+        if self.should_stream(response):
+            streaming = StreamingHttpResponse(
+                response.accepted_renderer.stream(response.data),
+                content_type=response.accepted_media_type)
+            # Content-Type у Response ещё по умолчанию: он ставится
+            # при рендеринге.
+            for header, value in response.items():
+                if header.lower() != 'content-type':
+                    streaming[header] = value
+            return streaming
+        return response
+
+    def should_stream(self, response):
+        """Большая страница списка в компактном JSON."""
+        renderer = getattr(response, 'accepted_renderer', None)
+        if (not ENABLED or self.action != 'list'
+                or response.status_code != 200
+                or not isinstance(renderer, FastJSONRenderer)
+                or not isinstance(response.data, dict)):
+            return False
+        if renderer.get_indent(response.accepted_media_type, {}) is not None:
+            return False
+        return len(response.data.get('results', ())) >= STREAMING_MIN_ROWS
+
+    def use_fast_path(self):
+        return ENABLED and self.request.method in ('GET', 'HEAD')
+
+    def fast_fields(self):
+        fields = self.get_sparse_fields()
+        return [name for name in self.sparse_fields
+                if fields is None or name in fields]
+
+    def fast_queryset(self, fields):
+        columns = dict.fromkeys(('id', *self.sparse_required))
+        for name in fields:
+            if name not in self.fast_many:
+                columns.update(dict.fromkeys(self.sparse_fields[name]))
+        queryset = self.filter_queryset(self.get_queryset())
+        return queryset.prefetch_related(None).values(*columns)
+
+    def fast_getter(self, name, many):
+        if name in many:
+            grouped = many[name]
+            return lambda row: grouped[row['id']]
+        if name in self.fast_representations:
+            return self.fast_representations[name]
+        column, = self.sparse_fields[name]
+        return lambda row: plain(row[column])
+
+    def fast_represent(self, rows, fields):
+        ids = [row['id'] for row in rows]
+        many = {
+            name: many_values(self.get_queryset().model, name, ids,
+                              self.fast_many[name])
+            for name in fields if name in self.fast_many
+        }
+        getters = [(name, self.fast_getter(name, many)) for name in fields]
+        return [{name: get(row) for name, get in getters} for row in rows]
+
+    def list(self, request, *args, **kwargs):
+        if not self.use_fast_path():
+            return super().list(request, *args, **kwargs)
+        fields = self.fast_fields()
+        queryset = self.fast_queryset(fields)
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            return Response(self.fast_represent(list(queryset), fields))
+        return self.get_paginated_response(
+            self.fast_represent(page, fields))
+
+    def retrieve(self, request, *args, **kwargs):
+        if not self.use_fast_path():
+            return super().retrieve(request, *args, **kwargs)
+        fields = self.fast_fields()
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        row = get_object_or_404(
+            self.fast_queryset(fields),
+            **{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        self.check_object_permissions(request, row)
+        return Response(self.fast_represent([row], fields)[0])
@@ -0,0 +1,110 @@
+"""
+Выборочные поля ответа: ?fields=id,name,rating оставляет только
+перечисленные поля, ?omit=description - все, кроме перечисленных.
+
+Вместе с ответом сужается и запрос: вьюсет описывает в sparse_fields,
+какие поля модели нужны каждому полю сериализатора, и queryset получает
+only() по ним, а select_related/prefetch_related - только для
+запрошенных связей.
+"""
+from django.db.models import ManyToManyField, Prefetch
+from rest_framework import exceptions
+
+FIELDS_PARAM = 'fields'
+OMIT_PARAM = 'omit'
+
+
+def split_names(value):
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+def requested_fields(request, available):
+    """
+    Имена полей ответа по ?fields=/?omit= или None, если ответ полный.
+    Неизвестное имя - ошибка 400, как у фильтров.
+    """
+    fields = request.query_params.get(FIELDS_PARAM)
+    omit = request.query_params.get(OMIT_PARAM)
+    if not fields and not omit:
+        return None
+    selected = split_names(fields) if fields else set(available)
+    omitted = split_names(omit or '')
+    for param, names in ((FIELDS_PARAM, selected), (OMIT_PARAM, omitted)):
+        unknown = names - set(available)
+        if unknown:
+            raise exceptions.ValidationError({
+                param: 'Неизвестные поля: {}. Доступны: {}.'.format(
+                    ', '.join(sorted(unknown)), ', '.join(available))
+            })
+    return selected - omitted
+
+
+def prune_queryset(queryset, columns):
+    """
+    Оставляет в queryset только поля columns. Путь через связь
+    ('author__username') добавляет select_related, имя поля многие-ко-многим
+    ('genre') или Prefetch - prefetch_related.
+    """
+    model = queryset.model
+    only, select, prefetch = [], [], []
+    for column in columns:
+        if isinstance(column, Prefetch):
+            prefetch.append(column)
+            continue
+        relation = column.split('__')[0]
+        if isinstance(model._meta.get_field(relation), ManyToManyField):
+            prefetch.append(relation)
+            continue
+        if relation != column:
+            # Внешний ключ нужен, чтобы пройти по связи.
+            select.append(relation)
+            only.append(relation)
+        only.append(column)
+    queryset = queryset.select_related(None).prefetch_related(None)
+    if select:
+        queryset = queryset.select_related(*select)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    return queryset.only(*only)
+
+
+class SparseFieldsMixin:
+    """
+    ?fields=/?omit= для чтения (sparse_actions). sparse_fields - поле
+    сериализатора -> поля модели для only(); порядок ключей - порядок
+    полей в ответе. Поля из sparse_required загружаются всегда (например,
+    ключ курсорной пагинации).
+    """
+    sparse_fields = {}
+    sparse_required = ()
+    sparse_actions = ('list', 'retrieve')
+
+    def get_sparse_fields(self):
+        if (self.action not in self.sparse_actions
+                or self.request.method not in ('GET', 'HEAD')):
+            return None
+        if not hasattr(self, '_sparse_fields'):
+            self._sparse_fields = requested_fields(
+                self.request, tuple(self.sparse_fields))
+        return self._sparse_fields
+
+    def filter_queryset(self, queryset):
+        # Не get_queryset: его переопределяют сами вьюсеты.
+        queryset = super().filter_queryset(queryset)
+        fields = self.get_sparse_fields()
+        if fields is None:
+            return queryset
+        columns = dict.fromkeys(self.sparse_required)
+        for name in self.sparse_fields:
+            if name in fields:
+                columns.update(dict.fromkeys(self.sparse_fields[name]))
+        return prune_queryset(queryset, columns)
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        fields = self.get_sparse_fields()
+        if fields is not None:
+            target = getattr(serializer, 'child', serializer)
+            for name in set(target.fields) - fields:
+                target.fields.pop(name)
+        return serializer
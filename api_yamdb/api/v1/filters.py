@@ -1,5 +1,16 @@
 import django_filters
-from reviews.models import Title
+from django.db.models import Count
+from reviews.models import Category, GenreTitle, Title
+from reviews.search import search_titles
+
+GENRE_MODES = (
+    ('any', 'Хотя бы один из жанров'),
+    ('all', 'Все перечисленные жанры'),
+)
+
+
+def split_slugs(value):
+    return sorted({slug.strip() for slug in value.split(',') if slug.strip()})
 
 
 class TitleFilter(django_filters.FilterSet):
@@ -7,11 +18,37 @@ class TitleFilter(django_filters.FilterSet):
         field_name='name', lookup_expr='contains')
     year = django_filters.NumberFilter(
         field_name='year', lookup_expr='exact')
-    genre = django_filters.CharFilter(
-        field_name='genre__slug', lookup_expr='contains')
-    category = django_filters.CharFilter(
-        field_name='category__slug', lookup_expr='contains')
+    genre = django_filters.CharFilter(method='filter_genre')
+    genre_mode = django_filters.ChoiceFilter(
+        choices=GENRE_MODES, method='filter_genre_mode')
+    category = django_filters.CharFilter(method='filter_category')
+    search = django_filters.CharFilter(method='filter_search')
 
     class Meta:
         model = Title
-        fields = ['name', 'year', 'genre', 'category']
+        fields = ['name', 'year', 'genre', 'genre_mode', 'category', 'search']
+
+    def filter_genre(self, queryset, name, value):
+        """
+        ?genre=drama,comedy - точное совпадение слагов. Полусоединение
+        с GenreTitle по индексу (genre, title) не размножает произведения.
+        При genre_mode=all нужны все жанры сразу.
+        """
+        slugs = split_slugs(value)
+        links = GenreTitle.objects.filter(genre__slug__in=slugs)
+        if self.form.cleaned_data.get('genre_mode') == 'all':
+            links = links.values('title_id').annotate(
+                genres=Count('genre_id', distinct=True),
+            ).filter(genres=len(slugs))
+        return queryset.filter(id__in=links.values('title_id'))
+
+    def filter_genre_mode(self, queryset, name, value):
+        return queryset
+
+    def filter_category(self, queryset, name, value):
+        """?category=movie,book - точное совпадение любого из слагов."""
+        categories = Category.objects.filter(slug__in=split_slugs(value))
+        return queryset.filter(category_id__in=categories.values('id'))
+
+    def filter_search(self, queryset, name, value):
+        return search_titles(queryset, value)
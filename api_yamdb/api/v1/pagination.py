@@ -0,0 +1,169 @@
+import base64
+import json
+from collections import OrderedDict
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (BasePagination, PageNumberPagination,
+                                       _positive_int)
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class PageSizePagination(PageNumberPagination):
+    """Постраничная пагинация с размером страницы из ?page_size=."""
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class KeysetPagination(BasePagination):
+    """
+    Курсорная пагинация по ключу (pub_date, id) от новых к старым.
+    Страница выбирается условием по ключу вместо OFFSET и без COUNT(*),
+    поэтому стоимость не растёт с глубиной, а новые записи не сдвигают
+    уже выданные страницы.
+    """
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = PageSizePagination.page_size_query_param
+    max_page_size = PageSizePagination.max_page_size
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param],
+                strict=True,
+                cutoff=self.max_page_size,
+            )
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor['r']
+
+        if self.cursor is not None:
+            pub_date, pk = self.cursor['p'], self.cursor['i']
+            if reverse:
+                queryset = queryset.filter(
+                    Q(pub_date__gt=pub_date) | Q(pub_date=pub_date, id__gt=pk))
+            else:
+                queryset = queryset.filter(
+                    Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, id__lt=pk))
+        if reverse:
+            queryset = queryset.order_by('pub_date', 'id')
+        else:
+            queryset = queryset.order_by('-pub_date', '-id')
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.cursor is not None
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            cursor['p'] = parse_datetime(cursor['p'])
+            cursor['i'] = int(cursor['i'])
+            cursor['r'] = bool(cursor.get('r'))
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        if cursor['p'] is None:
+            raise NotFound(self.invalid_cursor_message)
+        return cursor
+
+    def encode_cursor(self, obj, reverse):
+        # Страница - объекты моделей или строки values() (api.v1.fast).
+        if isinstance(obj, dict):
+            pub_date, pk = obj['pub_date'], obj['id']
+        else:
+            pub_date, pk = obj.pub_date, obj.id
+        cursor = {'p': pub_date.isoformat(), 'i': pk}
+        if reverse:
+            cursor['r'] = 1
+        encoded = base64.urlsafe_b64encode(json.dumps(cursor).encode())
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, encoded.decode())
+
+    def get_schema_operation_parameters(self, view):
+        return [{
+            'name': self.cursor_query_param,
+            'required': False,
+            'in': 'query',
+            'description': 'The pagination cursor value.',
+            'schema': {'type': 'string'},
+        }, {
+            'name': self.page_size_query_param,
+            'required': False,
+            'in': 'query',
+            'description': 'Number of results to return per page.',
+            'schema': {'type': 'integer'},
+        }]
+
+
+class PageNumberOrKeysetPagination(BasePagination):
+    """
+    По умолчанию - постраничная пагинация PageSizePagination (?page=).
+    С ?pagination=cursor (или при переходе по ссылке с ?cursor=)
+    используется KeysetPagination.
+    """
+    mode_query_param = 'pagination'
+    mode_cursor = 'cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if (params.get(self.mode_query_param) == self.mode_cursor
+                or KeysetPagination.cursor_query_param in params):
+            self.paginator = KeysetPagination()
+        else:
+            self.paginator = PageSizePagination()
+        return self.paginator.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.paginator.get_paginated_response(data)
+
+    def get_schema_operation_parameters(self, view):
+        return (
+            PageSizePagination().get_schema_operation_parameters(view)
+            + KeysetPagination().get_schema_operation_parameters(view)
+            + [{
+                'name': self.mode_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Set to "cursor" for keyset pagination.',
+                'schema': {'type': 'string', 'enum': [self.mode_cursor]},
+            }]
+        )
@@ -1,3 +1,4 @@
+from django.db.models import Q
 from rest_framework import exceptions, serializers, validators
 from reviews.models import Category, Comment, Genre, Review, Title, User
 
@@ -25,19 +26,29 @@ class UserSignupSerializer(serializers.ModelSerializer):
             raise exceptions.ValidationError(
                 {'username': ('Do not use "me" as username')})
 
-        user = User.objects.filter(username=attrs['username'],
-                                   email=attrs['email'])
-        if user.exists():
+        # Один запрос: не больше двух строк, совпавших по username или email.
+        users = User.objects.filter(
+            Q(username=attrs['username']) | Q(email=attrs['email']))[:2]
+        by_username = by_email = None
+        for user in users:
+            if user.username == attrs['username']:
+                by_username = user
+            if user.email == attrs['email']:
+                by_email = user
+
+        if by_username is not None and by_username is by_email:
+            attrs['user'] = by_username
             return super().validate(attrs)
 
-        if User.objects.filter(username=attrs['username']).exists():
+        if by_username is not None:
             raise exceptions.ValidationError(
                 {'username': 'This field must be unique.'})
 
-        if User.objects.filter(email=attrs['email']):
+        if by_email is not None:
             raise exceptions.ValidationError(
                 {'email': 'This field must be unique.'})
 
+        attrs['user'] = None
         return super().validate(attrs)
 
     class Meta:
@@ -90,7 +101,7 @@ class TokenRequestSerializer(serializers.Serializer):
 
     def validate(self, attrs):
         try:
-            User.objects.get(username=attrs['username'])
+            attrs['user'] = User.objects.get(username=attrs['username'])
         except User.DoesNotExist:
             raise exceptions.NotFound(f'User {attrs["username"]} not found')
 
@@ -127,6 +138,19 @@ class TitleListSerializer(serializers.ModelSerializer):
         model = Title
 
 
+class TitleStatsSerializer(serializers.ModelSerializer):
+    mean = serializers.FloatField(source='mean_score', read_only=True)
+    median = serializers.FloatField(source='median_score', read_only=True)
+    histogram = serializers.DictField(
+        source='score_histogram',
+        child=serializers.IntegerField(),
+        read_only=True)
+
+    class Meta:
+        fields = ('id', 'reviews_count', 'mean', 'median', 'histogram')
+        model = Title
+
+
 class TitleCreateSerializer(serializers.ModelSerializer):
     genre = serializers.SlugRelatedField(
         slug_field='slug',
@@ -166,19 +190,3 @@ class ReviewSerializer(serializers.ModelSerializer):
         fields = ('id', 'text', 'author', 'score', 'pub_date')
         model = Review
         lookup_field = 'id'
-
-    def validate(self, data):
-        title_id = self.context['view'].kwargs.get('title_id')
-        author = self.context.get('request').user
-        review = Review.objects.all().filter(
-            title_id=title_id,
-            author=author
-        )
-        if (
-            review.exists()
-            and self.context.get('request').method != 'PATCH'
-        ):
-            raise serializers.ValidationError(
-                'Можно оставлять только один отзыв!'
-            )
-        return data
@@ -1,36 +1,60 @@
-import secrets
-import string
 from http import HTTPStatus
 
-from django.contrib.auth import authenticate
-from django.core.mail import send_mail
-from django.db.models import Avg
-from django.shortcuts import get_object_or_404
+from core.outbox import enqueue_mail
+from django.db import IntegrityError, transaction
+from django.db.models import Prefetch
+from django.http import StreamingHttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
-from reviews.models import Category, Genre, Review, Title, User
+from reviews.models import (Category, Comment, Genre, GenreTitle, Review,
+                            Title, User, average_rating)
 from rest_framework import (exceptions, filters, permissions, views,
                             viewsets)
 from rest_framework.decorators import action
 from rest_framework.exceptions import MethodNotAllowed
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.generics import get_object_or_404
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework.viewsets import ModelViewSet
-from rest_framework_simplejwt.serializers import RefreshToken
-
+from users.confirmation import (CONFIRMATION_FIELDS, consume_code,
+                                issue_code)
+
+from . import export
+from .authentication import (get_access_token, get_author,
+                             get_user_instance)
+from .cache import ConditionalGetMixin, VersionedCacheMixin
+from .edge import EdgeCacheMixin
+from .fast import FastReadMixin, nested
+from .fields import SparseFieldsMixin
 from .filters import TitleFilter
+from .pagination import PageNumberOrKeysetPagination, PageSizePagination
 from .permissions import Everyone, IsAdminOrSuperuser, IsUser, IsModerator
 from .serializers import (CategorySerializer, CommentSerializer,
                           GenreSerializer, ReviewSerializer,
                           TitleCreateSerializer, TitleListSerializer,
+                          TitleStatsSerializer,
                           TokenRequestSerializer, UserSerializer,
                           UserSignupSerializer)
 
+ONE_REVIEW_MESSAGE = 'Можно оставлять только один отзыв!'
+
+# Жанры в порядке добавления - так же их собирает быстрое чтение.
+TITLE_GENRES = Prefetch('genre', queryset=Genre.objects.order_by(
+    'genretitle__id'))
+
 
-class CategoryViewSet(viewsets.ModelViewSet):
+def title_rating(row):
+    """Title.rating по строке values()."""
+    return average_rating(row['reviews_count'], row['score_sum'])
+
+
+class CategoryViewSet(EdgeCacheMixin, VersionedCacheMixin, FastReadMixin,
+                      viewsets.ModelViewSet):
     """Список категорий"""
+    cache_models = (Category,)
+    sparse_fields = {'name': ('name',), 'slug': ('slug',)}
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
-    pagination_class = PageNumberPagination
+    pagination_class = PageSizePagination
     permission_classes = [Everyone | IsAdminOrSuperuser]
     filter_backends = (filters.SearchFilter,)
     search_fields = ('name',)
@@ -41,11 +65,14 @@ class CategoryViewSet(viewsets.ModelViewSet):
         raise MethodNotAllowed("GET")
 
 
-class GenreViewSet(viewsets.ModelViewSet):
+class GenreViewSet(EdgeCacheMixin, VersionedCacheMixin, FastReadMixin,
+                   viewsets.ModelViewSet):
     """Список жанров"""
+    cache_models = (Genre,)
+    sparse_fields = {'name': ('name',), 'slug': ('slug',)}
     queryset = Genre.objects.all()
     serializer_class = GenreSerializer
-    pagination_class = PageNumberPagination
+    pagination_class = PageSizePagination
     permission_classes = [Everyone | IsAdminOrSuperuser]
     filter_backends = (filters.SearchFilter,)
     search_fields = ('name',)
@@ -56,10 +83,28 @@ class GenreViewSet(viewsets.ModelViewSet):
         raise MethodNotAllowed("GET")
 
 
-class TitleViewSet(viewsets.ModelViewSet):
+class TitleViewSet(EdgeCacheMixin, ConditionalGetMixin,
+                   VersionedCacheMixin, FastReadMixin,
+                   viewsets.ModelViewSet):
     """Список произведений"""
-    queryset = Title.objects.annotate(rating=Avg('reviews__score'))
-    pagination_class = PageNumberPagination
+    cache_models = (Title, GenreTitle, Genre, Category, Review)
+    sparse_fields = {
+        'id': ('id',),
+        'name': ('name',),
+        'year': ('year',),
+        'rating': Title.RATING_FIELDS,
+        'description': ('description',),
+        'genre': (TITLE_GENRES,),
+        'category': ('category__name', 'category__slug'),
+    }
+    fast_many = {'genre': ('name', 'slug')}
+    fast_representations = {
+        'rating': title_rating,
+        'category': nested('category', ('name', 'slug')),
+    }
+    queryset = Title.objects.select_related('category').prefetch_related(
+        TITLE_GENRES)
+    pagination_class = PageSizePagination
     permission_classes = [Everyone | IsAdminOrSuperuser]
     filter_backends = (DjangoFilterBackend,)
     filterset_class = TitleFilter
@@ -69,47 +114,125 @@ class TitleViewSet(viewsets.ModelViewSet):
             return TitleListSerializer
         return TitleCreateSerializer
 
-
-class ReviewViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=['GET'],
+            permission_classes=(IsAdminOrSuperuser,),
+            renderer_classes=(export.NDJSONRenderer, export.CSVRenderer))
+    def export(self, request):
+        """Весь каталог потоком NDJSON или CSV, ?since= - только изменения."""
+        since = export.parse_since(request.query_params.get('since'))
+        output_format = request.accepted_renderer.format
+        response = StreamingHttpResponse(
+            export.stream_export(output_format, since),
+            content_type=request.accepted_renderer.media_type)
+        response['Content-Disposition'] = (
+            f'attachment; filename="titles.{output_format}"')
+        return response
+
+    @action(detail=True, methods=['GET'])
+    def stats(self, request, pk=None):
+        """
+        Гистограмма оценок, средняя, медиана и количество отзывов - из
+        счётчиков произведения, без чтения отзывов.
+        """
+        title = get_object_or_404(
+            Title.objects.only(*Title.COUNTER_FIELDS), pk=pk)
+        return Response(TitleStatsSerializer(title).data)
+
+
+class ReviewViewSet(ConditionalGetMixin, FastReadMixin,
+                    viewsets.ModelViewSet):
+    cache_models = (Review, User)
+    sparse_fields = {
+        'id': ('id',),
+        'text': ('text',),
+        'author': ('author__username',),
+        'score': ('score',),
+        'pub_date': ('pub_date',),
+    }
+    # Ключ курсорной пагинации.
+    sparse_required = ('pub_date',)
     serializer_class = ReviewSerializer
     permission_classes = [Everyone | IsUser | IsModerator | IsAdminOrSuperuser]
-    pagination_class = PageNumberPagination
+    pagination_class = PageNumberOrKeysetPagination
     lookup_field = 'id'
 
     def get_queryset(self):
-        return Review.objects.all().filter(
+        return Review.objects.select_related('author').filter(
             title_id=self.kwargs.get('title_id'),
         ).order_by('id')
 
-    def perform_create(self, serializer):
-        title = get_object_or_404(Title, id=self.kwargs.get('title_id'))
-        serializer.save(author=self.request.user, title_id=title.id)
-
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        if not page and not Title.objects.filter(
+                id=self.kwargs.get('title_id')).exists():
+            # Пустая страница: отличаем произведение без отзывов от
+            # несуществующего.
+            raise exceptions.NotFound()
+        return page
 
-class CommentViewSet(viewsets.ModelViewSet):
+    def perform_create(self, serializer):
+        # Один INSERT без предварительных проверок: повторный отзыв
+        # отсекает ограничение unique_reviews, несуществующее произведение -
+        # внешний ключ. Внешние ключи проверяются отложенно, при фиксации,
+        # поэтому отзыв сохраняется в собственной транзакции.
+        title_id = self.kwargs.get('title_id')
+        try:
+            with transaction.atomic():
+                serializer.save(author=get_author(self.request.user),
+                                title_id=title_id)
+        except IntegrityError:
+            if not Title.objects.filter(id=title_id).exists():
+                raise exceptions.NotFound()
+            raise exceptions.ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [ONE_REVIEW_MESSAGE]})
+
+
+class CommentViewSet(ConditionalGetMixin, FastReadMixin,
+                     viewsets.ModelViewSet):
+    cache_models = (Review, Comment, User)
+    sparse_fields = {
+        'id': ('id',),
+        'text': ('text',),
+        'author': ('author__username',),
+        'pub_date': ('pub_date',),
+    }
+    sparse_required = ('pub_date',)
     serializer_class = CommentSerializer
     permission_classes = [Everyone | IsUser | IsModerator | IsAdminOrSuperuser]
-    pagination_class = PageNumberPagination
+    pagination_class = PageNumberOrKeysetPagination
     lookup_field = 'id'
 
     def get_queryset(self):
-        review = get_object_or_404(
-            Review,
+        # Один запрос по review_id с проверкой произведения через JOIN,
+        # без отдельной загрузки отзыва.
+        return Comment.objects.select_related('author').filter(
+            review_id=self.kwargs.get('review_id'),
+            review_id__title_id=self.kwargs.get('title_id'),
+        )
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        if not page:
+            # Пустая страница: отличаем отзыв без комментариев от
+            # несуществующей пары произведение/отзыв.
+            self.check_review()
+        return page
+
+    def check_review(self):
+        review = Review.objects.filter(
             id=self.kwargs.get('review_id'),
-            title=self.kwargs.get('title_id'),
+            title_id=self.kwargs.get('title_id'),
         )
-        return review.comments.all()
+        if not review.exists():
+            raise exceptions.NotFound()
 
     def perform_create(self, serializer):
-        review = get_object_or_404(
-            Review,
-            title=self.kwargs.get('title_id'),
-            id=self.kwargs.get('review_id')
-        )
-        serializer.save(author=self.request.user, review_id=review)
+        self.check_review()
+        serializer.save(author=get_author(self.request.user),
+                        review_id_id=self.kwargs.get('review_id'))
 
 
-class UserViewset(ModelViewSet):
+class UserViewset(SparseFieldsMixin, ModelViewSet):
     """
     GET: Получить список всех пользователей. Права доступа: Администратор
     POST: Добавить нового пользователя. Права доступа: Администратор
@@ -128,6 +251,10 @@ class UserViewset(ModelViewSet):
     """
     serializer_class = UserSerializer
     queryset = User.objects.all()
+    sparse_fields = {
+        name: (name,) for name in UserSerializer.Meta.fields
+    }
+    sparse_actions = ('list', 'retrieve', 'me')
     lookup_field = 'username'
     permission_classes = (IsAdminOrSuperuser, )
     filter_backends = (filters.SearchFilter,)
@@ -138,12 +265,14 @@ class UserViewset(ModelViewSet):
             methods=['GET', 'PATCH'],
             permission_classes=(permissions.IsAuthenticated, ))
     def me(self, request):
-        user = request.user
+        user = get_user_instance(request.user)
 
         if request.method == 'GET':
             serializer = self.get_serializer(user)
             return Response(serializer.data)
 
+        # Изменяем свежую копию, а не общий экземпляр из кэша пользователей.
+        user = User.objects.get(pk=user.pk)
         serializer = self.get_serializer(user, data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
         serializer.save(role=user.role)
@@ -167,29 +296,41 @@ class UserSignupView(views.APIView):
     permission_classes = (permissions.AllowAny, )
 
     def post(self, request):
-        serializer = UserSignupSerializer(data=request.data)
+        try:
+            serializer = self.register(request)
+        except IntegrityError:
+            # Параллельный запрос с тем же username или email успел создать
+            # пользователя между проверкой и вставкой: повторная проверка
+            # увидит его строку и ответит как обычно.
+            serializer = self.register(request)
+        return Response(serializer.data, status=HTTPStatus.OK)
 
+    def register(self, request):
+        serializer = UserSignupSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         username = serializer.validated_data['username']
         email = serializer.validated_data['email']
-        user, created = User.objects.get_or_create(username=username,
-                                                   email=email)
-
-        alphabet = string.ascii_letters + string.digits
-        password = ''.join(secrets.choice(alphabet) for i in range(20))
-
-        user.set_password(password)
-        user.save()
-
-        send_mail(
-            '"YAMDB". Registration confirmation',  # "Тема"
-            f'Usernsme: {username}, confirmation_code: {password}',  # "Текст"
-            None,
-            [f'{user.email}'],  # "Кому"
-            fail_silently=False,
-        )
-
-        return Response(serializer.data, status=HTTPStatus.OK)
+        user = serializer.validated_data['user']
+
+        # Письмо ставится в очередь в той же транзакции, что и код;
+        # отправляет его воркер send_outbox.
+        with transaction.atomic():
+            if user is None:
+                user = User(username=username, email=email)
+                user.set_unusable_password()
+                code = issue_code(user)
+                user.save(force_insert=True)
+            else:
+                code = issue_code(user)
+                user.save(update_fields=CONFIRMATION_FIELDS)
+
+            enqueue_mail(
+                '"YAMDB". Registration confirmation',  # "Тема"
+                f'Usernsme: {username}, confirmation_code: {code}',
+                None,
+                [f'{user.email}'],  # "Кому"
+            )
+        return serializer
 
 
 class GetTokenView(views.APIView):
@@ -205,14 +346,12 @@ class GetTokenView(views.APIView):
         data_serializer = TokenRequestSerializer(data=request.data)
 
         data_serializer.is_valid(raise_exception=True)
-        username = data_serializer.validated_data['username']
-        password = data_serializer.validated_data['confirmation_code']
-
-        user = authenticate(username=username, password=password)
+        user = data_serializer.validated_data['user']
+        code = data_serializer.validated_data['confirmation_code']
 
-        if user is not None:
-            token = RefreshToken.for_user(user)
-            response = {'token': str(token.access_token)}
+        # Код одноразовый и сверяется с HMAC, без бэкендов аутентификации.
+        if consume_code(user, code):
+            response = {'token': str(get_access_token(user))}
 
             return Response(response)
         raise exceptions.ValidationError('Check your confirmation_code')
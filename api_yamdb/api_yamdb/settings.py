@@ -33,6 +33,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.metrics.MetricsMiddleware',
+    'core.replicas.ReplicaMiddleware',
+    'core.compression.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -78,6 +81,73 @@ DATABASES = {
     }
 }
 
+# Реплики только для чтения (core.replicas): DB_REPLICA_HOSTS - хосты
+# через запятую, DB_REPLICA_NAMES - имена баз (для SQLite - пути к файлам).
+# Незаданное берётся из основной базы.
+DB_REPLICA_HOSTS = [
+    host for host in os.getenv('DB_REPLICA_HOSTS', '').split(',') if host]
+DB_REPLICA_NAMES = [
+    name for name in os.getenv('DB_REPLICA_NAMES', '').split(',') if name]
+DATABASE_REPLICAS = []
+for index in range(max(len(DB_REPLICA_HOSTS), len(DB_REPLICA_NAMES))):
+    alias = f'replica{index + 1}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'TEST': {'MIRROR': 'default'},
+    }
+    if index < len(DB_REPLICA_HOSTS):
+        DATABASES[alias]['HOST'] = DB_REPLICA_HOSTS[index]
+    if index < len(DB_REPLICA_NAMES):
+        DATABASES[alias]['NAME'] = DB_REPLICA_NAMES[index]
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['core.replicas.ReplicaRouter']
+
+# После записи клиент столько секунд читает с основной базы
+REPLICA_STICKY_SECONDS = 15
+REPLICA_HEALTH_CHECK_INTERVAL = 5
+REPLICA_MAX_LAG_SECONDS = 10
+
+
+# Cache
+# Локальный кэш для разработки и тестов. В продакшене нужен общий для всех
+# воркеров gunicorn бэкенд: infra/docker-compose.yaml задаёт
+# CACHE_BACKEND=django.core.cache.backends.memcached.PyMemcacheCache
+# и CACHE_LOCATION=memcached:11211.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', default=''),
+    }
+}
+
+# Кэш анонимных ответов api/v1 (titles, genres, categories)
+API_CACHE_ALIAS = 'default'
+API_CACHE_TIMEOUT = 60
+API_CACHE_LOCK_TIMEOUT = 5
+# Микрокэш nginx для тех же ответов (infra/nginx/default.conf): срок
+# хранения и адрес nginx, через который web обновляет записи после
+# изменений; без адреса записи просто истекают.
+API_EDGE_CACHE_TIMEOUT = 5
+API_EDGE_CACHE_REFRESH_URL = os.getenv('EDGE_CACHE_REFRESH_URL', default='')
+API_EDGE_CACHE_REFRESH_LIMIT = 100
+
+# Чтение list/retrieve в api/v1 через values() без сериализаторов
+# (api/v1/fast.py); ответ тот же
+API_FAST_SERIALIZATION = True
+# Страницы списков от стольких строк отдаются потоком
+API_STREAMING_MIN_ROWS = 50
+
+# Сжатие ответов api/v1 (core/compression.py): gzip или brotli
+COMPRESSION_MIN_SIZE = 1024
+COMPRESSION_PATHS = ('/api/v1/',)
+
+# Строк за одно чтение курсора в выгрузке /api/v1/titles/export/
+EXPORT_CHUNK_SIZE = 2000
+
 
 # Password validation
 
@@ -126,16 +196,24 @@ DEFAULT_FROM_EMAIL = 'admin@yamdb.com'
 
 EMAIL_FILE_PATH = ((BASE_DIR / 'sent_emails/'))
 
+# Очередь исходящей почты (core.outbox, воркер manage.py send_outbox)
+OUTBOX_BATCH_SIZE = 50
+OUTBOX_MAX_ATTEMPTS = 5
+OUTBOX_BACKOFF_SECONDS = 30
+OUTBOX_BACKOFF_MAX_SECONDS = 3600
+# Сколько секунд забранные воркером письма недоступны другим воркерам
+OUTBOX_CLAIM_SECONDS = 300
+
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
 
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.v1.authentication.ClaimsJWTAuthentication',
     ],
 
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'api.v1.pagination.PageSizePagination',
     'PAGE_SIZE': 10,
 }
 
@@ -144,4 +222,17 @@ SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=1),
     'AUTH_HEADER_TYPES': ('Bearer',),
     'USER_AUTHENTICATION_RULE': 'rest_framework_simplejwt.authentication.default_user_authentication_rule',
+    'TOKEN_USER_CLASS': 'api.v1.authentication.TokenPrincipal',
 }
+
+# Кэш пользователей в памяти процесса для ClaimsJWTAuthentication
+USER_CACHE_TTL = 60
+USER_CACHE_SIZE = 10000
+# Копии User.claims_valid_after; с локальным кэшем они хранятся в процессе
+# USER_CHANGED_LOCAL_TTL секунд - столько другие воркеры могут не видеть
+# изменения прав.
+USER_CHANGES_CACHE_ALIAS = 'default'
+USER_CHANGED_LOCAL_TTL = 5
+
+# Срок действия кода подтверждения из письма при регистрации, секунды
+CONFIRMATION_CODE_TTL = 24 * 60 * 60
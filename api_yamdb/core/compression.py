@@ -0,0 +1,117 @@
+"""
+Сжатие ответов api/v1 по Accept-Encoding: brotli, если модуль brotli
+установлен и клиент его принимает, иначе gzip.
+
+Обычные ответы сжимаются от COMPRESSION_MIN_SIZE байт, потоковые - всегда
+(размер заранее не известен), по частям. Сжатый ответ получает
+Vary: Accept-Encoding, а его ETag становится слабым: байты другие, данные
+те же, и If-None-Match с ним по-прежнему даёт 304.
+"""
+import gzip
+import io
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MIN_SIZE = getattr(settings, 'COMPRESSION_MIN_SIZE', 1024)
+PATHS = tuple(getattr(settings, 'COMPRESSION_PATHS', ('/api/v1/',)))
+GZIP_LEVEL = getattr(settings, 'COMPRESSION_GZIP_LEVEL', 6)
+# Быстрые уровни brotli: сжатие идёт на каждый запрос, а не заранее.
+BROTLI_QUALITY = getattr(settings, 'COMPRESSION_BROTLI_QUALITY', 5)
+
+
+def accepted_encodings(header):
+    """{кодировка: q} из Accept-Encoding."""
+    encodings = {}
+    for item in header.split(','):
+        coding, _, params = item.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        param, _, value = params.strip().partition('=')
+        if param.strip() == 'q':
+            try:
+                quality = float(value)
+            except ValueError:
+                quality = 0.0
+        encodings[coding] = quality
+    return encodings
+
+
+def choose_encoding(header):
+    encodings = accepted_encodings(header)
+    any_quality = encodings.get('*', 0.0)
+    candidates = ('br', 'gzip') if brotli is not None else ('gzip',)
+    for coding in candidates:
+        if encodings.get(coding, any_quality) > 0:
+            return coding
+    return None
+
+
+def compress(coding, content):
+    if coding == 'br':
+        return brotli.compress(content, quality=BROTLI_QUALITY)
+    return gzip.compress(content, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def compress_stream(coding, chunks):
+    """Сжимает поток по частям: каждая часть уходит клиенту сразу."""
+    if coding == 'br':
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        for chunk in chunks:
+            data = compressor.process(chunk) + compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
+        return
+    buffer = io.BytesIO()
+    with gzip.GzipFile(mode='wb', fileobj=buffer, mtime=0,
+                       compresslevel=GZIP_LEVEL) as compressor:
+        for chunk in chunks:
+            compressor.write(chunk)
+            compressor.flush()
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+class CompressionMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (not request.path.startswith(PATHS)
+                or response.has_header('Content-Encoding')):
+            return response
+        if not response.streaming and len(response.content) < MIN_SIZE:
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        coding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if coding is None:
+            return response
+
+        if response.streaming:
+            response.streaming_content = compress_stream(
+                coding, response.streaming_content)
+            del response['Content-Length']
+        else:
+            compressed = compress(coding, response.content)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = coding
+        return response
@@ -0,0 +1,32 @@
+import json
+
+from core import outbox
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Отправляет письма из очереди OutboxEmail.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int,
+                            default=outbox.BATCH_SIZE)
+        parser.add_argument('--interval', type=float, default=1.0,
+                            help='Пауза (с) при пустой очереди.')
+        parser.add_argument('--max-attempts', type=int,
+                            default=outbox.MAX_ATTEMPTS)
+        parser.add_argument('--once', action='store_true',
+                            help='Отправить одну пачку и завершиться.')
+        parser.add_argument('--stats', action='store_true',
+                            help='Вывести метрики очереди в JSON.')
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self.stdout.write(json.dumps(outbox.get_stats()))
+            return
+        outbox.run_worker(
+            batch_size=options['batch_size'],
+            interval=options['interval'],
+            once=options['once'],
+            max_attempts=options['max_attempts'],
+            stdout=self.stdout,
+        )
@@ -0,0 +1,168 @@
+"""
+Метрики Prometheus: MetricsMiddleware замеряет каждый запрос, метрики
+отдаёт представление metrics по адресу /metrics.
+
+Маршрут в метках - имя из resolver_match (titles-list, reviews-detail,
+admin:index), не путь: иначе у каждого id был бы свой временной ряд.
+
+При нескольких воркерах gunicorn каждый процесс пишет значения в файлы
+каталога PROMETHEUS_MULTIPROC_DIR, а /metrics складывает их по всем
+процессам (gunicorn.conf.py очищает каталог при старте и убирает файлы
+завершившихся воркеров). Без этой переменной метрики хранятся в памяти
+процесса.
+"""
+import functools
+import os
+import time
+
+from django.db import connections
+from django.http import HttpResponse
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY,
+                               CollectorRegistry, Counter, Gauge, Histogram,
+                               generate_latest, multiprocess)
+
+UNRESOLVED_ROUTE = 'unresolved'
+# Прочие методы сводятся к одному значению метки: число рядов ограничено.
+METHODS = frozenset(('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE',
+                     'OPTIONS'))
+OTHER_METHOD = 'other'
+
+LABELS = ('route', 'method')
+
+REQUEST_LATENCY = Histogram(
+    'yamdb_http_request_duration_seconds',
+    'Время обработки запроса.',
+    LABELS,
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0,
+             2.5, 5.0, 10.0),
+)
+REQUESTS = Counter(
+    'yamdb_http_requests',
+    'Запросы по коду ответа.',
+    LABELS + ('status',),
+)
+DB_QUERIES = Histogram(
+    'yamdb_http_request_db_queries',
+    'SQL-запросов на один HTTP-запрос.',
+    LABELS,
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100),
+)
+DB_TIME = Histogram(
+    'yamdb_http_request_db_duration_seconds',
+    'Суммарное время SQL-запросов одного HTTP-запроса.',
+    LABELS,
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0,
+             2.5),
+)
+RESPONSE_SIZE = Histogram(
+    'yamdb_http_response_size_bytes',
+    'Размер тела ответа (потоковые ответы не учитываются).',
+    LABELS,
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304),
+)
+IN_PROGRESS = Gauge(
+    'yamdb_http_requests_in_progress',
+    'Запросы, обрабатываемые сейчас.',
+    multiprocess_mode='livesum',
+)
+
+
+class QueryTimer:
+    """Обёртка execute для connection.execute_wrapper: число и время SQL."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.count += 1
+
+
+def route_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return UNRESOLVED_ROUTE
+    return match.view_name
+
+
+# labels() проверяет и приводит метки при каждом вызове; дочерние метрики
+# маршрута кэшируются, набор маршрутов, методов и кодов ответа конечен.
+@functools.lru_cache(maxsize=None)
+def route_metrics(route, method):
+    return (REQUEST_LATENCY.labels(route, method),
+            DB_QUERIES.labels(route, method),
+            DB_TIME.labels(route, method),
+            RESPONSE_SIZE.labels(route, method))
+
+
+@functools.lru_cache(maxsize=None)
+def status_counter(route, method, status):
+    return REQUESTS.labels(route, method, status)
+
+
+def counted(content, size):
+    """Отдаёт чанки потокового ответа, размер учитывается в конце."""
+    sent = 0
+    for chunk in content:
+        sent += len(chunk)
+        yield chunk
+    size.observe(sent)
+
+
+class MetricsMiddleware:
+    """Должен стоять первым в MIDDLEWARE, чтобы замерять весь запрос."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = QueryTimer()
+        # execute_wrapper() без контекстного менеджера: на каждый запрос
+        # это заметно дешевле.
+        wrapped = [connections[alias] for alias in connections]
+        for connection in wrapped:
+            connection.execute_wrappers.append(queries)
+        IN_PROGRESS.inc()
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            duration = time.perf_counter() - started
+            IN_PROGRESS.dec()
+            for connection in wrapped:
+                connection.execute_wrappers.remove(queries)
+
+        route = route_name(request)
+        method = request.method
+        if method not in METHODS:
+            method = OTHER_METHOD
+        latency, db_queries, db_time, size = route_metrics(route, method)
+        latency.observe(duration)
+        db_queries.observe(queries.count)
+        db_time.observe(queries.seconds)
+        if response.streaming:
+            response.streaming_content = counted(
+                response.streaming_content, size)
+        else:
+            size.observe(len(response.content))
+        status_counter(route, method, response.status_code).inc()
+        return response
+
+
+def get_registry():
+    if 'PROMETHEUS_MULTIPROC_DIR' not in os.environ:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def metrics(request):
+    """Метрики в текстовом формате Prometheus."""
+    return HttpResponse(generate_latest(get_registry()),
+                        content_type=CONTENT_TYPE_LATEST)
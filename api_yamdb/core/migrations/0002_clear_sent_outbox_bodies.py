@@ -0,0 +1,21 @@
+# Generated by Django 3.2 on 2026-10-18 22:10
+
+from django.db import migrations
+
+
+def clear_bodies(apps, schema_editor):
+    # В письмах коды подтверждения: у отправленных и окончательно
+    # не отправленных текст больше не нужен.
+    OutboxEmail = apps.get_model('core', 'OutboxEmail')
+    OutboxEmail.objects.filter(status__in=('sent', 'failed')).update(body='')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_outbox_email'),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_bodies, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 
 
 class AddNameModel(models.Model):
@@ -9,3 +10,39 @@ class AddNameModel(models.Model):
 
     class Meta:
         abstract = True
+
+
+class OutboxStatus(models.TextChoices):
+    PENDING = 'pending', 'Ожидает отправки'
+    SENT = 'sent', 'Отправлено'
+    FAILED = 'failed', 'Не отправлено'
+
+
+class OutboxEmail(models.Model):
+    """Письмо, ожидающее отправки воркером send_outbox."""
+    subject = models.CharField(max_length=998)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254, blank=True)
+    recipients = models.TextField(
+        help_text='Адреса получателей, по одному в строке')
+    status = models.CharField(
+        max_length=16,
+        choices=OutboxStatus.choices,
+        default=OutboxStatus.PENDING,
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        verbose_name = 'Исходящее письмо'
+        ordering = ['next_attempt_at', 'id']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'],
+                         name='outbox_status_next_idx'),
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.subject} -> {self.recipients}'
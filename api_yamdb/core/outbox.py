@@ -0,0 +1,167 @@
+"""
+Исходящая почта через таблицу OutboxEmail.
+Запрос только добавляет строку в своей транзакции, отправкой занимается
+отдельный процесс: python manage.py send_outbox. После отправки текст
+письма (в нём код подтверждения) стирается.
+"""
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import Avg, F, Max, Min
+from django.utils import timezone
+
+from .models import OutboxEmail, OutboxStatus
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = getattr(settings, 'OUTBOX_BATCH_SIZE', 50)
+MAX_ATTEMPTS = getattr(settings, 'OUTBOX_MAX_ATTEMPTS', 5)
+BACKOFF_SECONDS = getattr(settings, 'OUTBOX_BACKOFF_SECONDS', 30)
+BACKOFF_MAX_SECONDS = getattr(settings, 'OUTBOX_BACKOFF_MAX_SECONDS', 3600)
+CLAIM_SECONDS = getattr(settings, 'OUTBOX_CLAIM_SECONDS', 300)
+
+
+def enqueue_mail(subject, message, from_email, recipient_list):
+    """Аналог send_mail: ставит письмо в очередь вместо отправки."""
+    return OutboxEmail.objects.create(
+        subject=subject,
+        body=message,
+        from_email=from_email or '',
+        recipients='\n'.join(recipient_list),
+    )
+
+
+def backoff(attempts):
+    seconds = BACKOFF_SECONDS * 2 ** (attempts - 1)
+    return timedelta(seconds=min(seconds, BACKOFF_MAX_SECONDS))
+
+
+def claim_batch(batch_size=BATCH_SIZE):
+    """
+    Забирает пачку готовых к отправке писем. Попытка засчитывается сразу,
+    а next_attempt_at сдвигается на OUTBOX_CLAIM_SECONDS: пока воркер
+    отправляет, другие эти письма не возьмут, а если он упадёт - возьмут
+    после этого срока. Транзакция с блокировками фиксируется до отправки.
+    """
+    claimed_until = timezone.now() + timedelta(seconds=CLAIM_SECONDS)
+    with transaction.atomic():
+        batch = list(
+            OutboxEmail.objects.select_for_update(skip_locked=True).filter(
+                status=OutboxStatus.PENDING,
+                next_attempt_at__lte=timezone.now(),
+            )[:batch_size]
+        )
+        for email in batch:
+            email.attempts += 1
+            email.next_attempt_at = claimed_until
+        OutboxEmail.objects.bulk_update(
+            batch, ['attempts', 'next_attempt_at'])
+    return batch
+
+
+def record_failure(email, error, max_attempts):
+    email.last_error = repr(error)
+    if email.attempts >= max_attempts:
+        email.status = OutboxStatus.FAILED
+        # Код подтверждения из письма не храним дольше, чем нужно.
+        email.body = ''
+    else:
+        email.next_attempt_at = timezone.now() + backoff(email.attempts)
+    logger.warning('Outbox email %s failed: %r', email.id, error)
+
+
+def send_batch(batch_size=BATCH_SIZE, max_attempts=MAX_ATTEMPTS):
+    """
+    Отправляет одну пачку готовых к отправке писем через одно соединение.
+    Письма забираются с SKIP LOCKED (claim_batch), поэтому воркеров может
+    быть несколько; SMTP работает вне транзакции. Возвращает
+    (отправлено, ошибок).
+    """
+    batch = claim_batch(batch_size)
+    if not batch:
+        return 0, 0
+
+    done = 0
+    sent = 0
+    try:
+        with get_connection() as connection:
+            for email in batch:
+                try:
+                    EmailMessage(
+                        email.subject,
+                        email.body,
+                        email.from_email or None,
+                        email.recipients.split('\n'),
+                        connection=connection,
+                    ).send()
+                except Exception as error:
+                    record_failure(email, error, max_attempts)
+                else:
+                    sent += 1
+                    email.status = OutboxStatus.SENT
+                    email.sent_at = timezone.now()
+                    email.body = ''
+                done += 1
+    except Exception as error:
+        # Например, недоступен SMTP: неотправленным письмам пачки попытка
+        # засчитана, следующая - через backoff, а не на следующей итерации.
+        for email in batch[done:]:
+            record_failure(email, error, max_attempts)
+
+    OutboxEmail.objects.bulk_update(
+        batch,
+        ['status', 'last_error', 'next_attempt_at', 'sent_at', 'body'],
+    )
+    return sent, len(batch) - sent
+
+
+def get_stats(window=timedelta(minutes=5)):
+    """Глубина очереди и задержка отправки за последние window."""
+    now = timezone.now()
+    pending = OutboxEmail.objects.filter(status=OutboxStatus.PENDING)
+    oldest = pending.aggregate(oldest=Min('created_at'))['oldest']
+    latency = OutboxEmail.objects.filter(
+        status=OutboxStatus.SENT, sent_at__gte=now - window,
+    ).aggregate(avg=Avg(F('sent_at') - F('created_at')),
+                max=Max(F('sent_at') - F('created_at')))
+    return {
+        'queue_depth': pending.count(),
+        'oldest_pending_seconds': (
+            (now - oldest).total_seconds() if oldest else 0.0),
+        'failed_total': OutboxEmail.objects.filter(
+            status=OutboxStatus.FAILED).count(),
+        'send_latency_avg_seconds': _seconds(latency['avg']),
+        'send_latency_max_seconds': _seconds(latency['max']),
+    }
+
+
+def _seconds(value):
+    return value.total_seconds() if value is not None else 0.0
+
+
+def run_worker(batch_size=BATCH_SIZE, interval=1.0, once=False,
+               max_attempts=MAX_ATTEMPTS, stdout=None):
+    """Разбирает очередь пачками; при пустой очереди ждёт interval."""
+    while True:
+        started = time.monotonic()
+        try:
+            sent, failed = send_batch(batch_size, max_attempts)
+        except Exception:
+            # Например, недоступна база: пачка будет повторена.
+            logger.exception('Outbox batch failed')
+            if once:
+                raise
+            time.sleep(interval)
+            continue
+        if (sent or failed) and stdout is not None:
+            stdout.write(
+                f'sent={sent} failed={failed} '
+                f'batch_seconds={time.monotonic() - started:.3f}')
+        if once:
+            return
+        if not sent and not failed:
+            time.sleep(interval)
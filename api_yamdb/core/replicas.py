@@ -0,0 +1,182 @@
+"""
+Чтение с реплик базы данных.
+
+GET/HEAD/OPTIONS-запросы к вьюсетам api/v1 читают с реплики из
+DATABASE_REPLICAS (по кругу, только здоровые), всё остальное - с основной
+базы. Запись всегда идёт в основную базу, и после неё запрос дочитывает
+оттуда же.
+
+Чтобы клиент видел свои изменения, его запросы после записи ещё
+REPLICA_STICKY_SECONDS читают с основной базы. Клиент определяется по
+заголовку Authorization (анонимы ничего не пишут), отметка хранится
+в кэше Django - в продакшене он должен быть общим для воркеров.
+"""
+import contextlib
+import contextvars
+import hashlib
+import itertools
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+REPLICAS = tuple(getattr(settings, 'DATABASE_REPLICAS', ()))
+STICKY_SECONDS = getattr(settings, 'REPLICA_STICKY_SECONDS', 15)
+HEALTH_CHECK_INTERVAL = getattr(settings, 'REPLICA_HEALTH_CHECK_INTERVAL', 5)
+MAX_LAG_SECONDS = getattr(settings, 'REPLICA_MAX_LAG_SECONDS', 10)
+
+SAFE_METHODS = frozenset(('GET', 'HEAD', 'OPTIONS'))
+
+# Отставание реплики PostgreSQL; 0, если всё полученное уже применено
+# (и на основной базе, где обе функции возвращают NULL).
+LAG_SQL = '''
+    SELECT CASE
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM
+                      now() - pg_last_xact_replay_timestamp()), 0)
+    END
+'''
+
+
+class Route:
+    """Куда читает текущий запрос."""
+
+    def __init__(self, replica=False):
+        self.replica = replica
+        self.alias = None
+        self.wrote = False
+
+    def db_for_read(self):
+        if not self.replica or self.wrote:
+            return DEFAULT_DB_ALIAS
+        if self.alias is None:
+            # Реплика выбирается один раз: COUNT и страница читаются
+            # из одного снимка.
+            self.alias = pick_replica()
+        return self.alias
+
+
+_route = contextvars.ContextVar('db_route', default=None)
+_replicas = itertools.cycle(REPLICAS)
+_health = {}
+
+
+def check_replica(alias):
+    """Реплика доступна и отстаёт не больше MAX_LAG_SECONDS."""
+    connection = connections[alias]
+    try:
+        connection.ensure_connection()
+        if connection.vendor != 'postgresql':
+            return True
+        with connection.cursor() as cursor:
+            cursor.execute(LAG_SQL)
+            lag, = cursor.fetchone()
+    except DatabaseError:
+        return False
+    return lag <= MAX_LAG_SECONDS
+
+
+def is_healthy(alias):
+    now = time.monotonic()
+    checked = _health.get(alias)
+    if checked is not None and now - checked[1] < HEALTH_CHECK_INTERVAL:
+        return checked[0]
+    healthy = check_replica(alias)
+    _health[alias] = (healthy, now)
+    return healthy
+
+
+def pick_replica():
+    """Следующая здоровая реплика или основная база, если таких нет."""
+    for _ in REPLICAS:
+        alias = next(_replicas)
+        if is_healthy(alias):
+            return alias
+    return DEFAULT_DB_ALIAS
+
+
+@contextlib.contextmanager
+def use_primary():
+    """Читать с основной базы до конца блока."""
+    route = _route.get()
+    if route is None:
+        yield
+        return
+    replica, route.replica = route.replica, False
+    try:
+        yield
+    finally:
+        route.replica = replica
+
+
+def use_primary_if_changed_since(changed_at):
+    """
+    Данные менялись недавно (changed_at - время в секундах): реплика могла
+    ещё не догнать основную базу, поэтому читаем с основной.
+    """
+    if time.time() - changed_at < STICKY_SECONDS:
+        return use_primary()
+    return contextlib.nullcontext()
+
+
+def sticky_key(request):
+    authorization = request.META.get('HTTP_AUTHORIZATION')
+    if not authorization:
+        return None
+    digest = hashlib.sha256(authorization.encode()).hexdigest()
+    return f'db-sticky:{digest}'
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        route = _route.get()
+        if route is None:
+            return DEFAULT_DB_ALIAS
+        return route.db_for_read()
+
+    def db_for_write(self, model, **hints):
+        route = _route.get()
+        if route is not None:
+            route.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики - копии основной базы: объекты из них можно связывать.
+        databases = {DEFAULT_DB_ALIAS, *REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Схема реплик приходит с репликацией.
+        return db not in REPLICAS
+
+
+class ReplicaMiddleware:
+    """Выбирает базу для чтения на время запроса."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        route = Route()
+        token = _route.set(route)
+        try:
+            response = self.get_response(request)
+        finally:
+            _route.reset(token)
+        if route.wrote:
+            key = sticky_key(request)
+            if key is not None:
+                cache.set(key, True, timeout=STICKY_SECONDS)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # У вьюсетов DRF as_view() сохраняет actions.
+        if (REPLICAS and request.method in SAFE_METHODS
+                and getattr(view_func, 'actions', None) is not None
+                and request.path.startswith('/api/v1/')):
+            key = sticky_key(request)
+            _route.get().replica = key is None or cache.get(key) is None
@@ -0,0 +1,21 @@
+"""
+Настройки gunicorn: подхватываются автоматически из рабочего каталога.
+Готовят каталог PROMETHEUS_MULTIPROC_DIR для метрик core.metrics.
+"""
+import os
+import shutil
+
+
+def on_starting(server):
+    # Файлы прошлого запуска исказили бы счётчики.
+    directory = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if directory:
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory)
+
+
+def child_exit(server, worker):
+    # Запросы в обработке у завершившегося воркера больше не учитываются.
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
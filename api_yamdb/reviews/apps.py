@@ -1,6 +1,23 @@
 from django.apps import AppConfig
+from django.db import connections
+from django.db.models.signals import post_migrate
 
 
 class ReviewsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'reviews'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+
+        post_migrate.connect(install_title_search, sender=self)
+
+
+def install_title_search(sender, using, plan=None, **kwargs):
+    from . import search
+
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        tables = connection.introspection.table_names(cursor)
+    if search.TITLE_TABLE in tables:
+        search.install(connection)
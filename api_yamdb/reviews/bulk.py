@@ -0,0 +1,159 @@
+"""
+Массовая вставка строк: пачками через COPY на PostgreSQL и bulk_create
+или executemany на остальных СУБД. Используется загрузкой CSV
+(scripts/load.py) и генератором данных (reviews.synthetic).
+"""
+import contextlib
+import io
+from itertools import islice
+
+from django.core.management.color import no_style
+from django.db import connection
+from users.models import User
+
+from .models import Category, Comment, Genre, GenreTitle, Review, Title
+
+
+def user_from_record(record):
+    return User(id=record[0], username=record[4], email=record[10],
+                role=record[12])
+
+
+def category_from_record(record):
+    return Category(id=record[0], name=record[1], slug=record[2])
+
+
+def genre_from_record(record):
+    return Genre(id=record[0], name=record[1], slug=record[2])
+
+
+def title_from_record(record):
+    return Title(id=record[0], name=record[1], year=record[2],
+                 category_id=record[4] or None)
+
+
+def genre_title_from_record(record):
+    return GenreTitle(id=record[0], genre_id=record[1], title_id=record[2])
+
+
+def review_from_record(record):
+    return Review(id=record[0], text=record[1], score=record[2],
+                  pub_date=record[3], author_id=record[4],
+                  title_id=record[5])
+
+
+def comment_from_record(record):
+    return Comment(id=record[0], text=record[1], pub_date=record[2],
+                   author_id=record[3], review_id_id=record[4])
+
+
+def batches(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def insert_batch(model, objs):
+    if connection.vendor == 'postgresql':
+        copy_batch(model, objs)
+    else:
+        model.objects.bulk_create(objs)
+
+
+def copy_batch(model, objs):
+    """Вставляет пачку объектов через COPY ... FROM STDIN."""
+    fields = model._meta.concrete_fields
+    rows = (
+        [field.get_db_prep_save(field.pre_save(obj, True), connection)
+         for field in fields]
+        for obj in objs
+    )
+    copy_rows(model, [field.column for field in fields], rows)
+
+
+def insert_rows(model, columns, rows):
+    """
+    Вставляет готовые строки значений в колонки columns, минуя модели:
+    COPY на PostgreSQL, executemany на остальных СУБД.
+    """
+    if connection.vendor == 'postgresql':
+        copy_rows(model, columns, rows)
+        return
+    quote_name = connection.ops.quote_name
+    placeholders = ', '.join(['%s'] * len(columns))
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT INTO {quote_name(model._meta.db_table)} '
+            f'({", ".join(map(quote_name, columns))}) '
+            f'VALUES ({placeholders})',
+            rows,
+        )
+
+
+def copy_rows(model, columns, rows):
+    buffer = io.StringIO()
+    for values in rows:
+        buffer.write('\t'.join(map(copy_value, values)))
+        buffer.write('\n')
+    buffer.seek(0)
+    quote_name = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.copy_expert(
+            f'COPY {quote_name(model._meta.db_table)} '
+            f'({", ".join(map(quote_name, columns))}) FROM STDIN',
+            buffer,
+        )
+
+
+@contextlib.contextmanager
+def without_indexes(model):
+    """
+    Удаляет вторичные индексы таблицы на время массовой вставки и строит
+    их заново в конце: построить индекс по готовым данным дешевле, чем
+    обновлять его на каждой строке. Индексы ограничений (первичный ключ,
+    уникальность) остаются и проверяются при вставке.
+    Вызывать внутри транзакции.
+    """
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                'SELECT indexname, indexdef FROM pg_indexes '
+                'WHERE tablename = %s AND indexname NOT IN ('
+                '  SELECT conname FROM pg_constraint'
+                '  WHERE conrelid = %s::regclass)',
+                [table, connection.ops.quote_name(table)])
+        elif connection.vendor == 'sqlite':
+            cursor.execute(
+                "SELECT name, sql FROM sqlite_master WHERE type = 'index' "
+                "AND tbl_name = %s AND sql IS NOT NULL "
+                "AND sql NOT LIKE 'CREATE UNIQUE%%'", [table])
+        else:
+            yield
+            return
+        indexes = cursor.fetchall()
+        for name, _ in indexes:
+            cursor.execute(f'DROP INDEX {connection.ops.quote_name(name)}')
+    yield
+    with connection.cursor() as cursor:
+        for _, definition in indexes:
+            cursor.execute(definition)
+
+
+def copy_value(value):
+    """Значение в текстовом формате COPY."""
+    if value is None:
+        return '\\N'
+    return (str(value).replace('\\', '\\\\').replace('\t', '\\t')
+            .replace('\n', '\\n').replace('\r', '\\r'))
+
+
+def reset_sequence(model):
+    """Сдвигает последовательность id после вставки с явными id."""
+    statements = connection.ops.sequence_reset_sql(no_style(), [model])
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
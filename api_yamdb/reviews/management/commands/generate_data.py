@@ -0,0 +1,76 @@
+from api.v1.cache import bump_all_versions
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max
+from reviews.models import Category, Comment, Genre, GenreTitle, Review, Title
+from reviews.synthetic import DatasetGenerator, write_csv, write_database
+from scripts.unload import fast_delete_all
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = ('Генерирует детерминированный синтетический набор данных '
+            'заданного размера и пишет его в базу или, с --csv, в CSV '
+            'для scripts/load.py.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--titles', type=int, default=1000)
+        parser.add_argument('--genres', type=int, default=20)
+        parser.add_argument('--categories', type=int, default=5)
+        parser.add_argument('--reviews', type=int, default=10000,
+                            help='Всего отзывов (не больше users * titles).')
+        parser.add_argument('--comments', type=int, default=20000,
+                            help='Комментариев примерно столько же.')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--zipf', type=float, default=1.1,
+                            help='Показатель закона Ципфа для популярности.')
+        parser.add_argument('--genres-per-title', type=float, default=2.0,
+                            help='Среднее число жанров у произведения.')
+        parser.add_argument('--days', type=int, default=3 * 365,
+                            help='Окно дат публикации в днях.')
+        parser.add_argument('--batch-size', type=int, default=10000)
+        parser.add_argument('--csv', metavar='DIR',
+                            help='Записать CSV в каталог вместо базы.')
+        parser.add_argument('--clear', action='store_true',
+                            help='Сначала удалить данные, кроме '
+                                 'суперпользователей.')
+
+    def handle(self, *args, **options):
+        params = {
+            name: options[name]
+            for name in ('users', 'titles', 'genres', 'categories',
+                         'reviews', 'comments', 'seed', 'zipf',
+                         'genres_per_title', 'days')
+        }
+        if options['csv']:
+            write_csv(DatasetGenerator(**params), options['csv'],
+                      self.report)
+            return
+
+        if options['clear']:
+            fast_delete_all()
+        elif self.has_data():
+            raise CommandError(
+                'База не пуста: запустите с --clear, чтобы заменить данные.')
+        last_user_id = User.objects.aggregate(last=Max('id'))['last'] or 0
+        generator = DatasetGenerator(first_user_id=last_user_id + 1,
+                                     **params)
+        write_database(generator, options['batch_size'], self.report)
+        # Сигналы не отправлялись: сбрасываем кэш ответов api.
+        bump_all_versions()
+
+    @staticmethod
+    def has_data():
+        return (
+            User.objects.exclude(is_superuser=True).exists()
+            or any(model.objects.exists() for model in (
+                Category, Genre, Title, GenreTitle, Review, Comment))
+        )
+
+    def report(self, table, rows, elapsed):
+        if elapsed is None:
+            self.stdout.write(f'{table}: {rows} строк')
+            return
+        self.stdout.write(
+            f'{table}: {rows} строк за {elapsed:.2f} с '
+            f'({rows / elapsed if elapsed else rows:.0f} строк/с)')
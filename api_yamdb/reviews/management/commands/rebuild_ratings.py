@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand, CommandError
+from reviews.models import Title
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает количество отзывов, сумму и гистограмму оценок '
+            'произведений одним проходом по отзывам. С --check только '
+            'проверяет, что сохранённые значения верны.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Не изменять данные, завершиться с ошибкой при расхождении.',
+        )
+
+    def handle(self, *args, **options):
+        if not options['check']:
+            updated = Title.objects.rebuild_rating()
+            self.stdout.write(
+                self.style.SUCCESS(f'Пересчитано произведений: {updated}'))
+            return
+
+        errors = 0
+        for title_id, stored, actual in self.compare():
+            if stored != actual:
+                errors += 1
+                self.stdout.write(
+                    f'Title {title_id}: сохранено {self.format(stored)}, '
+                    f'фактически {self.format(actual)}')
+        if errors:
+            raise CommandError(f'Расхождения в рейтинге: {errors}')
+        self.stdout.write(self.style.SUCCESS('Рейтинги корректны'))
+
+    @staticmethod
+    def compare():
+        """
+        (id, сохранённые счётчики, фактические) для каждого произведения:
+        оба потока упорядочены по id и сливаются без загрузки в память.
+        """
+        fields = Title.COUNTER_FIELDS
+        zero = (0,) * len(fields)
+        actual = Title.objects.actual_counters().order_by(
+            'title_id').values_list('title_id', *fields).iterator()
+        stored = Title.objects.order_by('pk').values_list(
+            'pk', *fields).iterator()
+        row = next(actual, None)
+        for title_id, *counters in stored:
+            while row is not None and row[0] < title_id:
+                row = next(actual, None)
+            if row is not None and row[0] == title_id:
+                yield title_id, tuple(counters), row[1:]
+            else:
+                yield title_id, tuple(counters), zero
+
+    @staticmethod
+    def format(counters):
+        count, total, *histogram = counters
+        return f'{count}/{total} {histogram}'
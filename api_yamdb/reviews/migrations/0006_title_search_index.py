@@ -0,0 +1,24 @@
+from django.db import migrations
+
+
+def install_search(apps, schema_editor):
+    from reviews import search
+
+    search.install(schema_editor.connection)
+
+
+def uninstall_search(apps, schema_editor):
+    from reviews import search
+
+    search.uninstall(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0005_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search, uninstall_search),
+    ]
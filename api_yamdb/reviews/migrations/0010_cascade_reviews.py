@@ -0,0 +1,26 @@
+# Generated by Django 3.2 on 2026-10-18 22:00
+
+from django.conf import settings
+from django.db import migrations, models
+import reviews.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('reviews', '0009_title_score_histogram'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='review',
+            name='author',
+            field=models.ForeignKey(on_delete=reviews.models.cascade_reviews, related_name='reviews', to=settings.AUTH_USER_MODEL, verbose_name='Автор отзыва'),
+        ),
+        migrations.AlterField(
+            model_name='review',
+            name='title',
+            field=models.ForeignKey(on_delete=reviews.models.cascade_reviews, related_name='reviews', to='reviews.title', verbose_name='ID произведения'),
+        ),
+    ]
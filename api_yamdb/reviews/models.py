@@ -1,10 +1,24 @@
+import itertools
+
 from core.models import AddNameModel
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import models, router, transaction
+from django.db.models import Count, Q, Sum
 from users.models import User
 
 from .validators import validate_year
 
+SCORES = range(1, 11)
+# Гистограмма оценок произведения: количество отзывов с каждой оценкой.
+SCORE_COUNT_FIELDS = tuple(f'score_{score}_count' for score in SCORES)
+
+
+def average_rating(reviews_count, score_sum):
+    """Средняя оценка, как раньше давал Avg('reviews__score')."""
+    if not reviews_count:
+        return None
+    return score_sum // reviews_count
+
 
 class Category(AddNameModel):
     slug = models.SlugField(unique=True, max_length=50)
@@ -26,7 +40,43 @@ class Genre(AddNameModel):
         return f'{self.name} {self.slug}'
 
 
+class TitleQuerySet(models.QuerySet):
+
+    def actual_counters(self):
+        """
+        Фактические счётчики произведений, у которых есть отзывы, одним
+        проходом по отзывам с группировкой: строки с title_id и полями
+        Title.COUNTER_FIELDS.
+        """
+        histogram = {
+            field: Count('id', filter=Q(score=score))
+            for score, field in zip(SCORES, SCORE_COUNT_FIELDS)
+        }
+        return Review.objects.filter(
+            title__in=self.order_by().values('pk'),
+        ).order_by().values('title_id').annotate(
+            reviews_count=Count('id'), score_sum=Sum('score'), **histogram)
+
+    def rebuild_rating(self, batch_size=1000):
+        """Пересчитывает счётчики отзывов и гистограммы оценок."""
+        with transaction.atomic():
+            # UPDATE блокирует строки произведений до конца транзакции:
+            # отзыв, который ещё не виден группировке, сдвинет счётчики
+            # уже после пересчёта.
+            updated = self.update(**dict.fromkeys(Title.COUNTER_FIELDS, 0))
+            rows = self.actual_counters().iterator()
+            while True:
+                batch = [Title(pk=row.pop('title_id'), **row)
+                         for row in itertools.islice(rows, batch_size)]
+                if not batch:
+                    return updated
+                Title.objects.bulk_update(batch, Title.COUNTER_FIELDS)
+
+
 class Title(AddNameModel):
+    RATING_FIELDS = ('reviews_count', 'score_sum')
+    COUNTER_FIELDS = RATING_FIELDS + SCORE_COUNT_FIELDS
+
     year = models.PositiveSmallIntegerField(validators=[validate_year])
     description = models.TextField(
         verbose_name='Описание произведения',
@@ -47,25 +97,134 @@ class Title(AddNameModel):
         blank=True,
         null=True,
     )
+    reviews_count = models.PositiveIntegerField(
+        verbose_name='Количество отзывов',
+        default=0,
+        editable=False,
+    )
+    score_sum = models.PositiveIntegerField(
+        verbose_name='Сумма оценок',
+        default=0,
+        editable=False,
+    )
+    # Меняется и вместе с рейтингом, жанрами и названием категории:
+    # по нему выгрузка отдаёт изменения (?since=).
+    updated_at = models.DateTimeField(
+        verbose_name='Время изменения',
+        auto_now=True,
+        db_index=True,
+    )
+
+    objects = TitleQuerySet.as_manager()
 
     def __str__(self) -> str:
         return self.name
 
+    @property
+    def rating(self):
+        return average_rating(self.reviews_count, self.score_sum)
+
+    @property
+    def score_histogram(self):
+        """{оценка: количество отзывов с ней}."""
+        return {score: getattr(self, field)
+                for score, field in zip(SCORES, SCORE_COUNT_FIELDS)}
+
+    @property
+    def mean_score(self):
+        if not self.reviews_count:
+            return None
+        return self.score_sum / self.reviews_count
+
+    @property
+    def median_score(self):
+        """Медиана оценок по гистограмме, без чтения отзывов."""
+        if not self.reviews_count:
+            return None
+        # Номера средних отзывов в упорядоченном списке оценок: при чётном
+        # количестве их два, медиана - среднее их оценок.
+        low, high = (self.reviews_count - 1) // 2, self.reviews_count // 2
+        middle = []
+        seen = 0
+        for score, count in self.score_histogram.items():
+            seen += count
+            while len(middle) < 2 and (low, high)[len(middle)] < seen:
+                middle.append(score)
+        return sum(middle) / 2
+
+    def save(self, *args, **kwargs):
+        # Счётчики меняются только атомарными UPDATE из reviews.signals,
+        # поэтому при редактировании произведения их не перезаписываем.
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
     class Meta:
         verbose_name = 'Произведение'
         ordering = ['-year']
 
 
+for score, field in zip(SCORES, SCORE_COUNT_FIELDS):
+    Title.add_to_class(field, models.PositiveIntegerField(
+        verbose_name=f'Отзывов с оценкой {score}',
+        default=0,
+        editable=False,
+    ))
+
+
+class CascadedReviews:
+    """
+    Отзывы удаляемого автора из одного пакета каскада. Строки блокируются
+    одним запросом, а счётчики сдвигаются одним UPDATE на произведение
+    после удаления последнего отзыва пакета (reviews.signals).
+    """
+
+    def __init__(self, reviews):
+        self.ids = [review.pk for review in reviews]
+        self.pending = len(self.ids)
+        # Произведение -> оценки заблокированных строк.
+        self.scores = None
+
+    def lock(self, using):
+        if self.scores is not None:
+            return
+        self.scores = {}
+        rows = Review._base_manager.using(using).select_for_update().filter(
+            pk__in=self.ids).values_list('title_id', 'score')
+        for title_id, score in rows:
+            self.scores.setdefault(title_id, []).append(score)
+
+
+def cascade_reviews(collector, field, sub_objs, using):
+    """
+    CASCADE для внешних ключей отзыва. У отзывов удаляемого произведения
+    счётчики не сдвигаются: они удаляются вместе с ним. Отзывы удаляемого
+    автора сдвигают счётчики по произведениям разом (CascadedReviews).
+    """
+    if field.name == 'title':
+        for review in sub_objs:
+            review._title_deleted = True
+    else:
+        group = CascadedReviews(sub_objs)
+        for review in sub_objs:
+            review._cascaded = group
+    models.CASCADE(collector, field, sub_objs, using)
+
+
 class Review(models.Model):
     author = models.ForeignKey(
         User,
-        on_delete=models.CASCADE,
+        on_delete=cascade_reviews,
         related_name='reviews',
         verbose_name='Автор отзыва',
     )
     title = models.ForeignKey(
         Title,
-        on_delete=models.CASCADE,
+        on_delete=cascade_reviews,
         related_name='reviews',
         verbose_name='ID произведения',
     )
@@ -88,6 +247,37 @@ class Review(models.Model):
     def __str__(self) -> str:
         return self.text
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_rating_state()
+        return instance
+
+    def remember_rating_state(self):
+        """Запоминает оценку и произведение для пересчёта рейтинга."""
+        self._loaded_score = self.__dict__.get('score')
+        self._loaded_title_id = self.__dict__.get('title_id')
+
+    def lock_rating_state(self, using=None):
+        """
+        Блокирует строку отзыва до конца транзакции и берёт оценку и
+        произведение из неё, а не из загруженного ранее экземпляра: иначе
+        две правки одного отзыва сдвинули бы счётчики от одной и той же
+        старой оценки. Возвращает False, если строки уже нет.
+        """
+        using = using or router.db_for_write(type(self), instance=self)
+        row = type(self)._base_manager.using(using).select_for_update(
+        ).filter(pk=self.pk).values_list('score', 'title_id').first()
+        self._loaded_score, self._loaded_title_id = row or (None, None)
+        return row is not None
+
+    def save(self, *args, **kwargs):
+        # Отзыв и счётчики произведения сохраняются в одной транзакции.
+        with transaction.atomic(using=kwargs.get('using')):
+            if not self._state.adding and self.pk is not None:
+                self.lock_rating_state(kwargs.get('using'))
+            super().save(*args, **kwargs)
+
     class Meta:
         constraints = [
             models.UniqueConstraint(
@@ -95,6 +285,11 @@ class Review(models.Model):
                 name='unique_reviews'
             )
         ]
+        indexes = [
+            # Ключ курсорной пагинации отзывов произведения.
+            models.Index(fields=['title', 'pub_date', 'id'],
+                         name='review_title_pub_date_idx'),
+        ]
 
 
 class Comment(models.Model):
@@ -124,6 +319,11 @@ class Comment(models.Model):
 
     class Meta():
         ordering = ['-pub_date']
+        indexes = [
+            # Ключ курсорной пагинации комментариев к отзыву.
+            models.Index(fields=['review_id', 'pub_date', 'id'],
+                         name='comment_review_pub_date_idx'),
+        ]
 
 
 class GenreTitle(models.Model):
@@ -132,3 +332,10 @@ class GenreTitle(models.Model):
 
     def __str__(self):
         return f'{self.genre} {self.title}'
+
+    class Meta:
+        indexes = [
+            # Полусоединение фильтра произведений по жанрам.
+            models.Index(fields=['genre', 'title'],
+                         name='genretitle_genre_title_idx'),
+        ]
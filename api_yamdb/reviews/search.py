@@ -0,0 +1,132 @@
+"""
+Полнотекстовый поиск произведений по name и description.
+PostgreSQL: GIN-индекс по выражению to_tsvector('simple', ...).
+SQLite: внешняя FTS5-таблица reviews_title_fts, синхронизируемая триггерами.
+Остальные СУБД: icontains без индекса.
+"""
+import contextlib
+import re
+
+from django.db import connections
+from django.db.models import FloatField, Q
+from django.db.models.expressions import RawSQL
+
+TITLE_TABLE = 'reviews_title'
+FTS_TABLE = 'reviews_title_fts'
+GIN_INDEX = 'reviews_title_search_idx'
+
+# Выражение должно совпадать в индексе и в запросе, иначе индекс
+# не будет использован.
+PG_DOCUMENT = ("to_tsvector('simple', coalesce({prefix}name, '') || ' ' "
+               "|| coalesce({prefix}description, ''))")
+PG_QUERY = "plainto_tsquery('simple', %s)"
+
+SQLITE_TRIGGERS = {
+    f'{FTS_TABLE}_ai': f'''
+        CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON {TITLE_TABLE} BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, name, description)
+            VALUES (new.id, new.name, new.description);
+        END''',
+    f'{FTS_TABLE}_ad': f'''
+        CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON {TITLE_TABLE} BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description)
+            VALUES ('delete', old.id, old.name, old.description);
+        END''',
+    f'{FTS_TABLE}_au': f'''
+        CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE ON {TITLE_TABLE} BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description)
+            VALUES ('delete', old.id, old.name, old.description);
+            INSERT INTO {FTS_TABLE}(rowid, name, description)
+            VALUES (new.id, new.name, new.description);
+        END''',
+}
+
+
+def install(connection):
+    """
+    Создаёт поисковый индекс, если его нет. Вызывается миграцией и после
+    каждого migrate: SQLite пересоздаёт таблицу при изменении схемы,
+    и триггеры FTS5 пропадают вместе со старой таблицей.
+    """
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                f'CREATE INDEX IF NOT EXISTS {GIN_INDEX} ON {TITLE_TABLE} '
+                f'USING gin ({PG_DOCUMENT.format(prefix="")})')
+        elif connection.vendor == 'sqlite':
+            cursor.execute(
+                f'CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5('
+                f"name, description, content='{TITLE_TABLE}', "
+                "content_rowid='id')")
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'trigger' "
+                'AND tbl_name = %s', [TITLE_TABLE])
+            existing = {row[0] for row in cursor.fetchall()}
+            missing = set(SQLITE_TRIGGERS) - existing
+            for name in missing:
+                cursor.execute(SQLITE_TRIGGERS[name])
+            if missing:
+                cursor.execute(
+                    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def uninstall(connection):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(f'DROP INDEX IF EXISTS {GIN_INDEX}')
+        elif connection.vendor == 'sqlite':
+            for name in SQLITE_TRIGGERS:
+                cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+            cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+@contextlib.contextmanager
+def suspended(connection):
+    """
+    Отключает триггеры FTS5 на время массовой вставки произведений
+    (SQLite): перестроить индекс один раз в конце намного дешевле.
+    В PostgreSQL GIN-индекс откладывается вместе с остальными индексами.
+    """
+    if connection.vendor != 'sqlite':
+        yield
+        return
+    uninstall(connection)
+    yield
+    install(connection)
+
+
+def search_titles(queryset, query):
+    """
+    Фильтрует произведения по словам из query (все слова обязательны)
+    и сортирует по релевантности (аннотация search_rank).
+    """
+    words = re.findall(r'\w+', query)
+    if not words:
+        return queryset.none()
+    vendor = connections[queryset.db].vendor
+
+    if vendor == 'postgresql':
+        document = PG_DOCUMENT.format(prefix=f'"{TITLE_TABLE}".')
+        queryset = queryset.extra(
+            where=[f'{document} @@ {PG_QUERY}'], params=[' '.join(words)])
+        rank = RawSQL(f'ts_rank({document}, {PG_QUERY})', (' '.join(words),),
+                      output_field=FloatField())
+        return queryset.annotate(search_rank=rank).order_by(
+            '-search_rank', 'id')
+
+    if vendor == 'sqlite':
+        match = ' '.join(f'"{word}"' for word in words)
+        # Соединение с FTS5: MATCH выполняется один раз, bm25 считается для
+        # найденных строк (чем меньше bm25, тем выше релевантность).
+        return queryset.extra(
+            select={'search_rank': f'-bm25({FTS_TABLE})'},
+            tables=[FTS_TABLE],
+            where=[f'{FTS_TABLE}.rowid = "{TITLE_TABLE}"."id"',
+                   f'{FTS_TABLE} MATCH %s'],
+            params=[match],
+        ).order_by('-search_rank', 'id')
+
+    condition = Q()
+    for word in words:
+        condition &= Q(name__icontains=word) | Q(description__icontains=word)
+    return queryset.filter(condition)
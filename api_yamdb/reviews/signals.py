@@ -0,0 +1,115 @@
+import itertools
+
+from django.db.models import F
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import SCORE_COUNT_FIELDS, Category, Genre, Review, Title
+
+
+def shift_rating(title_id, added=None, removed=None):
+    """
+    Атомарно сдвигает счётчики отзывов произведения: добавляет оценку
+    added и убирает оценку removed (любая может быть None).
+    """
+    shift_scores(title_id,
+                 added=() if added is None else (added,),
+                 removed=() if removed is None else (removed,))
+
+
+def shift_scores(title_id, added=(), removed=()):
+    """То же для нескольких оценок одним UPDATE."""
+    counters = {}
+    for score, step in itertools.chain(
+            zip(added, itertools.repeat(1)),
+            zip(removed, itertools.repeat(-1))):
+        for field, delta in (('reviews_count', step),
+                             ('score_sum', step * score),
+                             (SCORE_COUNT_FIELDS[score - 1], step)):
+            counters[field] = counters.get(field, 0) + delta
+    Title.objects.filter(pk=title_id).update(
+        **{field: F(field) + delta for field, delta in counters.items()
+           if delta},
+        updated_at=timezone.now(),
+    )
+
+
+def touch(titles):
+    """Отмечает произведения изменёнными (Title.updated_at)."""
+    titles.update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Review)
+def review_saved(sender, instance, created, **kwargs):
+    score = int(instance.score)
+    if created:
+        shift_rating(instance.title_id, added=score)
+    else:
+        old_score = getattr(instance, '_loaded_score', None)
+        old_title_id = getattr(instance, '_loaded_title_id', None)
+        if old_score is None or old_title_id is None:
+            # Прежнее состояние неизвестно: пересчитываем произведение.
+            Title.objects.filter(pk=instance.title_id).rebuild_rating()
+        elif old_title_id != instance.title_id:
+            shift_rating(old_title_id, removed=old_score)
+            shift_rating(instance.title_id, added=score)
+        elif old_score != score:
+            shift_rating(instance.title_id, added=score, removed=old_score)
+    instance.remember_rating_state()
+
+
+@receiver(pre_delete, sender=Review)
+def review_deleting(sender, instance, using, **kwargs):
+    if getattr(instance, '_title_deleted', False):
+        return
+    cascaded = getattr(instance, '_cascaded', None)
+    if cascaded is not None:
+        cascaded.lock(using)
+        return
+    # Удаление идёт в транзакции: строка заблокирована до её конца, и
+    # параллельное удаление того же отзыва уже не найдёт её.
+    instance._rating_row_exists = instance.lock_rating_state(using)
+
+
+@receiver(post_delete, sender=Review)
+def review_deleted(sender, instance, **kwargs):
+    if getattr(instance, '_title_deleted', False):
+        return
+    cascaded = getattr(instance, '_cascaded', None)
+    if cascaded is not None:
+        cascaded.pending -= 1
+        if not cascaded.pending:
+            for title_id, scores in cascaded.scores.items():
+                shift_scores(title_id, removed=scores)
+        return
+    if not getattr(instance, '_rating_row_exists', True):
+        return
+    title_id = getattr(instance, '_loaded_title_id', None)
+    score = getattr(instance, '_loaded_score', None)
+    shift_rating(title_id or instance.title_id,
+                 removed=int(score or instance.score))
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def title_genres_changed(sender, instance, action, reverse, pk_set,
+                         **kwargs):
+    if not reverse:
+        if action.startswith('post_'):
+            touch(Title.objects.filter(pk=instance.pk))
+    elif action in ('post_add', 'post_remove'):
+        touch(Title.objects.filter(pk__in=pk_set))
+    elif action == 'pre_clear':
+        touch(instance.titles.all())
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Genre)
+@receiver(pre_delete, sender=Category)
+@receiver(pre_delete, sender=Genre)
+def title_relation_changed(sender, instance, created=False, **kwargs):
+    # Название или slug попадают в выгрузку произведений, а удаление
+    # обнуляет категорию или убирает жанр без сохранения произведения.
+    if not created:
+        touch(instance.titles.all())
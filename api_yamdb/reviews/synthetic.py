@@ -0,0 +1,398 @@
+"""
+Детерминированный генератор синтетических данных (manage.py generate_data).
+Записи выдаются в формате CSV из static/data, который читает
+scripts/load.py, и пишутся либо в CSV, либо сразу в базу пачками.
+
+Распределения:
+- отзывы по произведениям - закон Ципфа (немного хитов и длинный хвост);
+- активность пользователей - тоже Ципф: авторы отзывов и комментариев
+  выбираются с весом 1 / rank ** zipf;
+- жанры и категории - Ципф по популярности, у произведения 1-N жанров;
+- даты: выход произведения равномерно в окне --days, отзывы приходят
+  экспоненциально затухающей волной после выхода, комментарии - вскоре
+  после отзыва.
+"""
+import contextlib
+import csv
+import itertools
+import math
+import os
+import random
+import time
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+
+from django.db import connection, transaction
+from django.utils import timezone
+from reviews import search
+from reviews.bulk import (batches, category_from_record, genre_from_record,
+                          insert_batch, insert_rows, reset_sequence,
+                          without_indexes)
+from reviews.models import Category, Comment, Genre, GenreTitle, Review, Title
+from users.models import User, UserRole
+
+WORDS = (
+    'сюжет', 'герой', 'финал', 'музыка', 'актёр', 'роль', 'сцена', 'кадр',
+    'идея', 'автор', 'мир', 'время', 'история', 'жанр', 'стиль', 'образ',
+    'глава', 'ритм', 'голос', 'звук', 'цвет', 'свет', 'тема', 'смысл',
+    'книга', 'фильм', 'песня', 'альбом', 'сезон', 'серия', 'эпизод',
+    'диалог', 'конфликт', 'развязка', 'пролог', 'эпилог', 'персонаж',
+    'отлично', 'скучно', 'сильно', 'неожиданно', 'красиво', 'затянуто',
+    'смешно', 'грустно', 'мощно', 'слабо', 'честно', 'ярко', 'тонко',
+)
+TEXT_POOL_SIZE = 1000
+END_DATE = datetime(2023, 1, 1, tzinfo=dt_timezone.utc)
+REVIEW_WAVE_DAYS = 60
+COMMENT_DELAY_DAYS = 2
+
+# Колонки CSV в том порядке, в котором их читает scripts/load.py.
+CSV_HEADERS = {
+    'users.csv': ('id', 'password', 'last_login', 'is_superuser',
+                  'username', 'first_name', 'last_name', 'is_staff',
+                  'is_active', 'date_joined', 'email', 'bio', 'role'),
+    'category.csv': ('id', 'name', 'slug'),
+    'genre.csv': ('id', 'name', 'slug'),
+    'titles.csv': ('id', 'name', 'year', 'description', 'category'),
+    'genre_title.csv': ('id', 'genre_id', 'title_id'),
+    'review.csv': ('id', 'text', 'score', 'pub_date', 'author', 'title_id'),
+    'comments.csv': ('id', 'text', 'pub_date', 'author', 'review_id'),
+}
+
+# Колонки таблиц для вставки готовых строк, в порядке записей CSV.
+USER_COLUMNS = CSV_HEADERS['users.csv'] + (
+    'confirmation_code', 'confirmation_code_expires_at')
+TITLE_COLUMNS = ('id', 'name', 'year', 'description', 'category_id',
+                 'updated_at', *Title.COUNTER_FIELDS)
+GENRE_TITLE_COLUMNS = CSV_HEADERS['genre_title.csv']
+REVIEW_COLUMNS = ('id', 'text', 'score', 'pub_date', 'author_id',
+                  'title_id')
+COMMENT_COLUMNS = ('id', 'text', 'pub_date', 'author_id', 'review_id_id')
+ZERO_COUNTERS = (0,) * len(Title.COUNTER_FIELDS)
+
+
+def zipf_cum_weights(count, exponent):
+    """Накопленные веса 1 / rank ** exponent для rng.choices."""
+    return list(itertools.accumulate(
+        1 / rank ** exponent for rank in range(1, count + 1)))
+
+
+def geometric(rng, mean):
+    """Целое >= 0 с геометрическим распределением и заданным средним."""
+    if mean <= 0:
+        return 0
+    return int(math.log(1.0 - rng.random()) / math.log(mean / (mean + 1)))
+
+
+def spread(total, cum_weights, cap):
+    """
+    Делит total пропорционально весам, не больше cap на элемент.
+    Остаток от округления и срезанное сверх cap достаётся следующим
+    по весу элементам.
+    """
+    weight_sum = cum_weights[-1]
+    counts, previous = [], 0
+    for cumulative in cum_weights:
+        counts.append(min(cap, int(total * (cumulative - previous)
+                                   / weight_sum)))
+        previous = cumulative
+    left = total - sum(counts)
+    while left > 0:
+        added = 0
+        for i, count in enumerate(counts):
+            if left == added:
+                break
+            if count < cap:
+                counts[i] += 1
+                added += 1
+        if not added:
+            break
+        left -= added
+    return counts
+
+
+class DatasetGenerator:
+    """
+    Выдаёт записи таблиц для заданных размеров. Одинаковые параметры
+    и seed дают одинаковые данные. Идентификаторы начинаются с 1,
+    пользователи - с first_user_id (суперпользователи не трогаются).
+    """
+
+    def __init__(self, users, titles, genres, categories, reviews, comments,
+                 seed=1, zipf=1.1, genres_per_title=2.0, days=3 * 365,
+                 first_user_id=1):
+        self.rng = random.Random(seed)
+        self.users = users
+        self.titles = titles
+        self.genres = genres
+        self.categories = categories
+        self.reviews = min(reviews, users * titles)
+        self.comments = comments
+        self.zipf = zipf
+        self.genres_per_title = genres_per_title
+        self.days = days
+        self.first_user_id = first_user_id
+        self.texts = [
+            ' '.join(self.rng.choices(WORDS, k=self.rng.randint(5, 60)))
+            for _ in range(TEXT_POOL_SIZE)
+        ]
+        self.user_weights = zipf_cum_weights(users, zipf)
+        # Популярность не связана с id: ранги перемешаны.
+        self.user_ranks = list(range(first_user_id, first_user_id + users))
+        self.rng.shuffle(self.user_ranks)
+        self.released = []
+
+    def text(self):
+        return self.rng.choice(self.texts)
+
+    def user_records(self):
+        roles = self.rng.choices(
+            (UserRole.USER, UserRole.MODERATOR, UserRole.ADMIN),
+            weights=(989, 10, 1), k=self.users)
+        for i, role in enumerate(roles):
+            user_id = self.first_user_id + i
+            joined = END_DATE - timedelta(days=self.days * self.rng.random())
+            yield (user_id, '', '', False, f'gen-user{user_id}', '', '',
+                   False, True, joined, f'gen-user{user_id}@yamdb.fake', '',
+                   role)
+
+    def category_records(self):
+        for i in range(1, self.categories + 1):
+            yield (i, f'Категория {i}', f'gen-category-{i}')
+
+    def genre_records(self):
+        for i in range(1, self.genres + 1):
+            yield (i, f'Жанр {i}', f'gen-genre-{i}')
+
+    def title_records(self):
+        category_weights = zipf_cum_weights(self.categories, self.zipf)
+        categories = self.rng.choices(
+            range(1, self.categories + 1), cum_weights=category_weights,
+            k=self.titles) if self.categories else [''] * self.titles
+        for i, category in enumerate(categories, start=1):
+            released = END_DATE - timedelta(
+                days=self.days * self.rng.random())
+            self.released.append(released)
+            year = max(1900, released.year - int(self.rng.expovariate(0.1)))
+            yield (i, f'Произведение {i}', year, self.text(), category)
+
+    def genre_title_records(self):
+        if not self.genres:
+            return
+        genre_weights = zipf_cum_weights(self.genres, self.zipf)
+        genre_ids = range(1, self.genres + 1)
+        record_id = itertools.count(1)
+        for title_id in range(1, self.titles + 1):
+            fan_out = min(self.genres, 1 + geometric(
+                self.rng, self.genres_per_title - 1))
+            chosen = set()
+            while len(chosen) < fan_out:
+                chosen.update(self.rng.choices(
+                    genre_ids, cum_weights=genre_weights,
+                    k=fan_out - len(chosen)))
+            for genre_id in sorted(chosen):
+                yield (next(record_id), genre_id, title_id)
+
+    def authors(self, count):
+        """count разных авторов с весами по активности."""
+        if count * 4 > self.users:
+            return self.rng.sample(self.user_ranks, count)
+        chosen = {}
+        while len(chosen) < count:
+            chosen.update(dict.fromkeys(self.rng.choices(
+                self.user_ranks, cum_weights=self.user_weights,
+                k=count - len(chosen))))
+        return list(chosen)
+
+    def review_records(self):
+        """
+        Пары (отзыв, [комментарии к нему]). Произведения получают отзывы
+        по Ципфу в случайном порядке рангов. Даты отзывов отсчитываются
+        от выхода произведения, поэтому title_records должен быть
+        прочитан раньше.
+        """
+        rng = self.rng
+        random_ = rng.random
+        texts = self.texts
+        title_ids = list(range(1, self.titles + 1))
+        rng.shuffle(title_ids)
+        per_title = spread(self.reviews,
+                           zipf_cum_weights(self.titles, self.zipf),
+                           self.users)
+        comments_left = self.comments
+        comments_mean = self.comments / self.reviews if self.reviews else 0
+        review_wave = REVIEW_WAVE_DAYS * 86400
+        comment_delay = COMMENT_DELAY_DAYS * 86400
+        review_id = 0
+        comment_id = itertools.count(1)
+        # Внутренний цикл выполняется для каждого отзыва: здесь только
+        # random() и локальные имена, без rng.choice/randint.
+        for title_id, count in zip(title_ids, per_title):
+            released = self.released[title_id - 1]
+            window = (END_DATE - released).total_seconds()
+            for author in self.authors(count):
+                review_id += 1
+                delay = rng.expovariate(1 / review_wave)
+                if delay > window:
+                    delay = window * random_()
+                pub_date = released + timedelta(seconds=delay)
+                review = (review_id,
+                          texts[int(random_() * TEXT_POOL_SIZE)],
+                          int(random_() * 10) + 1, pub_date, author,
+                          title_id)
+                count = min(comments_left, geometric(rng, comments_mean))
+                if not count:
+                    yield review, ()
+                    continue
+                comments_left -= count
+                commenters = rng.choices(
+                    self.user_ranks, cum_weights=self.user_weights, k=count)
+                yield review, [
+                    (next(comment_id),
+                     texts[int(random_() * TEXT_POOL_SIZE)],
+                     min(pub_date + timedelta(
+                         seconds=rng.expovariate(1 / comment_delay)),
+                         END_DATE),
+                     commenter, review_id)
+                    for commenter in commenters
+                ]
+
+
+class Timer:
+    """Считает строки и время записи таблицы для отчёта."""
+
+    def __init__(self, report, table):
+        self.report = report
+        self.table = table
+        self.rows = 0
+
+    def __enter__(self):
+        self.started = time.monotonic()
+        return self
+
+    def __exit__(self, *exc_info):
+        if exc_info[0] is None:
+            self.report(self.table, self.rows,
+                        time.monotonic() - self.started)
+
+
+def write_csv(generator, directory, report):
+    """Пишет CSV в формате static/data для scripts/load.py."""
+    os.makedirs(directory, exist_ok=True)
+
+    def open_writer(file_name):
+        file = open(os.path.join(directory, file_name), 'w', newline='',
+                    encoding='utf-8')
+        writer = csv.writer(file)
+        writer.writerow(CSV_HEADERS[file_name])
+        return file, writer
+
+    for file_name, records in (
+        ('users.csv', generator.user_records()),
+        ('category.csv', generator.category_records()),
+        ('genre.csv', generator.genre_records()),
+        ('titles.csv', generator.title_records()),
+        ('genre_title.csv', generator.genre_title_records()),
+    ):
+        file, writer = open_writer(file_name)
+        with file, Timer(report, file_name) as timer:
+            for record in records:
+                writer.writerow(record)
+                timer.rows += 1
+
+    review_file, review_writer = open_writer('review.csv')
+    comment_file, comment_writer = open_writer('comments.csv')
+    with review_file, comment_file, Timer(report, 'review.csv') as timer:
+        comments = 0
+        for review, review_comments in generator.review_records():
+            review_writer.writerow(review)
+            comment_writer.writerows(review_comments)
+            timer.rows += 1
+            comments += len(review_comments)
+    report('comments.csv', comments, None)
+
+
+def datetime_adapter():
+    """
+    Приводит aware-дату в UTC к значению для базы. Для SQLite то же, что
+    adapt_datetimefield_value, но без make_naive на каждой строке.
+    """
+    if connection.vendor == 'sqlite':
+        return lambda value: str(value.replace(tzinfo=None))
+    return connection.ops.adapt_datetimefield_value
+
+
+@contextlib.contextmanager
+def deferred_indexes(model):
+    """Индексы таблицы, включая поисковый у произведений, строятся в конце."""
+    with without_indexes(model):
+        if model is Title:
+            with search.suspended(connection):
+                yield
+        else:
+            yield
+
+
+def write_database(generator, batch_size, report):
+    """
+    Пишет данные в базу пачками готовых строк (COPY на PostgreSQL)
+    без моделей и сигналов; вторичные индексы больших таблиц строятся
+    после вставки. Рейтинги и гистограммы оценок пересчитываются в конце
+    одним проходом по отзывам.
+    """
+    adapt = datetime_adapter()
+    now = adapt(timezone.now())
+    for model, records, from_record in (
+        (Category, generator.category_records(), category_from_record),
+        (Genre, generator.genre_records(), genre_from_record),
+    ):
+        with transaction.atomic(), Timer(report, model._meta.db_table) as t:
+            for batch in batches(map(from_record, records), batch_size):
+                insert_batch(model, batch)
+                t.rows += len(batch)
+            reset_sequence(model)
+
+    tables = (
+        (User, generator.user_records(), USER_COLUMNS,
+         lambda record: (*record[:2], None, *record[3:9], adapt(record[9]),
+                         *record[10:], '', None)),
+        (Title, generator.title_records(), TITLE_COLUMNS,
+         lambda record: (*record[:4], record[4] or None, now,
+                         *ZERO_COUNTERS)),
+        (GenreTitle, generator.genre_title_records(), GENRE_TITLE_COLUMNS,
+         None),
+    )
+    for model, records, columns, to_row in tables:
+        timer = Timer(report, model._meta.db_table)
+        with transaction.atomic(), deferred_indexes(model), timer as t:
+            if to_row is not None:
+                records = map(to_row, records)
+            for batch in batches(records, batch_size):
+                insert_rows(model, columns, batch)
+                t.rows += len(batch)
+            reset_sequence(model)
+
+    comments = 0
+    with transaction.atomic(), contextlib.ExitStack() as indexes:
+        indexes.enter_context(deferred_indexes(Review))
+        indexes.enter_context(deferred_indexes(Comment))
+        with Timer(report, 'reviews_review') as t:
+            for batch in batches(generator.review_records(), batch_size):
+                insert_rows(Review, REVIEW_COLUMNS, [
+                    (pk, text, score, adapt(pub_date), author, title)
+                    for (pk, text, score, pub_date, author, title), _
+                    in batch
+                ])
+                rows = [
+                    (pk, text, adapt(pub_date), author, review)
+                    for _, review_comments in batch
+                    for pk, text, pub_date, author, review in review_comments
+                ]
+                if rows:
+                    insert_rows(Comment, COMMENT_COLUMNS, rows)
+                t.rows += len(batch)
+                comments += len(rows)
+            reset_sequence(Review)
+            reset_sequence(Comment)
+    report('reviews_comment', comments, None)
+    with Timer(report, 'rebuild_rating') as t:
+        t.rows = Title.objects.rebuild_rating()
@@ -1,10 +1,32 @@
 import csv
-
-from reviews.models import Category, Comment, Genre, GenreTitle, Review, Title
+import os
+from itertools import islice
+
+from api.v1.cache import bump_all_versions
+from django.db import connection, models, transaction
+from django.db.models.deletion import get_candidate_relations_to_delete
+from reviews.models import (Category, Comment, Genre, GenreTitle, Review,
+                            Title, cascade_reviews)
 from users.models import User
 
+DATA_DIR = '/app/static/data/'
+CHUNK_SIZE = 5000
+
 
 def run(*args):
+    """
+    runscript unload [--script-args all] - удаление через ORM.
+    runscript unload --script-args fast [all] - удаление множествами
+    без загрузки строк в память; суперпользователи сохраняются.
+    """
+    if 'fast' in args:
+        if 'all' in args:
+            fast_delete_all()
+        else:
+            fast_delete_records()
+        # Сигналы не отправлялись: сбрасываем кэш ответов api.
+        bump_all_versions()
+        return
 
     if 'all' in args:
         Comment.objects.all().delete()
@@ -111,3 +133,81 @@ def delete_comments():
         else:
             Comment.objects.get(id=record[0]).delete()
         count += 1
+
+
+FAST_TABLES = (
+    (Comment, 'comments.csv'),
+    (Review, 'review.csv'),
+    (GenreTitle, 'genre_title.csv'),
+    (Genre, 'genre.csv'),
+    (Title, 'titles.csv'),
+    (Category, 'category.csv'),
+    (User, 'users.csv'),
+)
+
+
+def fast_delete_records():
+    """Удаляет записи из CSV пачками id."""
+    for model, file_name in FAST_TABLES:
+        with transaction.atomic():
+            for ids in read_id_chunks(file_name):
+                queryset = model.objects.filter(id__in=ids)
+                if model is User:
+                    queryset = queryset.exclude(is_superuser=True)
+                fast_delete(queryset)
+    # Отзывы удалены минуя сигналы: пересчитываем оставшиеся произведения.
+    Title.objects.rebuild_rating()
+
+
+def fast_delete_all():
+    """Очищает все таблицы, кроме суперпользователей."""
+    with transaction.atomic():
+        if connection.vendor == 'postgresql':
+            tables = ', '.join(
+                connection.ops.quote_name(model._meta.db_table)
+                for model, file_name in FAST_TABLES if model is not User
+            )
+            with connection.cursor() as cursor:
+                cursor.execute(f'TRUNCATE {tables} CASCADE')
+        else:
+            for model, file_name in FAST_TABLES:
+                if model is not User:
+                    fast_delete(model.objects.all())
+        fast_delete(User.objects.exclude(is_superuser=True))
+
+
+def fast_delete(queryset):
+    """
+    Удаляет строки queryset одним DELETE на таблицу.
+    Зависимые строки удаляются (или обнуляются) подзапросами по правилам
+    on_delete, без Collector и без загрузки объектов в память.
+    Сигналы post_delete не отправляются.
+    """
+    model = queryset.model
+    pks = queryset.values('pk')
+    for relation in get_candidate_relations_to_delete(model._meta):
+        field = relation.field
+        related = relation.related_model._base_manager.filter(
+            **{f'{field.name}__in': pks})
+        on_delete = field.remote_field.on_delete
+        if on_delete in (models.CASCADE, cascade_reviews):
+            fast_delete(related)
+        elif on_delete is models.SET_NULL:
+            related.update(**{field.name: None})
+        elif on_delete is not models.DO_NOTHING:
+            raise NotImplementedError(
+                f'{field} on_delete={on_delete.__name__} не поддерживается')
+    return queryset._raw_delete(queryset.db)
+
+
+def read_id_chunks(file_name, size=CHUNK_SIZE):
+    """Потоково читает id из первой колонки CSV пачками по size."""
+    with open(os.path.join(DATA_DIR, file_name), encoding='utf-8') as file:
+        records = csv.reader(file)
+        next(records, None)
+        ids = (record[0] for record in records)
+        while True:
+            chunk = list(islice(ids, size))
+            if not chunk:
+                return
+            yield chunk
@@ -0,0 +1,126 @@
+"""
+Кэш пользователей в памяти процесса с коротким TTL.
+
+Изменение пользователя записывается в базу (User.claims_valid_after):
+токены, выданные раньше, не доверяют claims. Общий кэш Django хранит
+только копию этого времени. Если её там нет (вытеснена, кэш перезапущен),
+время читается из базы, поэтому отзыв прав не теряется. Локальный кэш
+процесса (LocMemCache) другие воркеры не видят: с ним время, прочитанное
+из базы, хранится в процессе USER_CHANGED_LOCAL_TTL секунд. Изменение
+в том же процессе видно сразу, а другие воркеры узнают о нём не позже
+чем через USER_CHANGED_LOCAL_TTL: на это время старый токен сохраняет
+прежние права.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import User
+
+USER_CACHE_TTL = getattr(settings, 'USER_CACHE_TTL', 60)
+USER_CACHE_SIZE = getattr(settings, 'USER_CACHE_SIZE', 10000)
+CACHE_ALIAS = getattr(settings, 'USER_CHANGES_CACHE_ALIAS', 'default')
+CHANGED_TIMEOUT = settings.SIMPLE_JWT['ACCESS_TOKEN_LIFETIME'].total_seconds()
+CHANGED_LOCAL_TTL = getattr(settings, 'USER_CHANGED_LOCAL_TTL', 5)
+LOCAL_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+SHARED = settings.CACHES[CACHE_ALIAS]['BACKEND'] not in LOCAL_BACKENDS
+# Время изменения удалённого пользователя: ни одному токену не доверяем.
+DELETED = float('inf')
+
+_users = {}
+# Время изменения по id без общего кэша: (когда прочитано, время).
+_changed = {}
+
+
+def changed_key(user_id):
+    return f'user-changed:{user_id}'
+
+
+def timestamp(changed_at):
+    return changed_at.timestamp() if changed_at is not None else 0
+
+
+def get_changed_at(user_id):
+    """
+    Время последнего изменения пользователя: 0, если он не менялся,
+    DELETED, если его нет.
+    """
+    cache = caches[CACHE_ALIAS]
+    now = time.time()
+    if SHARED:
+        changed_at = cache.get(changed_key(user_id))
+        if changed_at is not None:
+            return changed_at
+    else:
+        entry = _changed.get(user_id)
+        if entry is not None and now - entry[0] < CHANGED_LOCAL_TTL:
+            return entry[1]
+    rows = User.objects.using(DEFAULT_DB_ALIAS).filter(
+        pk=user_id).values_list('claims_valid_after', flat=True)[:1]
+    changed_at = timestamp(rows[0]) if rows else DELETED
+    if SHARED:
+        # add, а не set: время, записанное изменением после нашего
+        # чтения, не затираем.
+        cache.add(changed_key(user_id), changed_at, timeout=CHANGED_TIMEOUT)
+    else:
+        remember_changed_at(user_id, changed_at, now)
+    return changed_at
+
+
+def remember_changed_at(user_id, changed_at, now):
+    if len(_changed) >= USER_CACHE_SIZE:
+        _changed.clear()
+    _changed[user_id] = (now, changed_at)
+
+
+def get_user(user_id, changed_at=None):
+    """
+    Пользователь из кэша процесса, если запись моложе USER_CACHE_TTL и
+    загружена после изменения changed_at. Иначе читает из базы
+    (User.DoesNotExist, если пользователя нет).
+    """
+    now = time.time()
+    entry = _users.get(user_id)
+    if entry is not None:
+        loaded_at, user = entry
+        if (now - loaded_at < USER_CACHE_TTL
+                and (changed_at is None
+                     or timestamp(user.claims_valid_after) == changed_at)):
+            return user
+    # Свежая запись живёт в кэше до USER_CACHE_TTL, поэтому читается с
+    # основной базы, а не с реплики.
+    user = User.objects.using(DEFAULT_DB_ALIAS).get(pk=user_id)
+    if len(_users) >= USER_CACHE_SIZE:
+        _users.clear()
+    _users[user_id] = (now, user)
+    return user
+
+
+def invalidate(user_id, changed_at):
+    _users.pop(user_id, None)
+    if SHARED:
+        caches[CACHE_ALIAS].set(
+            changed_key(user_id), changed_at, timeout=CHANGED_TIMEOUT)
+    else:
+        remember_changed_at(user_id, changed_at, time.time())
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_on_commit(sender, instance, created=False, **kwargs):
+    if created:
+        # Токенов, выданных до создания пользователя, не бывает.
+        return
+    user_id = instance.pk
+    if kwargs['signal'] is post_delete:
+        changed_at = DELETED
+    else:
+        changed_at = timestamp(instance.claims_valid_after)
+    transaction.on_commit(lambda: invalidate(user_id, changed_at))
@@ -0,0 +1,64 @@
+"""
+Одноразовые коды подтверждения для получения токена.
+В базе хранится HMAC-SHA256 кода и срок его действия: проверка стоит
+микросекунды, в отличие от PBKDF2 у set_password/authenticate, и не трогает
+пароль пользователя.
+"""
+import secrets
+import string
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare, salted_hmac
+
+from .models import User
+
+CODE_LENGTH = 20
+CODE_ALPHABET = string.ascii_letters + string.digits
+CODE_TTL = getattr(settings, 'CONFIRMATION_CODE_TTL', 24 * 60 * 60)
+KEY_SALT = 'users.confirmation'
+CONFIRMATION_FIELDS = ('confirmation_code', 'confirmation_code_expires_at')
+
+
+def make_digest(user, code):
+    # В HMAC входит username (pk нового пользователя ещё неизвестен):
+    # код одного пользователя не подходит другому. После смены username
+    # выданный код перестаёт подходить - нужна повторная регистрация.
+    return salted_hmac(KEY_SALT, f'{user.username}:{code}',
+                       algorithm='sha256').hexdigest()
+
+
+def issue_code(user):
+    """
+    Выдаёт пользователю новый код (старый перестаёт действовать)
+    и возвращает его. Сохранять пользователя должен вызывающий код.
+    """
+    code = ''.join(secrets.choice(CODE_ALPHABET) for _ in range(CODE_LENGTH))
+    user.confirmation_code = make_digest(user, code)
+    user.confirmation_code_expires_at = (
+        timezone.now() + timedelta(seconds=CODE_TTL))
+    return code
+
+
+def check_code(user, code):
+    """Сравнивает код за постоянное время и проверяет срок действия."""
+    if not user.confirmation_code or not user.is_active:
+        return False
+    if user.confirmation_code_expires_at <= timezone.now():
+        return False
+    return constant_time_compare(
+        make_digest(user, code), user.confirmation_code)
+
+
+def consume_code(user, code):
+    """
+    Проверяет код и гасит его. Условный UPDATE гарантирует, что из двух
+    параллельных обменов одного кода на токен успешен только один.
+    """
+    if not check_code(user, code):
+        return False
+    consumed = User.objects.filter(
+        pk=user.pk, confirmation_code=user.confirmation_code,
+    ).update(confirmation_code='', confirmation_code_expires_at=None)
+    return consumed == 1
@@ -0,0 +1,23 @@
+# Generated by Django 3.2 on 2026-10-18 19:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='confirmation_code',
+            field=models.CharField(blank=True, editable=False, max_length=64, verbose_name='Код подтверждения'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='confirmation_code_expires_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Код подтверждения действует до'),
+        ),
+    ]
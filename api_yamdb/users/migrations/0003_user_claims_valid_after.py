@@ -0,0 +1,18 @@
+# Generated by Django 3.2 on 2026-10-18 21:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_user_confirmation_code'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='claims_valid_after',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Claims токенов действительны после'),
+        ),
+    ]
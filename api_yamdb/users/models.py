@@ -1,5 +1,6 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.utils import timezone
 
 
 class UserRole(models.TextChoices):
@@ -22,6 +23,30 @@ class User(AbstractUser):
         default='user',
         verbose_name=UserRole.USER
     )
+    # HMAC кода подтверждения (users.confirmation), сам код не хранится.
+    confirmation_code = models.CharField(
+        max_length=64,
+        blank=True,
+        editable=False,
+        verbose_name='Код подтверждения'
+    )
+    confirmation_code_expires_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name='Код подтверждения действует до'
+    )
+    # Токенам, выданным раньше, claims не доверяют (users.cache).
+    claims_valid_after = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name='Claims токенов действительны после'
+    )
+
+    # Сохранение только этих полей не меняет пользователя для токенов.
+    TOKEN_NEUTRAL_FIELDS = frozenset(
+        ('confirmation_code', 'confirmation_code_expires_at', 'last_login'))
 
     @property
     def is_user(self):
@@ -35,6 +60,17 @@ class User(AbstractUser):
     def is_admin(self):
         return self.role == UserRole.ADMIN
 
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if not self._state.adding and (
+                update_fields is None
+                or not self.TOKEN_NEUTRAL_FIELDS.issuperset(update_fields)):
+            self.claims_valid_after = timezone.now()
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields,
+                                           'claims_valid_after'}
+        super().save(*args, **kwargs)
+
     class Meta:
         verbose_name = 'user'
         verbose_name_plural = 'users'
@@ -0,0 +1,60 @@
+"""
+Пропускная способность /auth/signup/ и /auth/token/ (запросов в секунду
+в одном процессе). Код подтверждения берётся из письма в очереди outbox,
+поэтому бенчмарк работает и до, и после перехода с PBKDF2 на HMAC-коды.
+
+    python -m benchmarks.auth_endpoints [--users 200]
+"""
+import argparse
+import json
+import re
+import time
+
+from . import common
+
+
+def run(users):
+    from core.models import OutboxEmail
+    from rest_framework.test import APIClient
+
+    client = APIClient()
+    signups = [
+        {'username': f'bench{i}', 'email': f'bench{i}@yamdb.fake'}
+        for i in range(users)
+    ]
+
+    started = time.perf_counter()
+    for data in signups:
+        assert client.post('/api/v1/auth/signup/', data).status_code == 200
+    signup_elapsed = time.perf_counter() - started
+
+    codes = {
+        email.recipients: re.search(
+            r'confirmation_code: (\w+)', email.body).group(1)
+        for email in OutboxEmail.objects.all()
+    }
+    started = time.perf_counter()
+    for data in signups:
+        response = client.post('/api/v1/auth/token/', {
+            'username': data['username'],
+            'confirmation_code': codes[data['email']],
+        })
+        assert response.status_code == 200
+    token_elapsed = time.perf_counter() - started
+
+    return {
+        'signup_requests_per_second': round(users / signup_elapsed, 1),
+        'token_requests_per_second': round(users / token_elapsed, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=200)
+    args = parser.parse_args()
+    with common.test_database():
+        print(json.dumps(run(args.users), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Общие помощники бенчмарков: настройка Django, временная тестовая база
+и наполнение её синтетическими данными.
+По умолчанию используется SQLite; для PostgreSQL задайте DB_ENGINE и
+параметры подключения так же, как для приложения.
+"""
+import contextlib
+import os
+import sys
+import tempfile
+from os.path import abspath, dirname, join
+
+ROOT_DIR = dirname(dirname(abspath(__file__)))
+sys.path.insert(0, join(ROOT_DIR, 'api_yamdb'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api_yamdb.settings')
+os.environ.setdefault('DB_ENGINE', 'django.db.backends.sqlite3')
+
+import django  # noqa: E402
+
+django.setup()
+
+
+@contextlib.contextmanager
+def test_database(shared=False):
+    """
+    Создаёт и после использования удаляет тестовую базу, возвращает её имя.
+    shared=True нужен, когда к базе подключаются другие процессы
+    (gunicorn): SQLite тогда создаётся в файле, а не в памяти.
+    """
+    from django.db import connection
+    from django.test.utils import (setup_databases, setup_test_environment,
+                                   teardown_databases,
+                                   teardown_test_environment)
+
+    if shared and connection.vendor == 'sqlite':
+        connection.settings_dict['TEST']['NAME'] = join(
+            tempfile.mkdtemp(prefix='yamdb-bench-'), 'db.sqlite3')
+    setup_test_environment()
+    old_config = setup_databases(verbosity=0, interactive=False)
+    try:
+        yield connection.settings_dict['NAME']
+    finally:
+        teardown_databases(old_config, verbosity=0)
+        teardown_test_environment()
+
+
+def percentiles(samples):
+    """p50/p95/p99 в миллисекундах по замерам в секундах."""
+    samples = sorted(samples)
+    return {
+        f'p{p}': round(samples[min(len(samples) - 1,
+                                   len(samples) * p // 100)] * 1000, 3)
+        for p in (50, 95, 99)
+    }
+
+
+def seed(titles=10, reviews_per_title=10, comments_per_review=0, genres=5,
+         users=0):
+    """
+    Наполняет базу и возвращает первое произведение и его первый отзыв.
+    Пользователей создаётся не меньше, чем отзывов на произведение:
+    у каждого отзыва произведения свой автор.
+    """
+    from reviews.models import Category, Comment, Genre, Review, Title
+    from users.models import User
+
+    users = User.objects.bulk_create(
+        User(id=i, username=f'user{i}', email=f'user{i}@yamdb.fake')
+        for i in range(1, max(users, reviews_per_title) + 1)
+    )
+    category = Category.objects.create(name='Фильм', slug='movie')
+    genre_objs = Genre.objects.bulk_create(
+        Genre(id=i, name=f'Жанр {i}', slug=f'genre-{i}')
+        for i in range(1, genres + 1)
+    )
+    title_objs = Title.objects.bulk_create(
+        Title(id=i, name=f'Произведение {i}', year=2000, category=category,
+              description='Описание ' * 20)
+        for i in range(1, titles + 1)
+    )
+    Title.genre.through.objects.bulk_create(
+        Title.genre.through(title=title, genre=genre)
+        for title in title_objs for genre in genre_objs[:2]
+    )
+    review_objs = Review.objects.bulk_create(
+        Review(id=i * reviews_per_title + j + 1, title=title, author=user,
+               text='Текст отзыва ' * 50, score=j % 10 + 1)
+        for i, title in enumerate(title_objs)
+        for j, user in enumerate(users[:reviews_per_title])
+    )
+    Comment.objects.bulk_create(
+        Comment(review_id=review, author=users[k % len(users)],
+                text='Комментарий ' * 10)
+        for review in review_objs
+        for k in range(comments_per_review)
+    )
+    Title.objects.rebuild_rating()
+    return title_objs[0], review_objs[0]
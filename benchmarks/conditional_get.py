@@ -0,0 +1,65 @@
+"""
+Экономия от условных GET: время CPU и байты на запрос для полного ответа
+и для ответа 304 по If-None-Match.
+
+    python -m benchmarks.conditional_get [--requests 200]
+"""
+import argparse
+import json
+import time
+
+from . import common
+
+
+def measure(client, url, requests, **headers):
+    started = time.process_time()
+    sent = 0
+    for _ in range(requests):
+        response = client.get(url, **headers)
+        # Большие страницы отдаются потоком (StreamingHttpResponse).
+        sent += len(b''.join(response.streaming_content)
+                    if response.streaming else response.content)
+    elapsed = time.process_time() - started
+    return {
+        'status': response.status_code,
+        'cpu_ms_per_request': round(elapsed * 1000 / requests, 3),
+        'bytes_per_request': sent // requests,
+    }
+
+
+def run(requests):
+    from rest_framework.test import APIClient
+
+    title, review = common.seed(titles=100, reviews_per_title=100)
+    client = APIClient()
+    results = {}
+    for name, url in (
+        ('titles-list', '/api/v1/titles/?page_size=100'),
+        ('reviews-list',
+         f'/api/v1/titles/{title.id}/reviews/?page_size=100'),
+    ):
+        etag = client.get(url)['ETag']
+        full = measure(client, url, requests)
+        conditional = measure(client, url, requests, HTTP_IF_NONE_MATCH=etag)
+        results[name] = {
+            'full': full,
+            'not_modified': conditional,
+            'saved_cpu_ms_per_request': round(
+                full['cpu_ms_per_request']
+                - conditional['cpu_ms_per_request'], 3),
+            'saved_bytes_per_request': (
+                full['bytes_per_request'] - conditional['bytes_per_request']),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=200)
+    args = parser.parse_args()
+    with common.test_database():
+        print(json.dumps(run(args.requests), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,201 @@
+"""
+Микрокэш nginx перед api/v1: задержка анонимных GET напрямую к gunicorn
+и через nginx с конфигурацией infra/nginx/default.conf, доля попаданий
+(X-Cache-Status) и, с --writes, через сколько после изменения nginx
+отдаёт новые данные.
+
+    python -m benchmarks.edge_cache [--titles 100] [--requests 2000]
+        [--concurrency 8] [--writes 20]
+
+Нужен nginx в PATH. Конфигурация переписывается на локальные порты
+и временный каталог кэша. Кэш Django по умолчанию локальный для процесса,
+поэтому gunicorn запускается с одним воркером (--workers): иначе
+запомнивший URL воркер может не совпасть с изменившим данные.
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from itertools import cycle
+
+from . import common
+from .endpoints import free_port, start_gunicorn
+
+NGINX_CONF = os.path.join(common.ROOT_DIR, 'infra', 'nginx', 'default.conf')
+
+MAIN_CONF = '''
+daemon off;
+worker_processes 1;
+pid {dir}/nginx.pid;
+error_log {dir}/error.log warn;
+
+events {{
+    worker_connections 1024;
+}}
+
+http {{
+    access_log off;
+    client_body_temp_path {dir}/client_body;
+    proxy_temp_path {dir}/proxy;
+    fastcgi_temp_path {dir}/fastcgi;
+    uwsgi_temp_path {dir}/uwsgi;
+    scgi_temp_path {dir}/scgi;
+    include {dir}/default.conf;
+}}
+'''
+
+
+def render_config(directory, nginx_port, upstream):
+    with open(NGINX_CONF) as file:
+        config = file.read()
+    config = config.replace('/var/cache/nginx/api',
+                            os.path.join(directory, 'cache'))
+    config = config.replace('server web:8000;', f'server {upstream};')
+    config = config.replace('listen 80;', f'listen 127.0.0.1:{nginx_port};')
+    # web здесь - локальный процесс, а не контейнер с адресом из compose.
+    config = config.replace('172.28.0.10  1;', '127.0.0.1    1;')
+    with open(os.path.join(directory, 'default.conf'), 'w') as file:
+        file.write(config)
+    path = os.path.join(directory, 'nginx.conf')
+    with open(path, 'w') as file:
+        file.write(MAIN_CONF.format(dir=directory))
+    return path
+
+
+def start_nginx(directory, nginx_port, upstream):
+    config = render_config(directory, nginx_port, upstream)
+    server = subprocess.Popen(['nginx', '-p', directory, '-c', config])
+    base_url = f'http://127.0.0.1:{nginx_port}'
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline and server.poll() is None:
+        try:
+            urllib.request.urlopen(f'{base_url}/api/v1/genres/', timeout=1)
+            return server, base_url
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.1)
+    server.terminate()
+    raise RuntimeError('nginx не запустился')
+
+
+def get(url):
+    started = time.perf_counter()
+    with urllib.request.urlopen(url, timeout=30) as response:
+        body = response.read()
+        cache_status = response.headers.get('X-Cache-Status', '')
+    return time.perf_counter() - started, cache_status, body
+
+
+def load(base_url, paths, requests, concurrency):
+    urls = cycle([base_url + path for path in paths])
+    with ThreadPoolExecutor(concurrency) as executor:
+        started = time.perf_counter()
+        results = list(executor.map(
+            get, [next(urls) for _ in range(requests)]))
+        elapsed = time.perf_counter() - started
+    statuses = Counter(status for _, status, _ in results)
+    report = common.percentiles([duration for duration, _, _ in results])
+    report['rps'] = round(requests / elapsed, 1)
+    if statuses[''] != requests:
+        report['cache_status'] = dict(statuses)
+        report['hit_ratio'] = round(statuses['HIT'] / requests, 3)
+    return report
+
+
+def patch_title(base_url, title_id, name, token):
+    request = urllib.request.Request(
+        f'{base_url}/api/v1/titles/{title_id}/', method='PATCH',
+        data=json.dumps({'name': name}).encode())
+    request.add_header('Content-Type', 'application/json')
+    request.add_header('Authorization', f'Bearer {token}')
+    with urllib.request.urlopen(request, timeout=30) as response:
+        response.read()
+
+
+def staleness(direct_url, nginx_url, title_id, writes, token):
+    """Секунды от ответа на PATCH до новых данных в кэше nginx."""
+    path = f'/api/v1/titles/{title_id}/'
+    samples = []
+    for number in range(writes):
+        get(nginx_url + path)
+        name = f'Изменено {number}'
+        patch_title(direct_url, title_id, name, token)
+        written = time.perf_counter()
+        while json.loads(get(nginx_url + path)[2])['name'] != name:
+            time.sleep(0.005)
+        samples.append(time.perf_counter() - written)
+    return common.percentiles(samples)
+
+
+def run(args, database_name, directory):
+    from api.v1.authentication import get_access_token
+    from api.v1.edge import EDGE_CACHE_TIMEOUT
+    from users.models import User, UserRole
+
+    title, _ = common.seed(titles=args.titles, reviews_per_title=5)
+    admin = User.objects.create(username='bench-admin',
+                                email='bench-admin@yamdb.fake',
+                                role=UserRole.ADMIN)
+    token = get_access_token(admin)
+    paths = ['/api/v1/titles/', '/api/v1/genres/', '/api/v1/categories/',
+             '/api/v1/titles/?year=2000']
+    paths += [f'/api/v1/titles/{title.id + offset}/'
+              for offset in range(min(args.titles, 20))]
+
+    nginx_port = free_port()
+    os.environ['EDGE_CACHE_REFRESH_URL'] = f'http://127.0.0.1:{nginx_port}'
+    gunicorn, direct_url = start_gunicorn(database_name, args.workers)
+    try:
+        nginx, nginx_url = start_nginx(
+            directory, nginx_port, direct_url[len('http://'):])
+        try:
+            report = {
+                'meta': {'titles': args.titles, 'requests': args.requests,
+                         'concurrency': args.concurrency,
+                         'workers': args.workers, 'paths': len(paths),
+                         'edge_cache_timeout': EDGE_CACHE_TIMEOUT},
+                'direct': load(direct_url, paths, args.requests,
+                               args.concurrency),
+                'nginx': load(nginx_url, paths, args.requests,
+                              args.concurrency),
+            }
+            if args.writes:
+                report['staleness_ms'] = staleness(
+                    direct_url, nginx_url, title.id, args.writes, token)
+        finally:
+            nginx.terminate()
+            nginx.wait()
+    finally:
+        gunicorn.terminate()
+        gunicorn.wait()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--titles', type=int, default=100)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--writes', type=int, default=0,
+                        help='изменений произведения для замера устаревания')
+    args = parser.parse_args()
+    if shutil.which('nginx') is None:
+        sys.exit('Для бенчмарка нужен nginx в PATH.')
+    directory = tempfile.mkdtemp(prefix='yamdb-nginx-')
+    try:
+        with common.test_database(shared=True) as database_name:
+            print(json.dumps(run(args, database_name, directory), indent=2))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,475 @@
+"""
+Бенчмарк маршрутов api/v1 на синтетических данных: все маршруты
+api/v1/urls.py, включая stats и export произведений, и все их методы.
+Для каждого маршрута печатает JSON с задержкой p50/p95/p99, запросами
+в секунду и числом SQL-запросов на запрос; файлы двух прогонов можно
+сравнить (--baseline).
+
+    python -m benchmarks.endpoints [--titles 100] [--reviews-per-title 20]
+        [--comments-per-review 5] [--requests 200] [--output run.json]
+    python -m benchmarks.endpoints --mode http --workers 4 --concurrency 8
+
+Режим client гоняет запросы в этом же процессе через тестовый клиент
+Django. Режим http поднимает gunicorn на тестовой базе и нагружает его
+по HTTP из --concurrency потоков; число SQL-запросов в нём не считается.
+Анонимные чтения обслуживает кэш ответов; --authenticated шлёт их
+с токеном администратора, чтобы замерить работу с базой.
+"""
+import argparse
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from itertools import count
+
+from . import common
+
+# Имя, метод, путь, от чьего имени (None - анонимно). {target...} в пути -
+# свой объект на каждый запрос (создаются в prepare).
+ROUTES = (
+    ('titles-list', 'GET', '/api/v1/titles/', None),
+    ('titles-detail', 'GET', '/api/v1/titles/{title}/', None),
+    ('titles-search', 'GET', '/api/v1/titles/?search=Произведение', None),
+    ('titles-stats', 'GET', '/api/v1/titles/{title}/stats/', None),
+    ('titles-export', 'GET', '/api/v1/titles/export/', 'admin'),
+    ('titles-create', 'POST', '/api/v1/titles/', 'admin'),
+    ('titles-update', 'PATCH', '/api/v1/titles/{title}/', 'admin'),
+    ('titles-delete', 'DELETE', '/api/v1/titles/{target}/', 'admin'),
+    ('genres-list', 'GET', '/api/v1/genres/', None),
+    ('genres-create', 'POST', '/api/v1/genres/', 'admin'),
+    ('genres-delete', 'DELETE', '/api/v1/genres/{target}/', 'admin'),
+    ('categories-list', 'GET', '/api/v1/categories/', None),
+    ('categories-create', 'POST', '/api/v1/categories/', 'admin'),
+    ('categories-delete', 'DELETE', '/api/v1/categories/{target}/',
+     'admin'),
+    ('reviews-list', 'GET', '/api/v1/titles/{title}/reviews/', None),
+    ('reviews-detail', 'GET',
+     '/api/v1/titles/{title}/reviews/{review}/', None),
+    ('reviews-create', 'POST', '/api/v1/titles/{target}/reviews/', 'user'),
+    ('reviews-update', 'PATCH',
+     '/api/v1/titles/{title}/reviews/{review}/', 'user'),
+    ('reviews-delete', 'DELETE',
+     '/api/v1/titles/{target_title}/reviews/{target}/', 'user'),
+    ('comments-list', 'GET',
+     '/api/v1/titles/{title}/reviews/{review}/comments/', None),
+    ('comments-detail', 'GET',
+     '/api/v1/titles/{title}/reviews/{review}/comments/{comment}/', None),
+    ('comments-create', 'POST',
+     '/api/v1/titles/{title}/reviews/{review}/comments/', 'user'),
+    ('comments-update', 'PATCH',
+     '/api/v1/titles/{title}/reviews/{review}/comments/{comment}/', 'user'),
+    ('comments-delete', 'DELETE',
+     '/api/v1/titles/{title}/reviews/{review}/comments/{target}/', 'user'),
+    ('users-list', 'GET', '/api/v1/users/', 'admin'),
+    ('users-detail', 'GET', '/api/v1/users/{username}/', 'admin'),
+    ('users-create', 'POST', '/api/v1/users/', 'admin'),
+    ('users-update', 'PATCH', '/api/v1/users/{member}/', 'admin'),
+    ('users-delete', 'DELETE', '/api/v1/users/{target}/', 'admin'),
+    ('users-me', 'GET', '/api/v1/users/me/', 'user'),
+    # Правка себя отзывает доверие к claims уже выданного токена, поэтому
+    # идёт после остальных запросов пользователя user.
+    ('users-me-update', 'PATCH', '/api/v1/users/me/', 'user'),
+    ('auth-signup', 'POST', '/api/v1/auth/signup/', None),
+    ('auth-token', 'POST', '/api/v1/auth/token/', None),
+)
+
+
+def pool(items):
+    """По элементу на запрос: warmup и замеряемые запросы."""
+    return iter(items).__next__
+
+
+def targets_pool(rows):
+    """Подстановки {target...} в путь: по строке на запрос."""
+    return pool([
+        dict(zip(('target', 'target_title'), map(str, row)))
+        for row in rows
+    ])
+
+
+def prepare(args):
+    """Наполняет базу и готовит токены, коды подтверждения и объекты."""
+    from api.v1.authentication import get_access_token
+    from django.db import transaction
+    from reviews.models import Category, Comment, Genre, Review, Title
+    from users.confirmation import issue_code
+    from users.models import User, UserRole
+
+    title, review = common.seed(
+        titles=args.titles,
+        reviews_per_title=args.reviews_per_title,
+        comments_per_review=args.comments_per_review,
+        genres=args.genres,
+        users=args.users,
+    )
+    admin = User.objects.create(username='bench-admin',
+                                email='bench-admin@yamdb.fake',
+                                role=UserRole.ADMIN)
+    user = review.author
+    member = User.objects.create(username='bench-member',
+                                 email='bench-member@yamdb.fake')
+    comment = Comment.objects.create(review_id=review, author=user,
+                                     text='Комментарий для правки')
+
+    # На каждый обмен кода на токен - свой пользователь: код одноразовый.
+    total = args.requests + args.warmup
+    token_users = [
+        User(username=f'bench-token{i}', email=f'bench-token{i}@yamdb.fake')
+        for i in range(total)
+    ]
+    codes = [issue_code(token_user) for token_user in token_users]
+    User.objects.bulk_create(token_users)
+
+    # Объекты для записи: у каждого создания и удаления свой.
+    with transaction.atomic():
+        spare_titles = [
+            Title.objects.create(name=f'Для записи {i}', year=2000)
+            for i in range(total * 2)
+        ]
+        delete_reviews = [
+            Review.objects.create(title=spare, author=user, score=5,
+                                  text='Отзыв для удаления')
+            for spare in spare_titles[total:]
+        ]
+        delete_comments = [
+            Comment.objects.create(review_id=review, author=user,
+                                   text='Комментарий для удаления')
+            for _ in range(total)
+        ]
+        delete_genres = [
+            Genre.objects.create(name=f'Для удаления {i}',
+                                 slug=f'bench-delete-{i}')
+            for i in range(total)
+        ]
+        delete_categories = [
+            Category.objects.create(name=f'Для удаления {i}',
+                                    slug=f'bench-delete-{i}')
+            for i in range(total)
+        ]
+        delete_users = [
+            User.objects.create(username=f'bench-delete{i}',
+                                email=f'bench-delete{i}@yamdb.fake')
+            for i in range(total)
+        ]
+        delete_titles = [
+            Title.objects.create(name=f'Для удаления {i}', year=2000)
+            for i in range(total)
+        ]
+
+    signups = count()
+    tokens = count()
+    created = count()
+    scores = count()
+
+    def signup_data():
+        i = next(signups)
+        return {'username': f'bench-signup{i}',
+                'email': f'bench-signup{i}@yamdb.fake'}
+
+    def token_data():
+        i = next(tokens)
+        return {'username': token_users[i].username,
+                'confirmation_code': codes[i]}
+
+    def user_data():
+        i = next(created)
+        return {'username': f'bench-new{i}',
+                'email': f'bench-new{i}@yamdb.fake'}
+
+    def slug_data():
+        i = next(created)
+        return {'name': f'Новый {i}', 'slug': f'bench-new-{i}'}
+
+    context = {
+        'title': title.id,
+        'review': review.id,
+        'comment': comment.id,
+        'username': user.username,
+        'member': member.username,
+    }
+    payloads = {
+        'titles-create': lambda: {
+            'name': 'Новое произведение', 'year': 2000,
+            'genre': ['genre-1'], 'category': 'movie'},
+        'titles-update': lambda: {'description': 'Исправленное описание'},
+        'users-create': user_data,
+        'users-update': lambda: {'bio': 'Исправленная биография'},
+        'users-me-update': lambda: {'bio': 'Исправленная биография'},
+        'genres-create': slug_data,
+        'categories-create': slug_data,
+        'reviews-create': lambda: {'text': 'Отзыв из бенчмарка', 'score': 7},
+        'reviews-update': lambda: {'score': next(scores) % 10 + 1},
+        'comments-create': lambda: {'text': 'Комментарий из бенчмарка'},
+        'comments-update': lambda: {'text': 'Исправленный комментарий'},
+        'auth-signup': signup_data,
+        'auth-token': token_data,
+    }
+    targets = {
+        'titles-delete': targets_pool(
+            (title.id,) for title in delete_titles),
+        'genres-delete': targets_pool(
+            (genre.slug,) for genre in delete_genres),
+        'categories-delete': targets_pool(
+            (category.slug,) for category in delete_categories),
+        'reviews-create': targets_pool(
+            (spare.id,) for spare in spare_titles[:total]),
+        'reviews-delete': targets_pool(
+            (review.id, review.title_id) for review in delete_reviews),
+        'users-delete': targets_pool(
+            (deleted.username,) for deleted in delete_users),
+        'comments-delete': targets_pool(
+            (comment.id,) for comment in delete_comments),
+    }
+    headers = {
+        'admin': f'Bearer {get_access_token(admin)}',
+        'user': f'Bearer {get_access_token(user)}',
+    }
+    return context, payloads, targets, headers
+
+
+def summarize(samples, queries, elapsed):
+    statuses = {}
+    for status, _ in samples:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    return {
+        'requests': len(samples),
+        'statuses': statuses,
+        **{f'{name}_ms': value for name, value in common.percentiles(
+            [duration for _, duration in samples]).items()},
+        'mean_ms': round(
+            sum(duration for _, duration in samples) * 1000 / len(samples),
+            3),
+        'requests_per_second': round(len(samples) / elapsed, 1),
+        'queries_per_request': (
+            round(sum(queries) / len(queries), 2) if queries else None),
+    }
+
+
+def run_client(routes, next_request, headers, args):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from rest_framework.test import APIClient
+
+    client = APIClient()
+    results = {}
+    for name, method, path, auth in routes:
+        auth = auth or args.authenticated
+        client.credentials(
+            **({'HTTP_AUTHORIZATION': headers[auth]} if auth else {}))
+        samples, queries = [], []
+        for i in range(args.warmup + args.requests):
+            request_path, data = next_request(name, path)
+            # Журнал ограничен 9000 запросами, переполнение сбивает подсчёт.
+            connection.queries_log.clear()
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                if method == 'GET':
+                    response = client.get(request_path)
+                else:
+                    response = getattr(client, method.lower())(
+                        request_path, data, format='json')
+                if response.streaming:
+                    # Выгрузка и большие страницы строятся при чтении.
+                    b''.join(response.streaming_content)
+                duration = time.perf_counter() - started
+            if i >= args.warmup:
+                samples.append((response.status_code, duration))
+                queries.append(len(captured))
+        elapsed = sum(duration for _, duration in samples)
+        results[name] = summarize(samples, queries, elapsed)
+    return results
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_gunicorn(database_name, workers):
+    from django.db import connection
+
+    port = free_port()
+    env = dict(os.environ, DB_ENGINE=connection.settings_dict['ENGINE'],
+               DB_NAME=database_name)
+    # gunicorn 20.0 не запускается через python -m: берём скрипт рядом
+    # с интерпретатором (virtualenv) или из PATH.
+    executable = os.path.join(os.path.dirname(sys.executable), 'gunicorn')
+    if not os.path.exists(executable):
+        executable = 'gunicorn'
+    server = subprocess.Popen(
+        [executable, 'api_yamdb.wsgi:application',
+         '--bind', f'127.0.0.1:{port}', '--workers', str(workers),
+         '--log-level', 'warning'],
+        cwd=os.path.join(common.ROOT_DIR, 'api_yamdb'), env=env)
+    base_url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline and server.poll() is None:
+        try:
+            urllib.request.urlopen(f'{base_url}/api/v1/genres/', timeout=1)
+            return server, base_url
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError('gunicorn не запустился')
+
+
+def http_request(base_url, method, path, data, authorization):
+    body = None if data is None else json.dumps(data).encode()
+    request = urllib.request.Request(
+        base_url + urllib.parse.quote(path, safe='/?=&'),
+        data=body, method=method)
+    request.add_header('Content-Type', 'application/json')
+    if authorization:
+        request.add_header('Authorization', authorization)
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as error:
+        status = error.code
+    return status, time.perf_counter() - started
+
+
+def run_http(routes, next_request, headers, args, database_name):
+    server, base_url = start_gunicorn(database_name, args.workers)
+    results = {}
+    try:
+        with ThreadPoolExecutor(args.concurrency) as executor:
+            for name, method, path, auth in routes:
+                auth = auth or args.authenticated
+                authorization = headers[auth] if auth else None
+
+                def call(_):
+                    request_path, data = next_request(name, path)
+                    return http_request(base_url, method, request_path, data,
+                                        authorization)
+
+                list(executor.map(call, range(args.warmup)))
+                started = time.perf_counter()
+                samples = list(executor.map(call, range(args.requests)))
+                elapsed = time.perf_counter() - started
+                results[name] = summarize(samples, [], elapsed)
+    finally:
+        server.terminate()
+        server.wait()
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=common.ROOT_DIR,
+            stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline):
+    """Изменение p50/p95/p99 и запросов в секунду относительно baseline."""
+    delta = {}
+    for name, route in results.items():
+        before = baseline.get('routes', {}).get(name)
+        if not before:
+            continue
+        delta[name] = {
+            key: round((route[key] - before[key]) * 100 / before[key], 1)
+            for key in ('p50_ms', 'p95_ms', 'p99_ms', 'requests_per_second')
+            if before.get(key)
+        }
+    return delta
+
+
+def run(args, database_name):
+    from django.db import connection
+
+    context, payloads, targets, headers = prepare(args)
+    routes = [
+        route for route in ROUTES if not args.routes or route[0] in args.routes
+    ]
+
+    def next_request(name, path):
+        """Путь и тело очередного запроса маршрута."""
+        values = context
+        if name in targets:
+            values = dict(context, **targets[name]())
+        return (path.format(**values),
+                payloads[name]() if name in payloads else None)
+
+    if args.mode == 'http':
+        results = run_http(routes, next_request, headers, args, database_name)
+    else:
+        results = run_client(routes, next_request, headers, args)
+    report = {
+        'meta': {
+            'revision': git_revision(),
+            'mode': args.mode,
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'dataset': {
+                'users': max(args.users, args.reviews_per_title),
+                'titles': args.titles,
+                'genres': args.genres,
+                'reviews_per_title': args.reviews_per_title,
+                'comments_per_review': args.comments_per_review,
+            },
+            'requests': args.requests,
+            'warmup': args.warmup,
+            'workers': args.workers if args.mode == 'http' else None,
+            'concurrency': (
+                args.concurrency if args.mode == 'http' else None),
+            'authenticated': bool(args.authenticated),
+        },
+        'routes': results,
+    }
+    if args.baseline:
+        with open(args.baseline) as file:
+            report['delta_pct'] = compare(results, json.load(file))
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument('--mode', choices=('client', 'http'),
+                        default='client')
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--titles', type=int, default=100)
+    parser.add_argument('--genres', type=int, default=10)
+    parser.add_argument('--reviews-per-title', type=int, default=20)
+    parser.add_argument('--comments-per-review', type=int, default=5)
+    parser.add_argument('--requests', type=int, default=200,
+                        help='замеряемых запросов на маршрут')
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--workers', type=int, default=2,
+                        help='воркеры gunicorn (режим http)')
+    parser.add_argument('--concurrency', type=int, default=4,
+                        help='параллельные клиенты (режим http)')
+    parser.add_argument('--authenticated', action='store_const',
+                        const='admin', default=None,
+                        help='публичные маршруты с токеном, мимо кэша ответов')
+    parser.add_argument('--routes', nargs='*',
+                        help='только перечисленные маршруты')
+    parser.add_argument('--output', help='файл для JSON-отчёта')
+    parser.add_argument('--baseline', help='JSON-отчёт для сравнения')
+    args = parser.parse_args()
+
+    with common.test_database(shared=args.mode == 'http') as database_name:
+        report = run(args, database_name)
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(output + '\n')
+    print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Быстрое чтение api/v1 (api/v1/fast.py) против сериализаторов DRF: время
+CPU процесса на страницу списка и на объект. Запросы с быстрым чтением
+и без него чередуются, сравниваются медианы.
+
+    python -m benchmarks.fast_serialization [--requests 300] [--page-size 100]
+
+Запросы идут с токеном администратора - мимо кэша ответов, до базы.
+"""
+import argparse
+import json
+import statistics
+import time
+
+from . import common
+
+
+def measure(client, url):
+    started = time.process_time()
+    response = client.get(url)
+    assert response.status_code == 200, url
+    return time.process_time() - started
+
+
+def run(requests, page_size):
+    from api.v1 import fast
+    from api.v1.authentication import get_access_token
+    from rest_framework.test import APIClient
+    from users.models import User, UserRole
+
+    title, review = common.seed(titles=page_size * 2,
+                                reviews_per_title=page_size,
+                                comments_per_review=2)
+    admin = User.objects.create(username='bench-admin',
+                                email='bench-admin@yamdb.fake',
+                                role=UserRole.ADMIN)
+    client = APIClient(
+        HTTP_AUTHORIZATION=f'Bearer {get_access_token(admin)}')
+    page = f'page_size={page_size}'
+    results = {}
+    for name, url in (
+        ('titles-list', f'/api/v1/titles/?{page}'),
+        ('titles-list-cards',
+         f'/api/v1/titles/?{page}&fields=id,name,rating'),
+        ('titles-detail', f'/api/v1/titles/{title.id}/'),
+        ('genres-list', f'/api/v1/genres/?{page}'),
+        ('reviews-list', f'/api/v1/titles/{title.id}/reviews/?{page}'),
+        ('reviews-list-cursor',
+         f'/api/v1/titles/{title.id}/reviews/?{page}&pagination=cursor'),
+        ('comments-list',
+         f'/api/v1/titles/{title.id}/reviews/{review.id}/comments/'),
+    ):
+        timings = {False: [], True: []}
+        for _ in range(requests):
+            for enabled in (False, True):
+                fast.ENABLED = enabled
+                timings[enabled].append(measure(client, url))
+        base = statistics.median(timings[False])
+        quick = statistics.median(timings[True])
+        results[name] = {
+            'serializers_ms': round(base * 1000, 3),
+            'fast_ms': round(quick * 1000, 3),
+            'saved_ms': round((base - quick) * 1000, 3),
+            'saved_pct': round((base - quick) * 100 / base, 1),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=300)
+    parser.add_argument('--page-size', type=int, default=100)
+    args = parser.parse_args()
+    with common.test_database():
+        print(json.dumps(run(args.requests, args.page_size), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""
+Большие страницы api/v1: потоковый JSON против собранного целиком и
+сжатие. Для каждой кодировки (identity, gzip, br) печатает размер
+ответа, медиану времени до первого байта и до конца ответа, а также
+пик памяти на запрос (tracemalloc, отдельный прогон).
+
+    python -m benchmarks.large_pages [--requests 100] [--page-size 100]
+
+Ответ вычитывается так же, как его отдаёт WSGI-сервер: потоковый -
+по частям, время до первого байта - до первой части. Запросы с токеном
+администратора идут мимо кэша ответов.
+"""
+import argparse
+import json
+import statistics
+import time
+import tracemalloc
+
+from . import common
+
+ENCODINGS = ('identity', 'gzip', 'br')
+
+
+def fetch(client, url, encoding):
+    """(время до первого байта, полное время, байт) одного запроса."""
+    started = time.perf_counter()
+    response = client.get(url, HTTP_ACCEPT_ENCODING=encoding)
+    assert response.status_code == 200, url
+    if not response.streaming:
+        finished = time.perf_counter() - started
+        return finished, finished, len(response.content)
+    first = None
+    size = 0
+    for chunk in response.streaming_content:
+        if first is None:
+            first = time.perf_counter() - started
+        size += len(chunk)
+    return first, time.perf_counter() - started, size
+
+
+def peak_memory(client, url, encoding):
+    tracemalloc.start()
+    try:
+        fetch(client, url, encoding)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run(requests, page_size):
+    from api.v1 import fast
+    from api.v1.authentication import get_access_token
+    from rest_framework.test import APIClient
+    from users.models import User, UserRole
+
+    title, _ = common.seed(titles=page_size, reviews_per_title=page_size)
+    admin = User.objects.create(username='bench-admin',
+                                email='bench-admin@yamdb.fake',
+                                role=UserRole.ADMIN)
+    client = APIClient(
+        HTTP_AUTHORIZATION=f'Bearer {get_access_token(admin)}')
+    streaming_min_rows = fast.STREAMING_MIN_ROWS
+    results = {}
+    for name, url in (
+        ('titles-list', f'/api/v1/titles/?page_size={page_size}'),
+        ('reviews-list',
+         f'/api/v1/titles/{title.id}/reviews/?page_size={page_size}'),
+    ):
+        results[name] = {}
+        for streaming in (False, True):
+            fast.STREAMING_MIN_ROWS = (
+                streaming_min_rows if streaming else page_size + 1)
+            for encoding in ENCODINGS:
+                fetch(client, url, encoding)
+                samples = [fetch(client, url, encoding)
+                           for _ in range(requests)]
+                mode = 'streamed' if streaming else 'buffered'
+                results[name][f'{mode}-{encoding}'] = {
+                    'bytes': samples[0][2],
+                    'ttfb_ms': round(statistics.median(
+                        sample[0] for sample in samples) * 1000, 3),
+                    'total_ms': round(statistics.median(
+                        sample[1] for sample in samples) * 1000, 3),
+                    'peak_kib': round(
+                        peak_memory(client, url, encoding) / 1024, 1),
+                }
+        fast.STREAMING_MIN_ROWS = streaming_min_rows
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=100)
+    parser.add_argument('--page-size', type=int, default=100)
+    args = parser.parse_args()
+    with common.test_database():
+        print(json.dumps(run(args.requests, args.page_size), indent=2))
+
+
+if __name__ == '__main__':
+    main()
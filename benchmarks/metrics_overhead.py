@@ -0,0 +1,90 @@
+"""
+Цена метрик Prometheus: время CPU на запрос с MetricsMiddleware и без
+него. Запросы двух клиентов чередуются, чтобы дрейф машины влиял на оба,
+и сравниваются медианы: шум между прогонами больше самой разницы.
+
+    python -m benchmarks.metrics_overhead [--requests 5000] [--multiprocess]
+
+--multiprocess включает режим нескольких воркеров gunicorn: значения
+пишутся в файлы временного каталога PROMETHEUS_MULTIPROC_DIR.
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+from . import common
+
+MIDDLEWARE = 'core.metrics.MetricsMiddleware'
+
+
+def make_client(middleware, url, headers):
+    from django.test import override_settings
+    from rest_framework.test import APIClient
+
+    client = APIClient(**headers)
+    # Цепочка middleware собирается при первом запросе и остаётся
+    # у клиента после выхода из override_settings.
+    with override_settings(MIDDLEWARE=middleware):
+        client.get(url)
+    return client
+
+
+def measure(client, url):
+    started = time.perf_counter()
+    client.get(url)
+    return time.perf_counter() - started
+
+
+def run(requests):
+    from api.v1.authentication import get_access_token
+    from django.conf import settings
+    from users.models import User, UserRole
+
+    title, review = common.seed(titles=100, reviews_per_title=20)
+    admin = User.objects.create(username='bench-admin',
+                                email='bench-admin@yamdb.fake',
+                                role=UserRole.ADMIN)
+    # С токеном запросы идут мимо кэша ответов, до базы.
+    headers = {'HTTP_AUTHORIZATION': f'Bearer {get_access_token(admin)}'}
+    without = [name for name in settings.MIDDLEWARE if name != MIDDLEWARE]
+    results = {}
+    for name, url in (
+        ('genres-list', '/api/v1/genres/'),
+        ('titles-list', '/api/v1/titles/'),
+        ('reviews-detail',
+         f'/api/v1/titles/{title.id}/reviews/{review.id}/'),
+    ):
+        plain = make_client(without, url, headers)
+        instrumented = make_client(settings.MIDDLEWARE, url, headers)
+        base, metered = [], []
+        for _ in range(requests):
+            base.append(measure(plain, url))
+            metered.append(measure(instrumented, url))
+        base, metered = statistics.median(base), statistics.median(metered)
+        results[name] = {
+            'p50_ms': round(base * 1000, 3),
+            'with_metrics_p50_ms': round(metered * 1000, 3),
+            'overhead_us': round((metered - base) * 1e6, 1),
+            'overhead_pct': round((metered - base) * 100 / base, 2),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--multiprocess', action='store_true')
+    args = parser.parse_args()
+    if args.multiprocess:
+        # До первого импорта prometheus_client.
+        os.environ['PROMETHEUS_MULTIPROC_DIR'] = tempfile.mkdtemp(
+            prefix='yamdb-metrics-')
+    with common.test_database():
+        print(json.dumps(run(args.requests), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Нагрузка на создание отзывов: reviewers пользователей пишут отзыв на одно
+произведение, затем каждый пытается написать второй. Выводит запросов в
+секунду, число SQL-запросов к данным на запрос (без BEGIN/SAVEPOINT)
+и проверяет, что повторы отклонены, а счётчик отзывов сошёлся.
+
+    python -m benchmarks.review_create [--reviewers 500] [--workers 1]
+
+Параллельные воркеры (--workers > 1) имеют смысл на PostgreSQL: SQLite
+не допускает одновременной записи из нескольких соединений.
+"""
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from . import common
+
+TRANSACTION_CONTROL = ('BEGIN', 'COMMIT', 'ROLLBACK', 'SAVEPOINT', 'RELEASE')
+
+
+def post_reviews(title, users, workers):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from rest_framework.test import APIClient
+
+    url = f'/api/v1/titles/{title.id}/reviews/'
+
+    def post(user):
+        client = APIClient()
+        client.force_authenticate(user=user)
+        # Журнал ограничен 9000 запросами, переполнение сбивает подсчёт.
+        connection.queries_log.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = client.post(url, {'text': 'Отзыв', 'score': 5})
+        if workers > 1:
+            connection.close()
+        statements = [query for query in queries
+                      if query['sql'].split()[0] not in TRANSACTION_CONTROL]
+        return response.status_code, len(statements)
+
+    started = time.perf_counter()
+    if workers > 1:
+        with ThreadPoolExecutor(workers) as executor:
+            results = list(executor.map(post, users))
+    else:
+        results = [post(user) for user in users]
+    elapsed = time.perf_counter() - started
+    statuses = sorted({status for status, _ in results})
+    return {
+        'statuses': statuses,
+        'requests_per_second': round(len(users) / elapsed, 1),
+        'queries_per_request': round(
+            sum(count for _, count in results) / len(users), 2),
+    }
+
+
+def run(reviewers, workers):
+    from reviews.models import Category, Review, Title
+    from users.models import User
+
+    category = Category.objects.create(name='Фильм', slug='movie')
+    title = Title.objects.create(name='Произведение', year=2000,
+                                 category=category)
+    users = [
+        User.objects.create(username=f'reviewer{i}',
+                            email=f'reviewer{i}@yamdb.fake')
+        for i in range(reviewers)
+    ]
+    results = {
+        'first_review': post_reviews(title, users, workers),
+        'duplicate_review': post_reviews(title, users, workers),
+    }
+    title = Title.objects.get(id=title.id)
+    results['reviews_stored'] = Review.objects.filter(title=title).count()
+    results['reviews_count'] = title.reviews_count
+    assert results['first_review']['statuses'] == [201]
+    assert results['duplicate_review']['statuses'] == [400]
+    assert results['reviews_stored'] == results['reviews_count'] == reviewers
+    return results
+
+
+def main():
+    from django.db import connection
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--reviewers', type=int, default=500)
+    parser.add_argument('--workers', type=int, default=1)
+    args = parser.parse_args()
+    if args.workers > 1 and connection.vendor == 'sqlite':
+        sys.exit('--workers > 1 нужен PostgreSQL (DB_ENGINE).')
+    with common.test_database():
+        print(json.dumps(run(args.reviewers, args.workers), indent=2))
+
+
+if __name__ == '__main__':
+    main()
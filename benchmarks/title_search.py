@@ -0,0 +1,72 @@
+"""
+Поиск произведений: индексный ?search= против прежнего name__contains.
+Для каждого запроса выполняется то же, что делает эндпоинт: COUNT(*) и
+выборка первой страницы. Печатает p50/p95/p99 в миллисекундах.
+
+    python -m benchmarks.title_search [--titles 1000000] [--queries 200]
+"""
+import argparse
+import json
+import random
+import time
+
+from . import common
+
+WORDS = [f'слово{i}' for i in range(50000)]
+
+
+def fill(count, batch_size=20000):
+    from reviews.models import Title
+
+    rnd = random.Random(1)
+    for start in range(0, count, batch_size):
+        Title.objects.bulk_create(
+            Title(name=' '.join(rnd.choices(WORDS, k=3)), year=2000,
+                  description=' '.join(rnd.choices(WORDS, k=20)))
+            for _ in range(start, min(count, start + batch_size))
+        )
+
+
+def timed(make_queryset, words, page_size=10):
+    samples = []
+    for word in words:
+        started = time.perf_counter()
+        queryset = make_queryset(word)
+        queryset.count()
+        list(queryset[:page_size])
+        samples.append(time.perf_counter() - started)
+    return common.percentiles(samples)
+
+
+def run(titles, queries):
+    from django.db import connection
+    from reviews.models import Title
+    from reviews.search import search_titles
+
+    started = time.perf_counter()
+    fill(titles)
+    fill_seconds = round(time.perf_counter() - started, 1)
+    words = random.Random(2).choices(WORDS, k=queries)
+    return {
+        'vendor': connection.vendor,
+        'titles': titles,
+        'queries': queries,
+        'fill_seconds': fill_seconds,
+        'search_ms': timed(
+            lambda word: search_titles(Title.objects.all(), word), words),
+        'name_contains_ms': timed(
+            lambda word: Title.objects.filter(name__contains=word), words),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--titles', type=int, default=1000000)
+    parser.add_argument('--queries', type=int, default=200)
+    args = parser.parse_args()
+    with common.test_database():
+        print(json.dumps(run(args.titles, args.queries), indent=2))
+
+
+if __name__ == '__main__':
+    main()
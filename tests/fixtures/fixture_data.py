@@ -0,0 +1,91 @@
+import pytest
+from api.v1.authentication import get_access_token
+from django.core.cache import cache
+from rest_framework.test import APIClient
+from reviews.models import Category, Genre, Title
+from users import cache as user_cache
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    user_cache._users.clear()
+    user_cache._changed.clear()
+
+
+@pytest.fixture
+def user(django_user_model):
+    return django_user_model.objects.create_user(
+        username='TestUser', email='testuser@yamdb.fake', password='1234567')
+
+
+@pytest.fixture
+def another_user(django_user_model):
+    return django_user_model.objects.create_user(
+        username='AnotherUser', email='another@yamdb.fake',
+        password='1234567')
+
+
+@pytest.fixture
+def admin(django_user_model):
+    return django_user_model.objects.create_user(
+        username='TestAdmin', email='testadmin@yamdb.fake',
+        password='1234567', role='admin')
+
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+
+@pytest.fixture
+def user_client(user):
+    client = APIClient()
+    client.force_authenticate(user=user)
+    return client
+
+
+@pytest.fixture
+def admin_client(admin):
+    client = APIClient()
+    client.force_authenticate(user=admin)
+    return client
+
+
+@pytest.fixture
+def bearer_client():
+    """Клиент с JWT пользователя: запросы проходят аутентификацию токеном."""
+    def make_client(user):
+        client = APIClient()
+        client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {get_access_token(user)}')
+        return client
+    return make_client
+
+
+@pytest.fixture
+def shared_cache(monkeypatch):
+    # В тестах один процесс: локальный кэш ведёт себя как общий.
+    monkeypatch.setattr(user_cache, 'SHARED', True)
+
+
+@pytest.fixture
+def category():
+    return Category.objects.create(name='Фильм', slug='movie')
+
+
+@pytest.fixture
+def genres():
+    return [
+        Genre.objects.create(name='Драма', slug='drama'),
+        Genre.objects.create(name='Комедия', slug='comedy'),
+    ]
+
+
+@pytest.fixture
+def title(category, genres):
+    title = Title.objects.create(
+        name='Побег из Шоушенка', year=1994, category=category,
+        description='Описание')
+    title.genre.set(genres)
+    return title
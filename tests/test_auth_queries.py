@@ -0,0 +1,142 @@
+import threading
+
+import pytest
+from api.v1.serializers import UserSignupSerializer
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from users.confirmation import issue_code
+from users.models import User
+
+from .utils import statements
+
+SIGNUP_URL = '/api/v1/auth/signup/'
+TOKEN_URL = '/api/v1/auth/token/'
+
+
+@pytest.mark.django_db(transaction=True)
+class TestAuthQueries:
+
+    def test_signup_new_user(self, api_client):
+        with CaptureQueriesContext(connection) as queries:
+            response = api_client.post(SIGNUP_URL, {
+                'username': 'newuser', 'email': 'newuser@yamdb.fake'})
+
+        assert response.status_code == 200
+        # Поиск, вставка пользователя и письма в очередь.
+        assert statements(queries) == ['SELECT', 'INSERT', 'INSERT']
+        assert response.json() == {
+            'username': 'newuser', 'email': 'newuser@yamdb.fake'}
+
+    def test_signup_existing_user(self, api_client, user):
+        with CaptureQueriesContext(connection) as queries:
+            response = api_client.post(SIGNUP_URL, {
+                'username': user.username, 'email': user.email})
+
+        assert response.status_code == 200
+        # Поиск, обновление кода и письмо в очередь.
+        assert statements(queries) == ['SELECT', 'UPDATE', 'INSERT']
+
+    @pytest.mark.parametrize('data, field', [
+        ({'username': 'TestUser', 'email': 'other@yamdb.fake'}, 'username'),
+        ({'username': 'other', 'email': 'testuser@yamdb.fake'}, 'email'),
+        ({'username': 'TestUser', 'email': 'another@yamdb.fake'},
+         'username'),
+    ])
+    def test_signup_conflicts(self, api_client, user, another_user, data,
+                              field, django_assert_num_queries):
+        with django_assert_num_queries(1):
+            response = api_client.post(SIGNUP_URL, data)
+
+        assert response.status_code == 400
+        assert response.json() == {field: ['This field must be unique.']}
+
+    def test_token(self, api_client, user, django_assert_num_queries):
+        code = issue_code(user)
+        user.save()
+
+        # Поиск пользователя и погашение кода.
+        with django_assert_num_queries(2):
+            response = api_client.post(TOKEN_URL, {
+                'username': user.username, 'confirmation_code': code})
+
+        assert response.status_code == 200
+
+    def test_token_unknown_user(self, api_client):
+        response = api_client.post(TOKEN_URL, {
+            'username': 'nobody', 'confirmation_code': 'code'})
+
+        assert response.status_code == 404
+
+
+@pytest.mark.django_db(transaction=True)
+class TestSignupRace:
+
+    def interleave(self, monkeypatch, username, email):
+        """Конкурент создаёт пользователя между проверкой и вставкой."""
+        validate = UserSignupSerializer.validate
+        calls = []
+
+        def racing_validate(serializer, attrs):
+            attrs = validate(serializer, attrs)
+            if not calls:
+                User.objects.create(username=username, email=email)
+            calls.append(attrs)
+            return attrs
+
+        monkeypatch.setattr(UserSignupSerializer, 'validate', racing_validate)
+        return calls
+
+    def test_same_user(self, api_client, monkeypatch):
+        calls = self.interleave(monkeypatch, 'newuser', 'newuser@yamdb.fake')
+
+        response = api_client.post(SIGNUP_URL, {
+            'username': 'newuser', 'email': 'newuser@yamdb.fake'})
+
+        assert response.status_code == 200
+        assert len(calls) == 2
+        assert User.objects.filter(username='newuser').count() == 1
+
+    @pytest.mark.parametrize('username, email, field', [
+        ('newuser', 'other@yamdb.fake', 'username'),
+        ('other', 'newuser@yamdb.fake', 'email'),
+    ])
+    def test_conflict(self, api_client, monkeypatch, username, email, field):
+        self.interleave(monkeypatch, username, email)
+
+        response = api_client.post(SIGNUP_URL, {
+            'username': 'newuser', 'email': 'newuser@yamdb.fake'})
+
+        assert response.status_code == 400
+        assert response.json() == {field: ['This field must be unique.']}
+        assert User.objects.count() == 1
+
+    @pytest.mark.skipif(connection.vendor != 'postgresql',
+                        reason='параллельная запись нужна PostgreSQL')
+    def test_parallel_signups(self):
+        workers = 8
+        barrier = threading.Barrier(workers)
+        statuses = []
+
+        def signup(i):
+            barrier.wait()
+            # Половина потоков занимает username, половина - email.
+            response = APIClient().post(SIGNUP_URL, {
+                'username': 'racer' if i % 2 else f'racer{i}',
+                'email': f'racer{i}@yamdb.fake' if i % 2
+                else 'racer@yamdb.fake',
+            })
+            statuses.append(response.status_code)
+            connection.close()
+
+        threads = [threading.Thread(target=signup, args=(i,))
+                   for i in range(workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert sorted(set(statuses)) <= [200, 400]
+        assert User.objects.filter(username='racer').count() <= 1
+        assert User.objects.filter(email='racer@yamdb.fake').count() <= 1
+        assert statuses.count(200) == User.objects.count()
@@ -0,0 +1,90 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from reviews.models import Comment, Review, Title
+from users import cache as user_cache
+
+from .utils import statements
+
+
+@pytest.fixture
+def review(title, another_user):
+    return Review.objects.create(title=title, author=another_user,
+                                 text='Отзыв', score=5)
+
+
+@pytest.fixture
+def other_title(category):
+    return Title.objects.create(name='Другое', year=2001, category=category)
+
+
+def comments_url(title_id, review_id):
+    return f'/api/v1/titles/{title_id}/reviews/{review_id}/comments/'
+
+
+@pytest.mark.django_db
+class TestComments:
+
+    def test_empty_review(self, user_client, title, review,
+                          django_assert_num_queries):
+        # Пустая страница: COUNT и проверка отзыва.
+        with django_assert_num_queries(2):
+            response = user_client.get(comments_url(title.id, review.id))
+
+        assert response.status_code == 200
+        assert response.json()['results'] == []
+
+    @pytest.mark.parametrize('params', [{}, {'pagination': 'cursor'}])
+    def test_mismatched_title(self, user_client, other_title, review,
+                              params):
+        response = user_client.get(
+            comments_url(other_title.id, review.id), params)
+
+        assert response.status_code == 404
+
+    def test_mismatched_title_detail(self, user_client, other_title, review,
+                                     user):
+        comment = Comment.objects.create(review_id=review, author=user,
+                                         text='Комментарий')
+
+        response = user_client.get(
+            f'{comments_url(other_title.id, review.id)}{comment.id}/')
+
+        assert response.status_code == 404
+
+    def test_create_mismatched_title(self, user_client, other_title,
+                                     review):
+        response = user_client.post(
+            comments_url(other_title.id, review.id), {'text': 'Текст'})
+
+        assert response.status_code == 404
+        assert not Comment.objects.exists()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_create_without_loading_review(self, user_client, title, review):
+        with CaptureQueriesContext(connection) as queries:
+            response = user_client.post(
+                comments_url(title.id, review.id), {'text': 'Текст'})
+
+        assert response.status_code == 201
+        assert statements(queries) == ['SELECT', 'INSERT']
+        # Отзыв проверяется через exists(), его строка не загружается.
+        assert not any('"reviews_review"."text"' in query['sql']
+                       for query in queries)
+        assert Comment.objects.get().review_id_id == review.id
+
+    @pytest.mark.django_db(transaction=True)
+    def test_create_with_bearer_token(self, user, title, review,
+                                      bearer_client, shared_cache):
+        client = bearer_client(user)
+        client.get('/api/v1/titles/')
+        user_cache._users.clear()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = client.post(
+                comments_url(title.id, review.id), {'text': 'Текст'})
+
+        assert response.status_code == 201
+        assert response.json()['author'] == user.username
+        # Проверка отзыва и вставка, автор - из claims токена.
+        assert statements(queries) == ['SELECT', 'INSERT']
@@ -0,0 +1,85 @@
+import gzip
+import json
+
+import pytest
+from core import compression
+from reviews.models import Review
+
+from .utils import body
+
+brotli = pytest.importorskip('brotli')
+
+
+@pytest.fixture
+def reviews(title, django_user_model):
+    users = [
+        django_user_model.objects.create(username=f'reader{i}',
+                                         email=f'reader{i}@yamdb.fake')
+        for i in range(60)
+    ]
+    Review.objects.bulk_create(
+        Review(title=title, author=user, text='Длинный отзыв. ' * 40,
+               score=7)
+        for user in users
+    )
+    return f'/api/v1/titles/{title.id}/reviews/'
+
+
+def test_choose_encoding():
+    assert compression.choose_encoding('gzip, deflate, br') == 'br'
+    assert compression.choose_encoding('gzip') == 'gzip'
+    assert compression.choose_encoding('br;q=0, gzip;q=0.5') == 'gzip'
+    assert compression.choose_encoding('*') == 'br'
+    assert compression.choose_encoding('*;q=0, identity') is None
+    assert compression.choose_encoding('') is None
+
+
+@pytest.mark.django_db(transaction=True)
+class TestCompression:
+
+    def test_gzip(self, user_client, reviews):
+        plain = user_client.get(reviews)
+        response = user_client.get(reviews, HTTP_ACCEPT_ENCODING='gzip')
+
+        assert response['Content-Encoding'] == 'gzip'
+        assert 'Accept-Encoding' in response['Vary']
+        assert gzip.decompress(body(response)) == body(plain)
+        assert response['ETag'] == 'W/' + plain['ETag']
+
+    def test_brotli_streamed_page(self, user_client, reviews):
+        url = f'{reviews}?page_size=100'
+        plain = user_client.get(url)
+        response = user_client.get(url, HTTP_ACCEPT_ENCODING='gzip, br')
+
+        assert plain.streaming and response.streaming
+        assert response['Content-Encoding'] == 'br'
+        assert 'Content-Length' not in response
+        data = json.loads(brotli.decompress(body(response)))
+        assert len(data['results']) == 60
+        assert json.loads(body(plain)) == data
+
+    def test_small_responses_are_not_compressed(self, user_client, title):
+        response = user_client.get(f'/api/v1/titles/{title.id}/',
+                                   HTTP_ACCEPT_ENCODING='gzip')
+
+        assert 'Content-Encoding' not in response
+        assert response.json()['id'] == title.id
+
+    def test_weak_etag_not_modified(self, user_client, reviews):
+        etag = user_client.get(reviews, HTTP_ACCEPT_ENCODING='gzip')['ETag']
+
+        response = user_client.get(reviews, HTTP_ACCEPT_ENCODING='gzip',
+                                   HTTP_IF_NONE_MATCH=etag)
+
+        assert etag.startswith('W/"')
+        assert response.status_code == 304
+
+    def test_streamed_page_matches_buffered(self, user_client, reviews,
+                                            monkeypatch):
+        url = f'{reviews}?page_size=100'
+        streamed = user_client.get(url)
+        monkeypatch.setattr('api.v1.fast.STREAMING_MIN_ROWS', 1000)
+        buffered = user_client.get(url)
+
+        assert streamed.streaming and not buffered.streaming
+        assert body(streamed) == buffered.content
@@ -0,0 +1,78 @@
+import pytest
+from reviews.models import Review
+
+
+@pytest.mark.django_db(transaction=True)
+class TestConditionalGet:
+
+    def test_etag_not_modified(self, api_client, user, title,
+                               django_assert_num_queries):
+        Review.objects.create(title=title, author=user, text='Отзыв', score=7)
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        response = api_client.get(url)
+        etag = response['ETag']
+
+        assert response.status_code == 200
+        assert etag.startswith('"')
+        assert 'Last-Modified' in response
+
+        with django_assert_num_queries(0):
+            response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == 304
+        assert response['ETag'] == etag
+        assert not response.content
+
+    def test_change_gives_new_etag(self, api_client, user, title):
+        url = f'/api/v1/titles/{title.id}/'
+        etag = api_client.get(url)['ETag']
+
+        Review.objects.create(title=title, author=user, text='Отзыв', score=3)
+        response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == 200
+        assert response['ETag'] != etag
+        assert response.json()['rating'] == 3
+
+    def test_if_modified_since(self, api_client, user, title):
+        review = Review.objects.create(
+            title=title, author=user, text='Отзыв', score=7)
+        url = f'/api/v1/titles/{title.id}/reviews/{review.id}/comments/'
+        last_modified = api_client.get(url)['Last-Modified']
+
+        response = api_client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+
+        assert response.status_code == 304
+
+    def test_etag_depends_on_query(self, api_client, title):
+        url = '/api/v1/titles/'
+
+        assert (api_client.get(url, {'year': 1994})['ETag']
+                != api_client.get(url, {'year': 1995})['ETag'])
+
+    def test_author_rename_gives_new_etag(self, api_client, user, title):
+        Review.objects.create(title=title, author=user, text='Отзыв', score=7)
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        etag = api_client.get(url)['ETag']
+
+        user.username = 'RenamedUser'
+        user.save()
+        response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == 200
+        assert response.json()['results'][0]['author'] == 'RenamedUser'
+
+    def test_if_none_match_any(self, api_client, user, title):
+        review = Review.objects.create(
+            title=title, author=user, text='Отзыв', score=7)
+
+        for url in (f'/api/v1/titles/{title.id + 1}/reviews/',
+                    f'/api/v1/titles/{title.id}/reviews/{review.id + 1}/'):
+            assert api_client.get(
+                url, HTTP_IF_NONE_MATCH='*').status_code == 404
+        response = api_client.get(
+            f'/api/v1/titles/{title.id}/reviews/{review.id}/',
+            HTTP_IF_NONE_MATCH='*')
+
+        assert response.status_code == 304
+        assert not response.content
@@ -0,0 +1,77 @@
+import re
+from datetime import timedelta
+
+import pytest
+from core.models import OutboxEmail
+from django.utils import timezone
+from users.confirmation import check_code, issue_code
+from users.models import User
+
+
+def signup(client, username='newuser', email='newuser@yamdb.fake'):
+    response = client.post('/api/v1/auth/signup/', {
+        'username': username, 'email': email})
+    assert response.status_code == 200
+    body = OutboxEmail.objects.filter(recipients=email).latest('id').body
+    return re.search(r'confirmation_code: (\w+)', body).group(1)
+
+
+def get_token(client, username, code):
+    return client.post('/api/v1/auth/token/', {
+        'username': username, 'confirmation_code': code})
+
+
+@pytest.mark.django_db
+class TestConfirmationCode:
+
+    def test_code_is_single_use(self, api_client):
+        code = signup(api_client)
+
+        assert get_token(api_client, 'newuser', code).status_code == 200
+        assert get_token(api_client, 'newuser', code).status_code == 400
+
+    def test_code_is_not_stored_in_clear(self, api_client):
+        code = signup(api_client)
+        user = User.objects.get(username='newuser')
+
+        assert user.confirmation_code
+        assert code not in user.confirmation_code
+        assert not user.has_usable_password()
+
+    def test_new_signup_replaces_code(self, api_client):
+        old_code = signup(api_client)
+        new_code = signup(api_client)
+
+        assert get_token(api_client, 'newuser', old_code).status_code == 400
+        assert get_token(api_client, 'newuser', new_code).status_code == 200
+
+    def test_expired_code(self, api_client, user):
+        code = issue_code(user)
+        user.confirmation_code_expires_at = timezone.now() - timedelta(
+            seconds=1)
+        user.save()
+
+        assert not check_code(user, code)
+        assert get_token(api_client, user.username, code).status_code == 400
+
+    def test_code_is_bound_to_user(self, user, another_user):
+        code = issue_code(user)
+        another_user.confirmation_code = user.confirmation_code
+        another_user.confirmation_code_expires_at = (
+            user.confirmation_code_expires_at)
+
+        assert check_code(user, code)
+        assert not check_code(another_user, code)
+
+    def test_rename_invalidates_code(self, user):
+        code = issue_code(user)
+        user.username = 'renamed'
+
+        assert not check_code(user, code)
+
+    def test_password_is_kept(self, api_client, user):
+        code = signup(api_client, user.username, user.email)
+
+        assert get_token(api_client, user.username, code).status_code == 200
+        user.refresh_from_db()
+        assert user.check_password('1234567')
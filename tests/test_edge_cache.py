@@ -0,0 +1,100 @@
+import queue
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from api.v1 import edge
+from reviews.models import Title
+
+
+@pytest.fixture
+def fake_nginx(monkeypatch):
+    """HTTP-сервер вместо nginx: складывает полученные запросы в очередь."""
+    received = queue.Queue()
+
+    class Handler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            received.put((self.path, dict(self.headers)))
+            self.send_response(200)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(edge, 'REFRESH_URL',
+                        f'http://127.0.0.1:{server.server_port}')
+    yield received
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.django_db(transaction=True)
+class TestEdgeCache:
+
+    def test_anonymous_response_is_public(self, api_client, title):
+        response = api_client.get('/api/v1/titles/')
+
+        assert response.status_code == 200
+        cache_control = response['Cache-Control']
+        assert 'public' in cache_control
+        assert f's-maxage={edge.EDGE_CACHE_TIMEOUT}' in cache_control
+        assert response['X-Accel-Expires'] == str(edge.EDGE_CACHE_TIMEOUT)
+        assert response['Surrogate-Key'] == (
+            'categories genres reviews titles')
+        response = api_client.get('/api/v1/genres/')
+        assert response['Surrogate-Key'] == 'genres'
+
+    def test_authenticated_response_is_private(self, user_client, title):
+        response = user_client.get(f'/api/v1/titles/{title.id}/')
+
+        assert response.status_code == 200
+        assert 'private' in response['Cache-Control']
+        assert 'Surrogate-Key' not in response
+        assert 'X-Accel-Expires' not in response
+
+    def test_errors_and_writes_are_not_cached(self, api_client,
+                                              admin_client):
+        response = api_client.get('/api/v1/titles/0/')
+        assert response.status_code == 404
+        assert 'X-Accel-Expires' not in response
+
+        response = admin_client.post('/api/v1/genres/',
+                                     {'name': 'Драма', 'slug': 'drama-2'})
+        assert response.status_code == 201
+        assert 'Surrogate-Key' not in response
+
+    def test_write_refreshes_cached_urls(self, api_client, category,
+                                         fake_nginx):
+        api_client.get('/api/v1/titles/?year=1994',
+                       HTTP_ACCEPT='application/json',
+                       HTTP_ACCEPT_ENCODING='gzip')
+        api_client.get('/api/v1/categories/')
+
+        Title.objects.create(name='Новое', year=2020, category=category)
+
+        path, headers = fake_nginx.get(timeout=5)
+        assert path == '/api/v1/titles/?year=1994'
+        assert headers[edge.REFRESH_HEADER] == '1'
+        assert headers['Host'] == 'testserver'
+        assert headers['Accept'] == 'application/json'
+        assert headers['Accept-Encoding'] == 'gzip'
+        with pytest.raises(queue.Empty):
+            # Категории от произведений не зависят.
+            fake_nginx.get(timeout=0.5)
+
+    def test_refresh_limit(self, api_client, fake_nginx, monkeypatch):
+        monkeypatch.setattr(edge, 'REFRESH_LIMIT', 2)
+        for page in range(1, 5):
+            api_client.get(f'/api/v1/genres/?search={page}')
+
+        edge.purge(['genres'])
+
+        paths = {fake_nginx.get(timeout=5)[0] for _ in range(2)}
+        assert paths == {'/api/v1/genres/?search=3',
+                         '/api/v1/genres/?search=4'}
+        assert fake_nginx.empty()
@@ -0,0 +1,121 @@
+import csv
+import io
+import json
+from datetime import timedelta
+
+import pytest
+from api.v1 import export
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from reviews.models import Review, Title
+
+from .utils import statements
+
+EXPORT_URL = '/api/v1/titles/export/'
+
+
+def read(response):
+    return b''.join(response.streaming_content).decode()
+
+
+def ndjson(response):
+    return [json.loads(line) for line in read(response).splitlines()]
+
+
+@pytest.fixture
+def catalog(title, genres, category):
+    titles = [title]
+    for year in range(2000, 2005):
+        other = Title.objects.create(name=f'Фильм {year}', year=year)
+        other.genre.set(genres[:1])
+        titles.append(other)
+    return titles
+
+
+@pytest.mark.django_db
+class TestTitleExport:
+
+    def test_admin_only(self, api_client, user_client):
+        assert api_client.get(EXPORT_URL).status_code == 401
+        assert user_client.get(EXPORT_URL).status_code == 403
+
+    def test_ndjson(self, admin_client, title, user):
+        Review.objects.create(title=title, author=user, text='Отзыв',
+                              score=7)
+
+        response = admin_client.get(EXPORT_URL)
+
+        assert response.status_code == 200
+        assert response.streaming
+        assert response['Content-Type'] == 'application/x-ndjson'
+        row, = ndjson(response)
+        detail = admin_client.get(f'/api/v1/titles/{title.id}/').json()
+        title.refresh_from_db()
+        assert row == {**detail,
+                       'updated_at': title.updated_at.isoformat()}
+
+    def test_csv(self, admin_client, title):
+        response = admin_client.get(EXPORT_URL, {'format': 'csv'})
+
+        assert response.status_code == 200
+        assert response['Content-Type'] == 'text/csv'
+        header, row = csv.reader(io.StringIO(read(response)))
+        assert header == list(export.CSV_COLUMNS)
+        assert row[:7] == [str(title.id), title.name, '1994', '',
+                           'Описание', 'drama|comedy', 'movie']
+
+    def test_constant_queries_per_chunk(self, admin_client, catalog,
+                                        monkeypatch):
+        monkeypatch.setattr(export, 'CHUNK_SIZE', 2)
+
+        with CaptureQueriesContext(connection) as queries:
+            rows = ndjson(admin_client.get(EXPORT_URL))
+
+        assert len(rows) == len(catalog)
+        assert {row['id'] for row in rows} == {title.id for title in catalog}
+        # Жанры и категории, курсор по произведениям и жанры трёх пачек.
+        assert len(statements(queries)) == 3 + 3
+
+    def test_since(self, admin_client, catalog):
+        old = timezone.now() - timedelta(days=1)
+        Title.objects.update(updated_at=old)
+        changed = catalog[2:4]
+        now = timezone.now()
+        Title.objects.filter(pk=changed[0].pk).update(updated_at=now)
+        Title.objects.filter(pk=changed[1].pk).update(
+            updated_at=now + timedelta(seconds=1))
+
+        rows = ndjson(admin_client.get(
+            EXPORT_URL, {'since': (old + timedelta(hours=1)).isoformat()}))
+
+        assert [row['id'] for row in rows] == [title.id for title in changed]
+
+    def test_invalid_since(self, admin_client):
+        response = admin_client.get(EXPORT_URL, {'since': 'вчера'})
+
+        assert response.status_code == 400
+        assert 'since' in json.loads(response.content)
+
+
+@pytest.mark.django_db
+class TestTitleUpdatedAt:
+
+    def updated_at(self, title):
+        return Title.objects.values_list(
+            'updated_at', flat=True).get(pk=title.pk)
+
+    def test_bumped_by_related_changes(self, title, genres, category,
+                                       user):
+        old = timezone.now() - timedelta(days=1)
+        for change in (
+            lambda: Review.objects.create(title=title, author=user,
+                                          text='Отзыв', score=5),
+            lambda: title.genre.remove(genres[0]),
+            lambda: genres[1].titles.clear(),
+            lambda: category.save(),
+            lambda: category.delete(),
+        ):
+            Title.objects.filter(pk=title.pk).update(updated_at=old)
+            change()
+            assert self.updated_at(title) > old
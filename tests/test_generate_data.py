@@ -0,0 +1,86 @@
+import pytest
+from django.core.management import CommandError, call_command
+from reviews.models import Comment, GenreTitle, Review, Title
+from reviews.synthetic import DatasetGenerator
+from scripts import load
+from users.models import User
+
+SIZES = dict(users=30, titles=20, genres=5, categories=3, reviews=200,
+             comments=300)
+
+
+def read_csv(directory):
+    return {path.name: path.read_text(encoding='utf-8')
+            for path in sorted(directory.iterdir())}
+
+
+def test_same_seed_same_dataset(tmp_path):
+    call_command('generate_data', csv=str(tmp_path / 'a'), seed=7,
+                 **SIZES)
+    call_command('generate_data', csv=str(tmp_path / 'b'), seed=7,
+                 **SIZES)
+    call_command('generate_data', csv=str(tmp_path / 'c'), seed=8,
+                 **SIZES)
+
+    first = read_csv(tmp_path / 'a')
+    assert set(first) == {
+        'users.csv', 'category.csv', 'genre.csv', 'titles.csv',
+        'genre_title.csv', 'review.csv', 'comments.csv'}
+    assert first == read_csv(tmp_path / 'b'), (
+        'Один и тот же seed должен давать одинаковые данные'
+    )
+    assert first != read_csv(tmp_path / 'c')
+
+
+def test_popularity_is_skewed():
+    # Пользователей с запасом: число отзывов на хит не упирается в них.
+    generator = DatasetGenerator(seed=1, **dict(SIZES, users=1000,
+                                                titles=100, reviews=2000))
+    list(generator.title_records())
+    per_title = {}
+    pairs = set()
+    for review, _ in generator.review_records():
+        per_title[review[5]] = per_title.get(review[5], 0) + 1
+        pairs.add((review[4], review[5]))
+
+    assert sum(per_title.values()) == len(pairs) == 2000, (
+        'Один автор пишет не больше одного отзыва на произведение'
+    )
+    counts = sorted(per_title.values(), reverse=True)
+    assert counts[0] > 5 * counts[len(counts) // 2]
+
+
+@pytest.mark.django_db(transaction=True)
+class TestGenerateDataCommand:
+
+    def test_writes_database(self):
+        call_command('generate_data', **SIZES)
+
+        assert User.objects.count() == SIZES['users']
+        assert Title.objects.count() == SIZES['titles']
+        assert Review.objects.count() == SIZES['reviews']
+        assert Comment.objects.count() > 0
+        assert GenreTitle.objects.count() >= SIZES['titles']
+        call_command('rebuild_ratings', check=True)
+
+        hit = Title.objects.order_by('-reviews_count').first()
+        assert hit.reviews_count == Review.objects.filter(title=hit).count()
+
+    def test_refuses_non_empty_database(self):
+        call_command('generate_data', **SIZES)
+
+        with pytest.raises(CommandError):
+            call_command('generate_data', **SIZES)
+
+        call_command('generate_data', clear=True, seed=2, **SIZES)
+        assert Review.objects.count() == SIZES['reviews']
+
+    def test_csv_loads_with_load_script(self, tmp_path, monkeypatch):
+        call_command('generate_data', csv=str(tmp_path), **SIZES)
+        monkeypatch.setattr(load, 'DATA_DIR', str(tmp_path))
+
+        load.bulk_load(batch_size=50)
+
+        assert Title.objects.count() == SIZES['titles']
+        assert Review.objects.count() == SIZES['reviews']
+        call_command('rebuild_ratings', check=True)
@@ -0,0 +1,116 @@
+import pytest
+from api.v1.authentication import get_access_token
+from django.core.cache import cache
+from rest_framework_simplejwt.tokens import AccessToken
+from users import cache as user_cache
+from users.confirmation import issue_code
+from users.models import User
+
+
+@pytest.mark.django_db(transaction=True)
+class TestJWTPrincipal:
+
+    def test_token_claims(self, admin):
+        token = AccessToken(str(get_access_token(admin)))
+
+        assert token['username'] == admin.username
+        assert token['role'] == 'admin'
+        assert token['is_superuser'] is False
+
+    def test_token_view_issues_claims(self, api_client, user):
+        code = issue_code(user)
+        user.save()
+
+        response = api_client.post('/api/v1/auth/token/', {
+            'username': user.username, 'confirmation_code': code})
+
+        assert response.status_code == 200
+        assert AccessToken(response.json()['token'])['role'] == 'user'
+
+    def test_no_user_query(self, admin, bearer_client, shared_cache,
+                           django_assert_num_queries):
+        client = bearer_client(admin)
+        client.get('/api/v1/users/')
+
+        # COUNT и страница пользователей, без запроса самого пользователя.
+        with django_assert_num_queries(2):
+            response = client.get('/api/v1/users/')
+
+        assert response.status_code == 200
+
+    def test_principal_can_write(self, user, title, bearer_client):
+        client = bearer_client(user)
+
+        response = client.post(f'/api/v1/titles/{title.id}/reviews/',
+                               {'text': 'Отзыв', 'score': 8})
+
+        assert response.status_code == 201
+        assert response.json()['author'] == user.username
+        assert client.get('/api/v1/users/me/').json()['email'] == user.email
+
+    def test_role_change_applies_at_once(self, admin, admin_client,
+                                         bearer_client):
+        moderator = User.objects.create(
+            username='moder', email='moder@yamdb.fake', role='admin')
+        client = bearer_client(moderator)
+        assert client.get('/api/v1/users/').status_code == 200
+
+        response = admin_client.patch(
+            f'/api/v1/users/{moderator.username}/', {'role': 'moderator'})
+        assert response.status_code == 200
+
+        assert client.get('/api/v1/users/').status_code == 403
+
+    @pytest.mark.parametrize('shared', [True, False])
+    def test_role_change_survives_cache_eviction(self, admin_client,
+                                                 bearer_client, monkeypatch,
+                                                 shared):
+        monkeypatch.setattr(user_cache, 'SHARED', shared)
+        demoted = User.objects.create(
+            username='demoted', email='demoted@yamdb.fake', role='admin')
+        client = bearer_client(demoted)
+        assert client.get('/api/v1/users/').status_code == 200
+
+        admin_client.patch(f'/api/v1/users/{demoted.username}/',
+                           {'role': 'user'})
+        assert client.get('/api/v1/users/').status_code == 403
+
+        # Отметка вытеснена из кэша, запрос пришёл в другой воркер.
+        cache.clear()
+        user_cache._users.clear()
+        user_cache._changed.clear()
+        assert client.get('/api/v1/users/').status_code == 403
+
+    def test_local_cache_keeps_changes_in_process(
+            self, admin, bearer_client, django_assert_num_queries):
+        client = bearer_client(admin)
+        client.get('/api/v1/users/')
+
+        # COUNT и страница пользователей: время изменения в процессе.
+        with django_assert_num_queries(2):
+            client.get('/api/v1/users/')
+
+    def test_local_cache_rereads_changes_after_ttl(
+            self, admin_client, bearer_client, monkeypatch):
+        demoted = User.objects.create(
+            username='demoted', email='demoted@yamdb.fake', role='admin')
+        client = bearer_client(demoted)
+        assert client.get('/api/v1/users/').status_code == 200
+        stale = user_cache._changed[demoted.pk]
+
+        admin_client.patch(f'/api/v1/users/{demoted.username}/',
+                           {'role': 'user'})
+        # Другой воркер: изменения не видел, время прочитано до него.
+        user_cache._users.clear()
+        user_cache._changed[demoted.pk] = stale
+        assert client.get('/api/v1/users/').status_code == 200
+
+        monkeypatch.setattr(user_cache, 'CHANGED_LOCAL_TTL', 0)
+        assert client.get('/api/v1/users/').status_code == 403
+
+    def test_deleted_user_is_rejected(self, admin_client, user,
+                                      bearer_client):
+        client = bearer_client(user)
+        admin_client.delete(f'/api/v1/users/{user.username}/')
+
+        assert client.get('/api/v1/users/me/').status_code == 401
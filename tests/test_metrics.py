@@ -0,0 +1,110 @@
+import os
+import subprocess
+import sys
+
+import pytest
+from core import metrics
+from django.conf import settings
+from prometheus_client import REGISTRY
+from prometheus_client.multiprocess import mark_process_dead
+
+# Воркер: один запрос через middleware и один "зависший" запрос в обработке.
+WORKER_SCRIPT = '''
+import os
+import django
+django.setup()
+from django.test import Client
+from core import metrics
+Client().get('/metrics')
+metrics.IN_PROGRESS.inc()
+print(os.getpid())
+'''
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+@pytest.mark.django_db
+class TestMetricsMiddleware:
+
+    def test_request_is_measured(self, admin_client, title):
+        labels = {'route': 'titles-detail', 'method': 'GET'}
+        count = sample('yamdb_http_request_duration_seconds_count', **labels)
+        queries = sample('yamdb_http_request_db_queries_sum', **labels)
+        ok = sample('yamdb_http_requests_total', status='200', **labels)
+
+        response = admin_client.get(f'/api/v1/titles/{title.id}/')
+
+        assert response.status_code == 200
+        assert sample('yamdb_http_request_duration_seconds_count',
+                      **labels) == count + 1
+        assert sample('yamdb_http_requests_total', status='200',
+                      **labels) == ok + 1
+        assert sample('yamdb_http_request_db_queries_sum',
+                      **labels) > queries
+        assert sample('yamdb_http_request_db_duration_seconds_count',
+                      **labels) == count + 1
+        assert sample('yamdb_http_response_size_bytes_sum',
+                      **labels) >= len(response.content)
+        assert sample('yamdb_http_requests_in_progress') == 0
+
+    def test_streamed_response_size(self, admin_client, title):
+        labels = {'route': 'titles-export', 'method': 'GET'}
+        count = sample('yamdb_http_response_size_bytes_count', **labels)
+        total = sample('yamdb_http_response_size_bytes_sum', **labels)
+
+        response = admin_client.get('/api/v1/titles/export/')
+        content = b''.join(response.streaming_content)
+
+        assert response.streaming
+        assert sample('yamdb_http_response_size_bytes_count',
+                      **labels) == count + 1
+        assert sample('yamdb_http_response_size_bytes_sum',
+                      **labels) == total + len(content)
+
+    def test_unresolved_route(self, api_client):
+        labels = {'route': metrics.UNRESOLVED_ROUTE, 'method': 'GET'}
+        count = sample('yamdb_http_request_duration_seconds_count', **labels)
+
+        response = api_client.get('/api/v1/titles/abc/reviews/')
+
+        assert response.status_code == 404
+        assert sample('yamdb_http_request_duration_seconds_count',
+                      **labels) == count + 1
+
+    def test_metrics_endpoint(self, api_client):
+        api_client.get('/api/v1/genres/')
+
+        response = api_client.get('/metrics')
+
+        assert response.status_code == 200
+        assert response['Content-Type'].startswith('text/plain')
+        body = response.content.decode()
+        assert ('yamdb_http_request_duration_seconds_bucket{'
+                'le="0.005",method="GET",route="genres-list"}') in body
+        assert 'yamdb_http_requests_in_progress' in body
+
+
+def test_workers_are_aggregated(tmp_path, monkeypatch):
+    env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=str(tmp_path),
+               DJANGO_SETTINGS_MODULE='api_yamdb.settings',
+               DB_ENGINE='django.db.backends.sqlite3')
+    pids = [
+        int(subprocess.check_output([sys.executable, '-c', WORKER_SCRIPT],
+                                    cwd=settings.BASE_DIR, env=env))
+        for _ in range(2)
+    ]
+    monkeypatch.setenv('PROMETHEUS_MULTIPROC_DIR', str(tmp_path))
+
+    def value(name, **labels):
+        return metrics.get_registry().get_sample_value(name, labels)
+
+    labels = {'route': 'metrics', 'method': 'GET'}
+    assert value('yamdb_http_request_duration_seconds_count', **labels) == 2
+    assert value('yamdb_http_requests_total', status='200', **labels) == 2
+    assert value('yamdb_http_requests_in_progress') == 2
+
+    # gunicorn.conf.py вызывает это при завершении воркера.
+    mark_process_dead(pids[0], str(tmp_path))
+    assert value('yamdb_http_requests_in_progress') == 1
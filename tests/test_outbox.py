@@ -0,0 +1,107 @@
+import json
+import smtplib
+
+import pytest
+from core import outbox
+from core.models import OutboxEmail, OutboxStatus
+from django.core import mail
+from django.core.management import call_command
+from django.db import connection
+from django.utils import timezone
+
+
+@pytest.mark.django_db
+class TestOutbox:
+
+    def test_signup_enqueues_without_sending(self, api_client):
+        response = api_client.post('/api/v1/auth/signup/', {
+            'username': 'newuser', 'email': 'newuser@yamdb.fake'})
+
+        assert response.status_code == 200
+        assert len(mail.outbox) == 0
+        email = OutboxEmail.objects.get()
+        assert email.recipients == 'newuser@yamdb.fake'
+        assert 'confirmation_code' in email.body
+
+    def test_worker_sends_batch(self, api_client):
+        for i in range(3):
+            outbox.enqueue_mail('Тема', f'Текст {i}', None,
+                                [f'user{i}@yamdb.fake'])
+
+        call_command('send_outbox', '--once', '--batch-size', '2')
+        assert len(mail.outbox) == 2
+        call_command('send_outbox', '--once')
+
+        assert len(mail.outbox) == 3
+        assert not OutboxEmail.objects.exclude(status=OutboxStatus.SENT)
+        assert mail.outbox[0].to == ['user0@yamdb.fake']
+        assert mail.outbox[0].body == 'Текст 0'
+        # Код подтверждения не остаётся в базе после отправки.
+        assert set(OutboxEmail.objects.values_list('body', flat=True)) == {
+            ''}
+
+    def test_retry_with_backoff(self, monkeypatch):
+        email = outbox.enqueue_mail('Тема', 'Текст', None, ['a@yamdb.fake'])
+
+        def broken_send(self):
+            raise smtplib.SMTPServerDisconnected('down')
+
+        monkeypatch.setattr(outbox.EmailMessage, 'send', broken_send)
+        assert outbox.send_batch(max_attempts=2) == (0, 1)
+        email.refresh_from_db()
+        assert email.status == OutboxStatus.PENDING
+        assert email.next_attempt_at > timezone.now()
+        assert outbox.send_batch(max_attempts=2) == (0, 0)
+
+        OutboxEmail.objects.update(next_attempt_at=timezone.now())
+        assert outbox.send_batch(max_attempts=2) == (0, 1)
+        email.refresh_from_db()
+        assert email.status == OutboxStatus.FAILED
+        assert email.attempts == 2
+
+    def test_smtp_connection_failure_counts_attempt(self, monkeypatch):
+        email = outbox.enqueue_mail('Тема', 'Текст', None, ['a@yamdb.fake'])
+
+        class BrokenConnection:
+            def __enter__(self):
+                raise ConnectionRefusedError('smtp down')
+
+            def __exit__(self, *args):
+                return False
+
+        monkeypatch.setattr(outbox, 'get_connection', BrokenConnection)
+        assert outbox.send_batch() == (0, 1)
+
+        email.refresh_from_db()
+        assert email.attempts == 1
+        assert 'smtp down' in email.last_error
+        assert email.next_attempt_at > timezone.now()
+        assert outbox.send_batch() == (0, 0)
+
+    def test_stats(self, capsys):
+        outbox.enqueue_mail('Тема', 'Текст', None, ['a@yamdb.fake'])
+        outbox.enqueue_mail('Тема', 'Текст', None, ['b@yamdb.fake'])
+        outbox.send_batch(batch_size=1)
+
+        call_command('send_outbox', '--stats')
+        stats = json.loads(capsys.readouterr().out)
+
+        assert stats['queue_depth'] == 1
+        assert stats['send_latency_avg_seconds'] >= 0
+
+
+@pytest.mark.django_db(transaction=True)
+def test_sends_outside_transaction(monkeypatch):
+    outbox.enqueue_mail('Тема', 'Текст', None, ['a@yamdb.fake'])
+    seen = {}
+    send = outbox.EmailMessage.send
+
+    def checked_send(self):
+        seen['in_atomic_block'] = connection.in_atomic_block
+        # Письмо уже забрано: другой воркер его не возьмёт.
+        seen['claimed'] = outbox.claim_batch()
+        return send(self)
+
+    monkeypatch.setattr(outbox.EmailMessage, 'send', checked_send)
+    assert outbox.send_batch() == (1, 0)
+    assert seen == {'in_atomic_block': False, 'claimed': []}
@@ -0,0 +1,86 @@
+import pytest
+from django.utils import timezone
+from reviews.models import Comment, Review
+from users.models import User
+
+
+def create_reviews(title, count, pub_date):
+    users = [
+        User.objects.create(
+            username=f'reviewer{i}', email=f'reviewer{i}@yamdb.fake')
+        for i in range(count)
+    ]
+    reviews = Review.objects.bulk_create(
+        Review(title=title, author=user, text='Отзыв', score=5)
+        for user in users
+    )
+    # Одинаковое время публикации проверяет порядок по id внутри ключа.
+    Review.objects.filter(title=title).update(pub_date=pub_date)
+    return reviews
+
+
+@pytest.mark.django_db(transaction=True)
+class TestKeysetPagination:
+
+    def test_page_number_is_default(self, api_client, title):
+        create_reviews(title, 12, timezone.now())
+
+        response = api_client.get(f'/api/v1/titles/{title.id}/reviews/')
+
+        data = response.json()
+        assert response.status_code == 200
+        assert data['count'] == 12
+        assert len(data['results']) == 10
+
+    def test_cursor_walks_all_reviews_once(self, api_client, user, title):
+        create_reviews(title, 25, timezone.now() - timezone.timedelta(days=1))
+        expected = list(
+            Review.objects.filter(title=title)
+            .order_by('-pub_date', '-id').values_list('id', flat=True))
+
+        url = f'/api/v1/titles/{title.id}/reviews/?pagination=cursor'
+        seen = []
+        while url:
+            data = api_client.get(url).json()
+            assert 'count' not in data
+            seen.extend(review['id'] for review in data['results'])
+            if len(seen) == 10:
+                # Новый отзыв между страницами не должен сдвигать выдачу.
+                Review.objects.create(
+                    title=title, author=user, text='Новый', score=1)
+            url = data['next']
+
+        assert seen == expected
+
+    def test_previous_link(self, api_client, title):
+        create_reviews(title, 25, timezone.now())
+        first = api_client.get(
+            f'/api/v1/titles/{title.id}/reviews/?pagination=cursor').json()
+        second = api_client.get(first['next']).json()
+        back = api_client.get(second['previous']).json()
+
+        assert first['previous'] is None
+        assert back['results'] == first['results']
+
+    def test_comments_cursor(self, api_client, user, title):
+        review = Review.objects.create(
+            title=title, author=user, text='Отзыв', score=5)
+        Comment.objects.bulk_create(
+            Comment(review_id=review, author=user, text=f'Комментарий {i}')
+            for i in range(15)
+        )
+        url = (f'/api/v1/titles/{title.id}/reviews/{review.id}/comments/'
+               '?pagination=cursor')
+
+        first = api_client.get(url).json()
+        second = api_client.get(first['next']).json()
+
+        assert len(first['results']) == 10
+        assert len(second['results']) == 5
+        assert second['next'] is None
+
+    def test_invalid_cursor(self, api_client, title):
+        response = api_client.get(
+            f'/api/v1/titles/{title.id}/reviews/?cursor=broken')
+
+        assert response.status_code == 404
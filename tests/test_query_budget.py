@@ -0,0 +1,82 @@
+import json
+
+import pytest
+from reviews.models import Category, Comment, Genre, Review, Title
+from users.models import User
+
+from .utils import body
+
+PAGE_SIZES = (1, 10, 100)
+
+# Максимальное число SQL-запросов на эндпоинт при любом размере страницы.
+QUERY_BUDGETS = {
+    'titles-list': ('/api/v1/titles/', 3),
+    'titles-detail': ('/api/v1/titles/{title}/', 2),
+    'genres-list': ('/api/v1/genres/', 2),
+    'categories-list': ('/api/v1/categories/', 2),
+    'reviews-list': ('/api/v1/titles/{title}/reviews/', 2),
+    'reviews-detail': ('/api/v1/titles/{title}/reviews/{review}/', 1),
+    'comments-list': (
+        '/api/v1/titles/{title}/reviews/{review}/comments/', 2),
+    'comments-detail': (
+        '/api/v1/titles/{title}/reviews/{review}/comments/{comment}/', 1),
+    'users-list': ('/api/v1/users/', 2),
+}
+
+
+@pytest.fixture
+def dataset(admin):
+    size = max(PAGE_SIZES)
+    categories = [
+        Category.objects.create(name=f'Категория {i}', slug=f'category-{i}')
+        for i in range(size)
+    ]
+    genres = [
+        Genre.objects.create(name=f'Жанр {i}', slug=f'genre-{i}')
+        for i in range(size)
+    ]
+    users = [
+        User.objects.create(username=f'user{i}', email=f'user{i}@yamdb.fake')
+        for i in range(size)
+    ]
+    titles = [
+        Title.objects.create(name=f'Произведение {i}', year=2000,
+                             category=categories[i])
+        for i in range(size)
+    ]
+    for i, title in enumerate(titles):
+        title.genre.set([genres[i], genres[(i + 1) % size]])
+    reviews = [
+        Review.objects.create(title=titles[0], author=user, text='Отзыв',
+                              score=5)
+        for user in users
+    ]
+    comments = [
+        Comment.objects.create(review_id=reviews[0], author=user,
+                               text='Комментарий')
+        for user in users
+    ]
+    return {
+        'title': titles[0].id,
+        'review': reviews[0].id,
+        'comment': comments[0].id,
+    }
+
+
+@pytest.mark.django_db
+class TestQueryBudget:
+
+    @pytest.mark.parametrize('page_size', PAGE_SIZES)
+    @pytest.mark.parametrize('route', sorted(QUERY_BUDGETS))
+    def test_query_budget(self, admin_client, dataset,
+                          django_assert_max_num_queries, route, page_size):
+        url, budget = QUERY_BUDGETS[route]
+        url = url.format(**dataset)
+
+        with django_assert_max_num_queries(budget):
+            response = admin_client.get(url, {'page_size': page_size})
+
+        content = body(response)
+        assert response.status_code == 200, content
+        if route.endswith('-list'):
+            assert len(json.loads(content)['results']) == page_size
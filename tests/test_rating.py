@@ -0,0 +1,227 @@
+import pytest
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import Avg
+from django.test.utils import CaptureQueriesContext
+from reviews.models import SCORES, Review, Title
+
+
+def expected_histogram(title):
+    scores = list(Review.objects.filter(title=title).values_list(
+        'score', flat=True))
+    return {score: scores.count(score) for score in SCORES}
+
+
+def expected_rating(title):
+    rating = Review.objects.filter(title=title).aggregate(
+        rating=Avg('score'))['rating']
+    return None if rating is None else int(rating)
+
+
+@pytest.mark.django_db(transaction=True)
+class TestTitleRating:
+
+    def test_title_without_reviews(self, api_client, title):
+        response = api_client.get(f'/api/v1/titles/{title.id}/')
+
+        assert response.status_code == 200
+        assert response.json()['rating'] is None, (
+            'Рейтинг произведения без отзывов должен быть null'
+        )
+
+    def test_rating_follows_reviews(self, user_client, api_client,
+                                    another_user, title):
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        response = user_client.post(url, {'text': 'Отзыв', 'score': 10})
+        assert response.status_code == 201
+        review_id = response.json()['id']
+        Review.objects.create(
+            title=title, author=another_user, text='Отзыв', score=5)
+        title.refresh_from_db()
+        assert (title.reviews_count, title.score_sum) == (2, 15)
+        assert title.rating == expected_rating(title) == 7
+
+        user_client.patch(f'{url}{review_id}/', {'score': 2})
+        title.refresh_from_db()
+        assert title.rating == expected_rating(title) == 3
+
+        user_client.delete(f'{url}{review_id}/')
+        response = api_client.get('/api/v1/titles/')
+        assert response.json()['results'][0]['rating'] == 5
+
+        title.refresh_from_db()
+        assert title.score_histogram == expected_histogram(title)
+
+        Review.objects.all().delete()
+        title.refresh_from_db()
+        assert (title.reviews_count, title.score_sum) == (0, 0)
+        assert set(title.score_histogram.values()) == {0}
+
+    def test_stale_instances(self, another_user, title):
+        review = Review.objects.create(
+            title=title, author=another_user, text='Отзыв', score=5)
+        first = Review.objects.get(pk=review.pk)
+        second = Review.objects.get(pk=review.pk)
+
+        first.score = 7
+        first.save()
+        second.score = 9
+        second.save()
+        title.refresh_from_db()
+        assert (title.reviews_count, title.score_sum) == (1, 9)
+
+        first.delete()
+        second.delete()
+        title.refresh_from_db()
+        assert (title.reviews_count, title.score_sum) == (0, 0)
+
+    def test_title_update_keeps_counters(self, admin_client, another_user,
+                                         title):
+        stale = Title.objects.get(pk=title.pk)
+        Review.objects.create(
+            title=title, author=another_user, text='Отзыв', score=8)
+        stale.name = 'Новое название'
+        stale.save()
+
+        title.refresh_from_db()
+        assert title.rating == 8
+
+    def test_rebuild_ratings_command(self, another_user, title):
+        Review.objects.create(
+            title=title, author=another_user, text='Отзыв', score=6)
+        Title.objects.update(reviews_count=0, score_sum=0)
+
+        with pytest.raises(CommandError):
+            call_command('rebuild_ratings', '--check')
+        call_command('rebuild_ratings')
+        call_command('rebuild_ratings', '--check')
+
+        title.refresh_from_db()
+        assert title.rating == 6
+
+        Title.objects.update(score_6_count=0, score_2_count=1)
+        with pytest.raises(CommandError):
+            call_command('rebuild_ratings', '--check')
+        call_command('rebuild_ratings')
+        title.refresh_from_db()
+        assert title.score_histogram == expected_histogram(title)
+
+    def test_review_moved_to_another_title(self, another_user, title):
+        other = Title.objects.create(name='Другое', year=2000)
+        review = Review.objects.create(
+            title=title, author=another_user, text='Отзыв', score=4)
+
+        review.title = other
+        review.score = 9
+        review.save()
+
+        title.refresh_from_db()
+        other.refresh_from_db()
+        assert title.score_histogram == expected_histogram(title)
+        assert other.score_histogram == expected_histogram(other)
+        assert other.score_9_count == 1
+
+    def test_title_delete_skips_counters(self, django_user_model, title):
+        for i in range(5):
+            author = django_user_model.objects.create(
+                username=f'author{i}', email=f'author{i}@yamdb.fake')
+            Review.objects.create(
+                title=title, author=author, text='Отзыв', score=i + 1)
+
+        with CaptureQueriesContext(connection) as queries:
+            title.delete()
+
+        # Ни блокировки каждого отзыва, ни сдвига счётчиков удаляемого
+        # произведения.
+        assert not [query for query in queries
+                    if query['sql'].startswith('UPDATE "reviews_title"')]
+        assert len(queries) < 15
+
+    def test_author_delete_shifts_counters_per_title(self, user,
+                                                     another_user):
+        titles = [Title.objects.create(name=f'Произведение {i}', year=2000)
+                  for i in range(4)]
+        for i, title in enumerate(titles):
+            Review.objects.create(
+                title=title, author=user, text='Отзыв', score=i + 1)
+            Review.objects.create(
+                title=title, author=another_user, text='Отзыв', score=10)
+
+        with CaptureQueriesContext(connection) as queries:
+            user.delete()
+
+        locks = [query for query in queries
+                 if query['sql'].startswith(
+                     'SELECT "reviews_review"."title_id"')]
+        updates = [query for query in queries
+                   if query['sql'].startswith('UPDATE "reviews_title"')]
+        assert (len(locks), len(updates)) == (1, len(titles))
+        for title in titles:
+            title.refresh_from_db()
+            assert title.score_histogram == expected_histogram(title)
+            assert title.reviews_count == 1
+            assert title.rating == expected_rating(title) == 10
+
+
+@pytest.mark.django_db(transaction=True)
+class TestTitleStats:
+
+    def test_stats(self, api_client, title, django_user_model,
+                   django_assert_max_num_queries):
+        for i, score in enumerate((3, 7, 7, 10)):
+            author = django_user_model.objects.create(
+                username=f'critic{i}', email=f'critic{i}@yamdb.fake')
+            Review.objects.create(
+                title=title, author=author, text='Отзыв', score=score)
+
+        with django_assert_max_num_queries(1):
+            response = api_client.get(f'/api/v1/titles/{title.id}/stats/')
+
+        assert response.status_code == 200
+        histogram = dict.fromkeys(map(str, SCORES), 0)
+        histogram.update({'3': 1, '7': 2, '10': 1})
+        assert response.json() == {
+            'id': title.id,
+            'reviews_count': 4,
+            'mean': 6.75,
+            'median': 7.0,
+            'histogram': histogram,
+        }
+
+    def test_stale_instances_keep_histogram(self, api_client, another_user,
+                                            title):
+        review = Review.objects.create(
+            title=title, author=another_user, text='Отзыв', score=5)
+        first = Review.objects.get(pk=review.pk)
+        second = Review.objects.get(pk=review.pk)
+
+        first.score = 7
+        first.save()
+        second.score = 9
+        second.save()
+        title.refresh_from_db()
+        assert title.score_histogram == expected_histogram(title)
+
+        first.delete()
+        second.delete()
+        response = api_client.get(f'/api/v1/titles/{title.id}/stats/')
+        assert response.json()['reviews_count'] == 0
+        assert set(response.json()['histogram'].values()) == {0}
+
+    def test_median_of_even_count(self):
+        title = Title(reviews_count=4, score_2_count=2, score_9_count=2)
+
+        assert title.median_score == 5.5
+        assert Title(reviews_count=1, score_8_count=1).median_score == 8
+
+    def test_title_without_reviews(self, api_client, title):
+        response = api_client.get(f'/api/v1/titles/{title.id}/stats/')
+
+        assert response.json()['mean'] is None
+        assert response.json()['median'] is None
+        assert response.json()['reviews_count'] == 0
+
+    def test_missing_title(self, api_client):
+        response = api_client.get('/api/v1/titles/999999/stats/')
+
+        assert response.status_code == 404
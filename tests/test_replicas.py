@@ -0,0 +1,110 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+# Основная база и реплика - два файла SQLite. Реплика - копия основной
+# сразу после миграций, дальше "репликация" стоит: что клиент прочитал,
+# видно по тому, есть ли в ответе строки, добавленные после копирования.
+# Первая реплика в списке недоступна и должна пропускаться.
+SCENARIO = '''
+import json
+import shutil
+import sys
+import time
+
+import django
+django.setup()
+
+from django.core.management import call_command
+from django.test import Client
+
+call_command('migrate', verbosity=0)
+shutil.copy(sys.argv[1], sys.argv[2])
+
+from api.v1.authentication import get_access_token
+from core import replicas
+from reviews.models import Title
+from users.models import User, UserRole
+
+replicas.STICKY_SECONDS = 1
+# Первый запрос загружает URLconf и представления - не тратим на это окно.
+Client().get('/api/v1/categories/')
+title = Title.objects.create(name='Только в основной базе', year=2000)
+reader = User.objects.create(username='reader', email='reader@yamdb.fake')
+admin = User.objects.create(username='boss', email='boss@yamdb.fake',
+                            role=UserRole.ADMIN)
+other = User.objects.create(username='other', email='other@yamdb.fake',
+                            role=UserRole.ADMIN)
+
+
+def client(user):
+    return Client(HTTP_AUTHORIZATION=f'Bearer {get_access_token(user)}')
+
+
+reader, admin, other = client(reader), client(admin), client(other)
+seen = {}
+
+
+def count(name, client, url):
+    seen[name] = client.get(url).json()['count']
+
+
+count('titles_after_write', reader, '/api/v1/titles/')
+time.sleep(1.1)
+count('titles', reader, '/api/v1/titles/')
+count('users', admin, '/api/v1/users/')
+response = admin.patch('/api/v1/users/reader/', {'bio': 'Читатель'},
+                       content_type='application/json')
+seen['patch'] = response.status_code
+count('users_after_write', admin, '/api/v1/users/')
+count('users_other_client', other, '/api/v1/users/')
+time.sleep(1.1)
+count('users_after_window', admin, '/api/v1/users/')
+print(json.dumps(seen))
+'''
+
+
+def test_reads_from_replica_with_read_your_writes(tmp_path):
+    primary = tmp_path / 'primary.sqlite3'
+    replica = tmp_path / 'replica.sqlite3'
+    env = dict(
+        os.environ,
+        DJANGO_SETTINGS_MODULE='api_yamdb.settings',
+        DB_ENGINE='django.db.backends.sqlite3',
+        DB_NAME=str(primary),
+        DB_REPLICA_NAMES=f'{tmp_path / "missing" / "db.sqlite3"},{replica}',
+    )
+    output = subprocess.check_output(
+        [sys.executable, '-c', SCENARIO, str(primary), str(replica)],
+        cwd=settings.BASE_DIR, env=env)
+    seen = json.loads(output.splitlines()[-1])
+
+    assert seen['titles_after_write'] == 1, (
+        'Сразу после изменения данные читаются с основной базы'
+    )
+    assert seen['titles'] == 0, 'Чтение должно идти с реплики'
+    assert seen['users'] == 0
+    assert seen['patch'] == 200
+    assert seen['users_after_write'] == 3, (
+        'После записи клиент должен читать с основной базы'
+    )
+    assert seen['users_other_client'] == 0
+    assert seen['users_after_window'] == 0
+
+
+@pytest.mark.django_db
+def test_without_replicas_everything_uses_primary(admin_client, title):
+    from core.replicas import REPLICAS, ReplicaRouter
+
+    assert REPLICAS == ()
+    response = admin_client.get(f'/api/v1/titles/{title.id}/')
+
+    assert response.status_code == 200
+    router = ReplicaRouter()
+    assert router.db_for_read(type(title)) == DEFAULT_DB_ALIAS
+    assert router.db_for_write(type(title)) == DEFAULT_DB_ALIAS
@@ -0,0 +1,58 @@
+import threading
+
+import pytest
+from api.v1.cache import VersionedCacheMixin
+from django.core.cache import cache
+from reviews.models import Genre, Review
+
+
+@pytest.mark.django_db(transaction=True)
+class TestResponseCache:
+
+    def test_anonymous_reads_are_cached(self, api_client, title,
+                                        django_assert_num_queries):
+        url = '/api/v1/titles/'
+        first = api_client.get(url, {'year': 1994, 'page': 1})
+
+        with django_assert_num_queries(0):
+            second = api_client.get(url, {'page': 1, 'year': 1994})
+
+        assert second.status_code == 200
+        assert second.json() == first.json()
+
+    def test_new_review_invalidates_titles(self, api_client, user, title):
+        url = f'/api/v1/titles/{title.id}/'
+        assert api_client.get(url).json()['rating'] is None
+
+        Review.objects.create(title=title, author=user, text='Отзыв', score=9)
+
+        assert api_client.get(url).json()['rating'] == 9
+
+    def test_genre_change_invalidates_genres(self, api_client, genres):
+        url = '/api/v1/genres/'
+        assert api_client.get(url).json()['count'] == 2
+
+        Genre.objects.create(name='Ужасы', slug='horror')
+
+        assert api_client.get(url).json()['count'] == 3
+
+    def test_authenticated_reads_bypass_cache(self, user_client, title,
+                                              django_assert_num_queries):
+        user_client.get('/api/v1/categories/')
+
+        with django_assert_num_queries(2):
+            user_client.get('/api/v1/categories/')
+
+    def test_miss_waits_for_lock_owner(self, api_client, monkeypatch,
+                                       django_assert_num_queries):
+        monkeypatch.setattr(
+            VersionedCacheMixin, 'get_cache_key',
+            lambda self, request, versions: 'api-cache:test')
+        cache.add('api-cache:test:lock', 1)
+        threading.Timer(
+            0.1, cache.set, ('api-cache:test', {'count': 42})).start()
+
+        with django_assert_num_queries(0):
+            response = api_client.get('/api/v1/categories/')
+
+        assert response.json() == {'count': 42}
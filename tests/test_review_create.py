@@ -0,0 +1,78 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from reviews.models import Review, Title
+from users import cache as user_cache
+
+from .utils import statements
+
+
+@pytest.mark.django_db(transaction=True)
+class TestReviewCreate:
+
+    def url(self, title_id):
+        return f'/api/v1/titles/{title_id}/reviews/'
+
+    def test_single_insert(self, user_client, title):
+        with CaptureQueriesContext(connection) as queries:
+            response = user_client.post(
+                self.url(title.id), {'text': 'Отзыв', 'score': 7})
+
+        assert response.status_code == 201
+        # Отзыв и счётчики рейтинга, без проверочных SELECT.
+        assert statements(queries) == ['INSERT', 'UPDATE']
+        assert Title.objects.get().rating == 7
+
+    def test_single_insert_with_bearer_token(self, user, title,
+                                             bearer_client, shared_cache):
+        client = bearer_client(user)
+        # Время изменения пользователя уже в общем кэше, самого
+        # пользователя в кэше процесса нет.
+        client.get('/api/v1/titles/')
+        user_cache._users.clear()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = client.post(
+                self.url(title.id), {'text': 'Отзыв', 'score': 7})
+
+        assert response.status_code == 201
+        assert response.json()['author'] == user.username
+        # Автор - из claims токена, без запроса пользователя.
+        assert statements(queries) == ['INSERT', 'UPDATE']
+
+    def test_duplicate_rejected(self, user_client, title):
+        user_client.post(self.url(title.id), {'text': 'Отзыв', 'score': 7})
+
+        response = user_client.post(
+            self.url(title.id), {'text': 'Ещё отзыв', 'score': 1})
+
+        assert response.status_code == 400
+        assert response.json() == {
+            'non_field_errors': ['Можно оставлять только один отзыв!']}
+        assert Review.objects.count() == 1
+        title.refresh_from_db()
+        assert (title.reviews_count, title.rating) == (1, 7)
+
+    def test_missing_title(self, user_client, title):
+        response = user_client.post(
+            self.url(title.id + 1), {'text': 'Отзыв', 'score': 7})
+
+        assert response.status_code == 404
+        assert not Review.objects.exists()
+
+    def test_invalid_data_before_title_check(self, user_client, title):
+        response = user_client.post(
+            self.url(title.id + 1), {'text': 'Отзыв', 'score': 11})
+
+        assert response.status_code == 400
+        assert 'score' in response.json()
+
+    def test_update_own_review(self, user_client, title):
+        review_id = user_client.post(
+            self.url(title.id), {'text': 'Отзыв', 'score': 7}).json()['id']
+
+        response = user_client.patch(
+            f'{self.url(title.id)}{review_id}/', {'score': 3})
+
+        assert response.status_code == 200
+        assert Title.objects.get().rating == 3
@@ -0,0 +1,95 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from reviews.models import Comment, Review
+
+from .utils import statements
+
+
+def selects(queries):
+    return [query['sql'] for query in queries
+            if query['sql'].startswith('SELECT')]
+
+
+@pytest.mark.django_db(transaction=True)
+class TestSparseFields:
+
+    def test_fields_prune_response_and_query(self, user_client, title):
+        url = '/api/v1/titles/?fields=id,name,rating'
+        with CaptureQueriesContext(connection) as queries:
+            response = user_client.get(url)
+
+        assert response.status_code == 200
+        assert response.json()['results'] == [
+            {'id': title.id, 'name': title.name, 'rating': None}]
+        # COUNT и страница, без жанров и JOIN категории.
+        assert len(statements(queries)) == 2
+        page = selects(queries)[-1]
+        assert '"description"' not in page
+        assert 'reviews_category' not in page
+
+    def test_omit(self, user_client, title):
+        response = user_client.get(f'/api/v1/titles/{title.id}/',
+                                   {'omit': 'description,genre'})
+
+        assert response.status_code == 200
+        assert response.json() == {
+            'id': title.id, 'name': title.name, 'year': 1994,
+            'rating': None,
+            'category': {'name': 'Фильм', 'slug': 'movie'},
+        }
+
+    def test_nested_fields_are_loaded_when_requested(self, user_client,
+                                                     title):
+        with CaptureQueriesContext(connection) as queries:
+            response = user_client.get(f'/api/v1/titles/{title.id}/',
+                                       {'fields': 'genre,category'})
+
+        assert response.json() == {
+            'genre': [{'name': 'Драма', 'slug': 'drama'},
+                      {'name': 'Комедия', 'slug': 'comedy'}],
+            'category': {'name': 'Фильм', 'slug': 'movie'},
+        }
+        # Произведение с категорией и жанры.
+        assert len(statements(queries)) == 2
+
+    def test_unknown_field(self, api_client):
+        response = api_client.get('/api/v1/titles/', {'fields': 'id,votes'})
+
+        assert response.status_code == 400
+        assert 'votes' in response.json()['fields']
+
+    def test_reviews_and_comments(self, api_client, user, title):
+        review = Review.objects.create(title=title, author=user,
+                                       text='Длинный отзыв', score=8)
+        Comment.objects.create(review_id=review, author=user, text='Да')
+        url = f'/api/v1/titles/{title.id}/reviews/'
+
+        with CaptureQueriesContext(connection) as queries:
+            data = api_client.get(url, {'fields': 'id,score',
+                                        'pagination': 'cursor'}).json()
+        assert data['results'] == [{'id': review.id, 'score': 8}]
+        assert '"text"' not in selects(queries)[-1]
+        assert 'users_user' not in selects(queries)[-1]
+
+        data = api_client.get(f'{url}{review.id}/comments/',
+                              {'omit': 'text'}).json()
+        assert [set(row) for row in data['results']] == [
+            {'id', 'author', 'pub_date'}]
+        assert data['results'][0]['author'] == user.username
+
+    def test_writes_ignore_fields(self, admin_client, genres, category):
+        response = admin_client.post(
+            '/api/v1/titles/?fields=id',
+            {'name': 'Новое', 'year': 2000, 'genre': ['drama'],
+             'category': 'movie'})
+
+        assert response.status_code == 201
+        assert set(response.json()) > {'id', 'name'}
+
+    def test_users_me(self, user_client, user):
+        response = user_client.get('/api/v1/users/me/',
+                                   {'fields': 'username,role'})
+
+        assert response.json() == {'username': user.username,
+                                   'role': user.role}
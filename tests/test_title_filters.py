@@ -0,0 +1,53 @@
+import pytest
+from reviews.models import Category, Genre, Title
+
+
+@pytest.fixture
+def catalog(category, genres):
+    drama, comedy = genres
+    book = Category.objects.create(name='Книга', slug='book')
+    horror = Genre.objects.create(name='Ужасы', slug='horror')
+    both = Title.objects.create(name='Оба жанра', year=2000,
+                                category=category)
+    both.genre.set([drama, comedy])
+    only_drama = Title.objects.create(name='Драма', year=2001, category=book)
+    only_drama.genre.set([drama])
+    scary = Title.objects.create(name='Страшное', year=2002, category=book)
+    scary.genre.set([horror])
+    return both, only_drama, scary
+
+
+@pytest.mark.django_db
+class TestTitleFilters:
+
+    def names(self, client, **params):
+        response = client.get('/api/v1/titles/', params)
+        assert response.status_code == 200, response.content
+        return sorted(title['name'] for title in response.json()['results'])
+
+    def test_genre_any(self, admin_client, catalog):
+        assert self.names(admin_client, genre='drama,comedy') == [
+            'Драма', 'Оба жанра']
+
+    def test_genre_all(self, admin_client, catalog):
+        assert self.names(
+            admin_client, genre='drama,comedy', genre_mode='all'
+        ) == ['Оба жанра']
+        assert self.names(
+            admin_client, genre='drama,unknown', genre_mode='all') == []
+
+    def test_genre_is_exact(self, admin_client, catalog):
+        assert self.names(admin_client, genre='dram') == []
+
+    def test_category(self, admin_client, catalog):
+        assert self.names(admin_client, category='book') == [
+            'Драма', 'Страшное']
+        assert self.names(admin_client, category='movie,book') == [
+            'Драма', 'Оба жанра', 'Страшное']
+        assert self.names(admin_client, category='mov') == []
+
+    def test_invalid_genre_mode(self, admin_client, catalog):
+        response = admin_client.get(
+            '/api/v1/titles/', {'genre': 'drama', 'genre_mode': 'some'})
+
+        assert response.status_code == 400
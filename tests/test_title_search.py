@@ -0,0 +1,37 @@
+import pytest
+from reviews.models import Title
+
+
+@pytest.mark.django_db(transaction=True)
+class TestTitleSearch:
+
+    def search(self, client, query):
+        response = client.get('/api/v1/titles/', {'search': query})
+        assert response.status_code == 200
+        return [title['name'] for title in response.json()['results']]
+
+    def test_search_name_and_description(self, api_client, category):
+        Title.objects.create(name='Звёздные войны', year=1977,
+                             category=category, description='Космос')
+        Title.objects.create(name='Гравитация', year=2013,
+                             category=category,
+                             description='Космос, космос и снова космос')
+        Title.objects.create(name='Титаник', year=1997, category=category)
+
+        assert self.search(api_client, 'космос') == [
+            'Гравитация', 'Звёздные войны']
+        assert self.search(api_client, 'звёздные космос') == [
+            'Звёздные войны']
+        assert self.search(api_client, 'океан') == []
+        assert self.search(api_client, '"*') == []
+
+    def test_index_follows_changes(self, api_client, title):
+        assert self.search(api_client, 'Шоушенка') == [title.name]
+
+        title.name = 'Зелёная миля'
+        title.save()
+        assert self.search(api_client, 'Шоушенка') == []
+        assert self.search(api_client, 'миля') == ['Зелёная миля']
+
+        title.delete()
+        assert self.search(api_client, 'миля') == []
@@ -0,0 +1,12 @@
+def statements(queries):
+    """Запросы к данным без управления транзакциями и точками сохранения."""
+    return [query['sql'].split()[0] for query in queries
+            if query['sql'].split()[0] not in (
+                'BEGIN', 'COMMIT', 'SAVEPOINT', 'RELEASE')]
+
+
+def body(response):
+    """Тело ответа; большие страницы списков отдаются потоком."""
+    if response.streaming:
+        return b''.join(response.streaming_content)
+    return response.content